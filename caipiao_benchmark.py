@@ -0,0 +1,184 @@
+import argparse
+import csv
+import datetime
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import caipiao_draw_client
+import caipiao_draw_matrix
+
+# 桩服务器的开奖历史：大乐透首期(07001)到现有CSV的最新一期，CSV中已有的期次使用真实数据
+SOURCE_CSV = 'caipiao_daletou.csv'
+FIRST_DRAW_DATE = datetime.date(2007, 5, 28)
+DRAW_WEEKDAYS = {0: '一', 2: '三', 5: '六'}
+
+
+def load_real_draws(path=SOURCE_CSV):
+    """读取现有CSV中的开奖记录，转换为接口字段"""
+    draws = {}
+    with open(path, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            date, _, week = row['开奖日期'].partition('（')
+            draws[row['期号']] = {
+                'issue': row['期号'], 'openTime': date, 'week': week.rstrip('）'),
+                'frontWinningNum': row['前区号码'], 'backWinningNum': row['后区号码'],
+                'saleMoney': row['全国销量'], 'prizePoolMoney': row['奖池滚存'],
+            }
+    return draws
+
+
+def make_draw_history(path=SOURCE_CSV, seed=0):
+    """生成完整的开奖历史(按期号降序)：现有CSV之前的期次按每周一、三、六开奖合成，期号每年从 001 重新编号"""
+    real = load_real_draws(path)
+    first_real = min(map(int, real))
+    rng = random.Random(seed)
+    draws, date, year, number = dict(real), FIRST_DRAW_DATE, None, 0
+    while True:
+        if date.weekday() in DRAW_WEEKDAYS:
+            number = number + 1 if date.year == year else 1
+            year = date.year
+            issue = f"{date.year % 100:02d}{number:03d}"
+            if int(issue) >= first_real:
+                break
+            draws[issue] = {
+                'issue': issue, 'openTime': date.isoformat(), 'week': DRAW_WEEKDAYS[date.weekday()],
+                'frontWinningNum': ' '.join(f'{n:02d}' for n in sorted(rng.sample(range(1, 36), 5))),
+                'backWinningNum': ' '.join(f'{n:02d}' for n in sorted(rng.sample(range(1, 13), 2))),
+                'saleMoney': str(rng.randint(150_000_000, 350_000_000)),
+                'prizePoolMoney': f'{rng.uniform(5e8, 2e9):.2f}',
+            }
+        date += datetime.timedelta(days=1)
+    return [draws[issue] for issue in sorted(draws, key=int, reverse=True)]
+
+
+class DrawStubHandler(BaseHTTPRequestHandler):
+    """模拟 client_json.php：按 startIssue/endIssue 过滤、pageNum/pageSize 分页，以 JSONP 返回；latency 模拟网络往返"""
+    draws = []
+    latency = 0.05
+
+    def do_GET(self):
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query, keep_blank_values=True).items()}
+        start, end = int(query.get('startIssue') or 0), int(query.get('endIssue') or 10 ** 9)
+        page_num, page_size = int(query.get('pageNum', 1)), int(query.get('pageSize', 30))
+        matched = [draw for draw in self.draws if start <= int(draw['issue']) <= end]
+        page = matched[(page_num - 1) * page_size:page_num * page_size]
+        time.sleep(self.latency)
+
+        payload = {'resCode': '000000', 'message': '查询成功', 'pageNum': str(page_num), 'pageSize': str(page_size),
+                   'total': str(len(matched)), 'pages': str(max(1, -(-len(matched) // page_size))), 'data': page}
+        body = json.dumps(payload, ensure_ascii=False)
+        if query.get('callback'):
+            body = f"{query['callback']}({body})"
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/javascript; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(latency=0.05, draws=None):
+    """在后台线程启动桩服务器，返回 (server, 接口地址)"""
+    handler = type('Handler', (DrawStubHandler,), {'latency': latency,
+                                                   'draws': draws if draws is not None else make_draw_history()})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/port/client_json.php"
+
+
+def run_refresh_benchmark(latency=0.05, concurrency=4, repeat=3):
+    """从桩服务器刷新完整开奖历史的耗时；并核对现有期号区间的结果与 caipiao_daletou.csv 逐行一致"""
+    draws = make_draw_history()
+    server, base_url = start_stub_server(latency, draws)
+    try:
+        with open(SOURCE_CSV, encoding='utf-8') as f:
+            expected = list(csv.reader(f))[1:]
+        rows = caipiao_draw_client.fetch_draws(expected[-1][0], expected[0][0], base_url=base_url)
+        assert rows == expected, "现有期号区间的结果与 CSV 不一致"
+        print(f"期号 {expected[-1][0]}-{expected[0][0]} 的 {len(rows)} 行与 {SOURCE_CSV} 一致")
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = caipiao_draw_client.fetch_draws(draws[-1]['issue'], draws[0]['issue'], concurrency=concurrency,
+                                                   base_url=base_url)
+            timings.append(time.perf_counter() - start)
+        assert len(rows) == len(draws), f"获取期数不符: {len(rows)} != {len(draws)}"
+    finally:
+        server.shutdown()
+    print(f"完整历史 {len(rows)} 期 (并发 {concurrency}, 延迟 {latency}s): 最佳耗时 {min(timings):.3f}s ({repeat} 次)")
+    return min(timings)
+
+
+def run_matrix_benchmark(simulated=1_000_000, repeat=3):
+    """号码频率统计：展平列表+Counter 与号码矩阵按列求和的耗时对比，分别在完整开奖历史和大量模拟开奖上核对结果一致"""
+    from collections import Counter
+
+    def best(func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        return result, min(timings)
+
+    history = [draw['frontWinningNum'] for draw in make_draw_history()]
+    simulated_matrix = caipiao_draw_matrix.simulate_draws(simulated, caipiao_draw_matrix.FRONT_BALLS,
+                                                          caipiao_draw_matrix.FRONT_PICKS)
+    rows, balls = np.nonzero(simulated_matrix)
+    cases = [('完整历史', [[int(n) for n in draw.split()] for draw in history],
+              caipiao_draw_matrix.ball_matrix(history, caipiao_draw_matrix.FRONT_BALLS)),
+             ('模拟开奖', (balls + 1).reshape(simulated, caipiao_draw_matrix.FRONT_PICKS).tolist(), simulated_matrix)]
+    for name, lists, matrix in cases:
+        counter, list_time = best(lambda: Counter(num for sublist in lists for num in sublist))
+        counts, matrix_time = best(lambda: caipiao_draw_matrix.ball_counts(matrix))
+        assert [counter.get(n, 0) for n in range(1, len(counts) + 1)] == counts.tolist(), f"{name}: 频率不一致"
+        print(f"{name} {len(matrix)} 期前区频率: 列表+Counter {list_time * 1000:.1f}ms, "
+              f"号码矩阵 {matrix_time * 1000:.1f}ms ({list_time / matrix_time:.0f}x)")
+
+    masks = caipiao_draw_matrix.pack_bits(simulated_matrix)
+    assert np.array_equal(caipiao_draw_matrix.unpack_bits(masks, caipiao_draw_matrix.FRONT_BALLS), simulated_matrix)
+    groups = np.array(caipiao_draw_matrix.WEEKDAYS, dtype=object)[np.arange(simulated) % 3]
+    _, group_time = best(lambda: caipiao_draw_matrix.group_counts(simulated_matrix, groups))
+    _, window_time = best(lambda: caipiao_draw_matrix.windowed_counts(simulated_matrix, 30))
+    print(f"模拟开奖 {simulated} 期: 按星期统计 {group_time * 1000:.1f}ms, 30 期滑动窗口 {window_time * 1000:.1f}ms, "
+          f"矩阵 {simulated_matrix.nbytes / 2 ** 20:.0f}MB / 位掩码 {masks.nbytes / 2 ** 20:.0f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="大乐透开奖数据接口的本地桩服务器与刷新基准")
+    subparsers = parser.add_subparsers(dest='command')
+    serve_parser = subparsers.add_parser('serve', help="只启动桩服务器，直到 Ctrl+C")
+    refresh_parser = subparsers.add_parser('refresh', help="刷新完整开奖历史的耗时")
+    matrix_parser = subparsers.add_parser('matrix', help="号码矩阵与列表+Counter 的频率统计耗时对比")
+    matrix_parser.add_argument('--simulated', type=int, default=1_000_000, help="模拟开奖期数")
+    for sub in [serve_parser, refresh_parser]:
+        sub.add_argument('--latency', type=float, default=0.05, help="每次响应的延迟(秒)")
+    refresh_parser.add_argument('--concurrency', type=int, default=4, help="并发请求数")
+    refresh_parser.add_argument('--repeat', type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server, base_url = start_stub_server(args.latency)
+        print(f"桩服务器: {base_url} (Ctrl+C 结束)")
+        print(f"示例: python caipiao_daleyou_data.py --base-url {base_url} --start 07001 --end 25073")
+        print(f"      python caipiao_daleyou_data.py --base-url {base_url} update")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == 'refresh':
+        run_refresh_benchmark(args.latency, args.concurrency, args.repeat)
+    elif args.command == 'matrix':
+        run_matrix_benchmark(args.simulated)
+    else:
+        run_refresh_benchmark()
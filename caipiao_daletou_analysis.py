@@ -2,9 +2,10 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-from collections import Counter
 import re # 用于正则表达式提取星期
 
+import caipiao_draw_matrix
+
 # 设置matplotlib支持中文显示
 plt.rcParams['font.sans-serif'] = ['SimHei'] # 指定默认字体
 plt.rcParams['axes.unicode_minus'] = False # 解决保存图像是负号'-'显示为方块的问题
@@ -54,42 +55,53 @@ def clean_numeric(s):
 df['全国销量'] = df['全国销量'].apply(clean_numeric)
 df['奖池滚存'] = df['奖池滚存'].apply(clean_numeric)
 
-# 将 '前区号码' 和 '后区号码' 字符串转换为整数列表
-# 它们当前是空格分隔的字符串，例如 "01 04 17 33 34"
-df['前区号码_list'] = df['前区号码'].apply(lambda x: [int(n) for n in str(x).split()] if pd.notna(x) else [])
-df['后区号码_list'] = df['后区号码'].apply(lambda x: [int(n) for n in str(x).split()] if pd.notna(x) else [])
-
-
 # 按日期升序排序，确保数据按时间顺序排列，便于后续分析
 df = df.sort_values(by='开奖日期_parsed', ascending=True).reset_index(drop=True)
 
+# 将 '前区号码' 和 '后区号码' 字符串转换为号码矩阵，只在加载时构建一次
+# 它们当前是空格分隔的字符串，例如 "01 04 17 33 34"；矩阵每行一期，第 j 列为 1 表示号码 j+1 开出
+# 前区为 期数×35、后区为 期数×12 的 uint8 矩阵，后续的频率统计都是对矩阵的向量化求和
+red_matrix, blue_matrix = caipiao_draw_matrix.draw_matrices(df)
+# 号码缺失或含非数字(如 'N/A')的期次不参与号码统计
+complete = (caipiao_draw_matrix.complete_rows(red_matrix, caipiao_draw_matrix.FRONT_PICKS)
+            & caipiao_draw_matrix.complete_rows(blue_matrix, caipiao_draw_matrix.BACK_PICKS))
+if not complete.all():
+    print(f"\n警告: {(~complete).sum()} 期号码不完整，已从号码统计中剔除: {df.loc[~complete, '期号'].tolist()}")
+    df = df[complete].reset_index(drop=True)
+    red_matrix, blue_matrix = red_matrix[complete], blue_matrix[complete]
+
 print("\n数据处理后前5行:\n", df.head())
 print("\n数据处理后信息概览:\n")
 df.info()
 
 # 检查是否存在缺失值，特别是处理后的关键列
 print("\n处理后的关键列缺失值检查:")
-print(df[['开奖日期_parsed', '开奖星期', '全国销量', '前区号码_list', '后区号码_list']].isnull().sum())
+print(df[['开奖日期_parsed', '开奖星期', '全国销量', '前区号码', '后区号码']].isnull().sum())
 
 #前区号码与后区号码频率统计与可视化，分析其历史分布规律（问题2）
 
-# 将所有期号列表展平，以便统计每个号码的出现次数
-all_red_balls = [num for sublist in df['前区号码_list'] for num in sublist]
-all_blue_balls = [num for sublist in df['后区号码_list'] for num in sublist]
+# 号码矩阵按列求和即为每个号码的出现次数
+red_ball_counts = caipiao_draw_matrix.ball_counts(red_matrix)
+blue_ball_counts = caipiao_draw_matrix.ball_counts(blue_matrix)
 
-# 使用 Counter 进行频率统计
-red_ball_counts = Counter(all_red_balls)
-blue_ball_counts = Counter(all_blue_balls)
-
-# 转换为 DataFrame 便于排序和绘图
-red_freq_df = pd.DataFrame(red_ball_counts.items(), columns=['号码', '出现频率']).sort_values(by='号码')
-blue_freq_df = pd.DataFrame(blue_ball_counts.items(), columns=['号码', '出现频率']).sort_values(by='号码')
+# 转换为 DataFrame 便于排序和绘图（包含从未开出的号码，频率为 0）
+red_freq_df = caipiao_draw_matrix.counts_frame(red_ball_counts)
+blue_freq_df = caipiao_draw_matrix.counts_frame(blue_ball_counts)
 
 print("\n--- 大乐透前区号码频率统计 (出现次数最多的前10个) ---")
 print(red_freq_df.sort_values(by='出现频率', ascending=False).head(10))
 print("\n--- 大乐透后区号码频率统计 (出现次数最多的前5个) ---")
 print(blue_freq_df.sort_values(by='出现频率', ascending=False).head(5))
 
+# 最近 30 期的热门号码：滑动窗口计数的最后一行
+RECENT_WINDOW = 30
+recent_red_counts = caipiao_draw_matrix.windowed_counts(red_matrix, RECENT_WINDOW)[-1]
+recent_blue_counts = caipiao_draw_matrix.windowed_counts(blue_matrix, RECENT_WINDOW)[-1]
+print(f"\n--- 最近 {RECENT_WINDOW} 期前区热门号码 ---")
+print(caipiao_draw_matrix.counts_frame(recent_red_counts).sort_values(by='出现频率', ascending=False).head(5))
+print(f"\n--- 最近 {RECENT_WINDOW} 期后区热门号码 ---")
+print(caipiao_draw_matrix.counts_frame(recent_blue_counts).sort_values(by='出现频率', ascending=False).head(3))
+
 #可视化
 
 plt.figure(figsize=(18, 7)) # 调整图表大小以适应更多数据点
@@ -155,38 +167,26 @@ plt.show()
 
 #统计号码分布特征
 
-# 统计不同开奖日的前区和后区号码频率
-weekday_red_freq = {}
-weekday_blue_freq = {}
-
-for day in ['周一', '周三', '周六']:
-    day_df = df[df['开奖星期'] == day]
-    if not day_df.empty:
-        # 展平该星期的所有红球和蓝球
-        day_red_balls = [num for sublist in day_df['前区号码_list'] for num in sublist]
-        day_blue_balls = [num for sublist in day_df['后区号码_list'] for num in sublist]
-
-        weekday_red_freq[day] = Counter(day_red_balls)
-        weekday_blue_freq[day] = Counter(day_blue_balls)
-    else:
-        weekday_red_freq[day] = Counter() # 空 Counter
-        weekday_blue_freq[day] = Counter()
+# 统计不同开奖日的前区和后区号码频率：按星期选出矩阵的行再按列求和
+# 结果为 行为号码(前区1-35/后区1-12)、列为开奖星期 的频率表，无数据的星期整列为 0
+red_freq_comparison_df = caipiao_draw_matrix.group_counts(red_matrix, df['开奖星期'])
+blue_freq_comparison_df = caipiao_draw_matrix.group_counts(blue_matrix, df['开奖星期'])
 
 
 print("\n--- 不同开奖日的前区号码频率 (部分展示) ---")
-for day, counts in weekday_red_freq.items():
-    if counts:
+for day, counts in red_freq_comparison_df.items():
+    if counts.any():
         print(f"\n{day} 热门前区号码:")
-        print(pd.DataFrame(counts.items(), columns=['号码', '频率']).sort_values(by='频率', ascending=False).head(5))
+        print(counts.rename('频率').reset_index().sort_values(by='频率', ascending=False).head(5))
     else:
         print(f"\n{day} 无数据。")
 
 
 print("\n--- 不同开奖日的后区号码频率 (部分展示) ---")
-for day, counts in weekday_blue_freq.items():
-    if counts:
+for day, counts in blue_freq_comparison_df.items():
+    if counts.any():
         print(f"\n{day} 热门后区号码:")
-        print(pd.DataFrame(counts.items(), columns=['号码', '频率']).sort_values(by='频率', ascending=False).head(3))
+        print(counts.rename('频率').reset_index().sort_values(by='频率', ascending=False).head(3))
     else:
         print(f"\n{day} 无数据。")
 
@@ -194,22 +194,6 @@ for day, counts in weekday_blue_freq.items():
 # 可视化对比不同开奖日的号码分布（示例：只可视化最热门的几个）
 # 由于号码范围较广，这里选择可视化不同周几的前区号码频率最高的几个，进行对比
 
-# 创建一个包含所有号码和所有周几频率的DataFrame
-all_red_numbers = sorted(list(set(all_red_balls)))
-all_blue_numbers = sorted(list(set(all_blue_balls)))
-
-red_freq_comparison_df = pd.DataFrame(index=all_red_numbers)
-blue_freq_comparison_df = pd.DataFrame(index=all_blue_numbers)
-
-for day, counts in weekday_red_freq.items():
-    red_freq_comparison_df[day] = pd.Series(counts)
-red_freq_comparison_df = red_freq_comparison_df.fillna(0) # 缺失值填充0
-
-for day, counts in weekday_blue_freq.items():
-    blue_freq_comparison_df[day] = pd.Series(counts)
-blue_freq_comparison_df = blue_freq_comparison_df.fillna(0) # 缺失值填充0
-
-
 # 绘制前区号码频率对比图 (前20个热门号码)
 plt.figure(figsize=(18, 6))
 red_freq_comparison_df.loc[red_freq_comparison_df.sum(axis=1).nlargest(20).index].plot(kind='bar', figsize=(15, 6), width=0.8)
@@ -1,15 +1,18 @@
-import csv
-from selenium.webdriver import Chrome
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import argparse
+import os
 import time
 
+import caipiao_draw_client
+import caipiao_draw_store
+
 # --- 配置项 ---
 # 目标网页URL
 URL = "https://www.zhcw.com/kjxx/dlt/"
 # CSV文件名称
 CSV_FILE_NAME = "caipiao_daletou.csv"
+# 默认查询的期号范围
+START_ISSUE = "24126"
+END_ISSUE = "25073"
 
 # 定义要提取的表格列及其在CSV中的名称和提取类型
 # 'td_index' 是该列在 HTML <tr> 中的索引（从1开始）
@@ -23,185 +26,223 @@ COLUMNS_TO_EXTRACT = {
     '奖池滚存': {'td_index': 14, 'type': 'text'}
 }
 
-# 定义需要点击的分页按钮对应的 li 索引
-# 假设你的分页按钮结构为：上一页 | 1 | 2 | 3 | 4 | 下一页
-# 那么：li[3] 对应页面上的 "2"（第二页）
-#       li[4] 对应页面上的 "3"（第三页）
-#       li[5] 对应页面上的 "4"（第四页）
-# **请务必根据实际网页结构在浏览器开发者工具中确认这些索引！**
-PAGE_BUTTON_INDICES = [3, 4, 5]
-
-# --- 初始化 WebDriver ---
-print("正在启动 Chrome 浏览器...")
-web = Chrome()
-web.get(URL)
-print(f"已打开网页: {URL}")
-
-# --- 前置操作：确保页面加载并执行初始点击和输入 ---
-# 这部分操作只执行一次，以达到显示查询结果的页面状态
-try:
-    # 点击第一个按钮，例如“玩法介绍”或“开奖详情”
-    put_btn = WebDriverWait(web, 10).until(
-        EC.element_to_be_clickable((By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[1]'))
-    )
-    put_btn.click()
-    print("成功点击第一个前置按钮。")
-    time.sleep(1)  # 短暂等待页面DOM更新
-
-    # 点击第二个按钮，例如“查询”或“筛选”按钮
-    search_btn = WebDriverWait(web, 10).until(
-        EC.element_to_be_clickable((By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[2]/div[1]/div[2]'))
-    )
-    search_btn.click()
-    print("成功点击第二个前置按钮。")
-    time.sleep(1)  # 短暂等待查询条件区域显示
-
-    # 输入查询范围的起始期号
-    input1 = WebDriverWait(web, 10).until(
-        EC.presence_of_element_located(
-            (By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[2]/div[3]/div[1]/input[1]'))
-    )
-    input1.send_keys("24126")  # 设置起始期号
-    print("成功输入起始期号: 24126。")
-    time.sleep(1)
-
-    # 输入查询范围的结束期号
-    input2 = WebDriverWait(web, 10).until(
-        EC.presence_of_element_located(
-            (By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[2]/div[3]/div[1]/input[2]'))
-    )
-    input2.send_keys("25073")  # 设置结束期号
-    print("成功输入结束期号: 25073。")
-    time.sleep(1)
-
-    # 点击查询按钮
-    bigen_btn = WebDriverWait(web, 10).until(
-        EC.element_to_be_clickable(
-            (By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[2]/div[3]/div[2]/div[2]/div'))
-    )
-    bigen_btn.click()
-    print("成功点击查询按钮。")
-    time.sleep(2)  # 给页面一些时间加载查询结果
-
-except Exception as e:
-    print(f"前置操作出错，脚本终止: {e}")
-    web.quit()
-    exit()  # 退出脚本
-
-# --- CSV 文件写入准备 ---
-# 获取 CSV 文件的列名（表头），顺序与 COLUMNS_TO_EXTRACT 定义的顺序一致
-csv_headers = list(COLUMNS_TO_EXTRACT.keys())
-print(f"\n准备将数据写入文件: {CSV_FILE_NAME}，表头为: {csv_headers}")
-
-# 以写入模式打开 CSV 文件，'w' 模式会创建新文件或覆盖现有文件
-# newline='' 参数是为了防止写入空行，encoding='utf-8' 支持中文
-with open(CSV_FILE_NAME, 'w', newline='', encoding='utf-8') as file:
-    writer = csv.writer(file)
-    writer.writerow(csv_headers)  # 写入 CSV 表头
-
-
-    # --- 数据提取及保存函数 ---
-    def extract_and_save_table_data(driver_instance):
-        """
-        提取当前页面表格中指定列的数据，并写入到CSV文件。
-        特别处理前区和后区号码，将多个 span 文本组合。
-        """
-        print("--- 正在提取当前页面数据 ---")
-        try:
-            # 等待表格行（tr）出现在DOM中
-            tr_list = WebDriverWait(driver_instance, 10).until(
-                EC.presence_of_all_elements_located((By.XPATH, "/html/body/div[2]/div[3]/div[3]/div/table/tbody/tr"))
-            )
-            if not tr_list:
-                print("当前页面未找到任何表格行数据。")
-                return
-
-            for i, tr in enumerate(tr_list):
-                row_data = []  # 用于存储当前行提取到的所有数据
-                # 按照 COLUMNS_TO_EXTRACT 定义的顺序和类型提取数据
-                for col_name, col_info in COLUMNS_TO_EXTRACT.items():
-                    td_index = col_info['td_index']
-                    data_type = col_info['type']
-
-                    try:
-                        # 构建 td 的相对 XPath，相对于当前的 tr
-                        td_xpath = f"./td[{td_index}]"
-                        td_element = tr.find_element(By.XPATH, td_xpath)
-
-                        if data_type == 'text':
-                            # 对于普通文本列，直接提取 td 的文本并去除首尾空白
-                            row_data.append(td_element.text.strip())
-                        elif data_type == 'red_balls':
-                            # 提取红球号码：查找 td[3] 下面所有 class='jqh' 的 span
-                            red_ball_spans = td_element.find_elements(By.XPATH, "./span[@class='jqh']")
-                            # 提取每个 span 的文本，过滤空值，然后用空格连接
-                            red_balls = [span.text.strip() for span in red_ball_spans if span.text.strip()]
-                            row_data.append(" ".join(red_balls))  # 例如："01 04 17 33 34"
-                        elif data_type == 'blue_balls':
-                            # 提取蓝球号码：查找 td[4] 下面所有 class='jql' 的 span
-                            blue_ball_spans = td_element.find_elements(By.XPATH, "./span[@class='jql']")
-                            # 提取每个 span 的文本，过滤空值，然后用空格连接
-                            blue_balls = [span.text.strip() for span in blue_ball_spans if span.text.strip()]
-                            row_data.append(" ".join(blue_balls))  # 例如："03 09"
-                        else:
-                            # 未知类型的数据处理
-                            row_data.append("N/A - 未知类型")
-
-                    except Exception as e:
-                        # 如果某列数据提取失败，打印错误并用 "N/A" 填充
-                        print(f"  > 提取行 {i + 1} 的 '{col_name}' 列数据时出错: {e}")
-                        row_data.append("N/A")
-
-                writer.writerow(row_data)  # 将当前行提取到的数据写入 CSV 文件
-                # print(f"已提取并保存行 {i+1}：{row_data}") # 调试时可以取消注释
-        except Exception as e:
-            print(f"加载表格数据时出错: {e}")
-
-
-    # --- 主流程：抓取初始页（第一页）数据 ---
-    extract_and_save_table_data(web)
-    print(f"初始页（第一页）数据已保存到 {CSV_FILE_NAME}")
-
-    # --- 循环点击分页按钮并抓取数据 ---
-    for page_index in PAGE_BUTTON_INDICES:
-        # 构造当前循环中要点击的页码按钮的 XPath
-        current_page_button_xpath = f'/html/body/div[2]/div[3]/div[3]/div/div[1]/ul/li[{page_index}]/a'
-        # 用于打印的按钮描述，方便追踪当前点击的是哪一页
-        button_description = f"第 {page_index - 1} 页"  # 假设 li[2] 是页码1
-
-        print(f"\n--- 尝试点击 {button_description} 按钮 ---")
+# 浏览器方式下每个等待条件的超时(秒)
+WAIT_TIMEOUT = 10
+# 浏览器操作出错时的页面截图目录(不纳入版本控制)
+SCREENSHOT_DIR = 'screenshots'
+# 并行分片时按 年份*ISSUES_PER_YEAR+年内序号 折算期号(大乐透每年约 150-157 期)，使跨年的各段期数大致相等
+ISSUES_PER_YEAR = 160
+
+# 开奖表格的数据行
+TABLE_ROWS_XPATH = "/html/body/div[2]/div[3]/div[3]/div/table/tbody/tr"
+# 在浏览器内一次读取整张表格：按 COLUMNS_TO_EXTRACT 的 [td 索引, 提取类型] 返回每行的各列文本；
+# 号码列只取 class 恰为 jqh(前区)/jql(后区) 的 span，以空格连接；缺少的单元格为 "N/A"
+EXTRACT_TABLE_JS = """
+const [xpath, spec] = arguments;
+const snapshot = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const ballClass = {red_balls: 'jqh', blue_balls: 'jql'};
+const rows = [];
+for (let i = 0; i < snapshot.snapshotLength; i++) {
+    const cells = Array.from(snapshot.snapshotItem(i).children).filter(el => el.tagName === 'TD');
+    rows.push(spec.map(([index, type]) => {
+        const td = cells[index - 1];
+        if (!td) return 'N/A';
+        if (type === 'text') return td.innerText.trim();
+        if (!(type in ballClass)) return 'N/A - 未知类型';
+        return Array.from(td.children)
+            .filter(el => el.tagName === 'SPAN' && el.className === ballClass[type])
+            .map(el => el.innerText.trim()).filter(Boolean).join(' ');
+    }));
+}
+return rows;
+"""
+# 开奖表格下方的分页条
+PAGINATION_XPATH = "/html/body/div[2]/div[3]/div[3]/div/div[1]/ul"
+# 读取分页状态：页码链接中的最大页码，以及“下一页”是否可点击
+PAGINATION_STATE_JS = """
+const ul = document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!ul) return {pages: 1, hasNext: false};
+let pages = 1, hasNext = false;
+for (const li of ul.querySelectorAll('li')) {
+    const text = li.innerText.trim();
+    if (/^\\d+$/.test(text)) pages = Math.max(pages, parseInt(text, 10));
+    const link = li.querySelector('a');
+    if (text.includes('下一页') && link && !li.classList.contains('disabled') && !link.classList.contains('disabled')
+            && link.getAttribute('aria-disabled') !== 'true') hasNext = true;
+}
+return {pages: pages, hasNext: hasNext};
+"""
+# 点击“下一页”
+NEXT_PAGE_JS = """
+const ul = document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const link = ul && Array.from(ul.querySelectorAll('li a')).find(a => a.innerText.includes('下一页'));
+if (link) link.click();
+return Boolean(link);
+"""
+
+
+def split_issue_range(start_issue, end_issue, parts):
+    """把期号区间均分为至多 parts 段，返回 [(起始期号, 结束期号), ...]；期号为 年份两位+年内序号三位"""
+    def ordinal(issue):
+        year, number = divmod(int(issue), 1000)
+        return year * ISSUES_PER_YEAR + min(number, ISSUES_PER_YEAR - 1)
+
+    def issue(value):
+        year, number = divmod(value, ISSUES_PER_YEAR)
+        return f"{year:02d}{number:03d}"
+
+    first, last = ordinal(start_issue), ordinal(end_issue)
+    parts = max(1, min(parts, last - first + 1))
+    bounds = [first + (last - first + 1) * i // parts for i in range(parts + 1)]
+    shards = [[issue(bounds[i]), issue(bounds[i + 1] - 1)] for i in range(parts)]
+    shards[0][0], shards[-1][1] = str(start_issue), str(end_issue)
+    return [tuple(shard) for shard in shards]
+
+
+def extract_table_rows(driver):
+    """等待表格行出现后，用一次 execute_script 读取当前页表格中指定的各列"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    WebDriverWait(driver, WAIT_TIMEOUT).until(EC.presence_of_all_elements_located((By.XPATH, TABLE_ROWS_XPATH)))
+    spec = [[col_info['td_index'], col_info['type']] for col_info in COLUMNS_TO_EXTRACT.values()]
+    return driver.execute_script(EXTRACT_TABLE_JS, TABLE_ROWS_XPATH, spec) or []
+
+
+def wait_for_table_change(driver, old_row, old_text):
+    """等待表格刷新：原第一行被替换(stale)或其内容改变，代替固定的 sleep"""
+    from selenium.common.exceptions import StaleElementReferenceException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    def changed(_):
         try:
-            # 1. 等待分页按钮出现在 DOM 中 (不检查可见性，因为可能需要滚动)
-            target_button = WebDriverWait(web, 10).until(
-                EC.presence_of_element_located((By.XPATH, current_page_button_xpath))
-            )
-
-            # 2. 执行 JavaScript 滚动到该元素，确保其在浏览器视图内可见
-            web.execute_script("arguments[0].scrollIntoView();", target_button)
-            print(f"页面已滚动到 {button_description} 按钮位置。")
-
-            time.sleep(1)  # 给页面短暂时间进行滚动和渲染动画
-
-            # 3. 再次等待元素变为可点击状态并执行点击操作
-            WebDriverWait(web, 10).until(
-                EC.element_to_be_clickable((By.XPATH, current_page_button_xpath))
-            ).click()
-            print(f"成功点击 {button_description} 按钮！")
-
-            time.sleep(2)  # 等待新页面加载数据。这里可替换为更精细的WebDriverWait条件，如等待表格第一行更新
-            extract_and_save_table_data(web)  # 提取并保存新页面的数据
-            print(f"{button_description} 数据已保存到 {CSV_FILE_NAME}")
-
-        except Exception as e:
-            # 如果点击分页按钮或抓取数据失败，打印错误并保存截图
-            print(f"点击 {button_description} 按钮或抓取数据时出错: {e}")
-            web.save_screenshot(f"error_page_{page_index}.png")  # 失败时保存截图
-            break  # 如果点击失败，通常意味着无法继续分页，所以中断循环
-
-# --- 脚本执行完毕 ---
-print("\n所有指定页码的数据提取完毕。")
-print(f"最终数据已全部保存到文件: {CSV_FILE_NAME}")
-print("浏览器将保持打开状态，直到你在控制台按下回车键...")
-input()  # 程序暂停，等待用户在控制台按下回车键
-web.quit()  # 用户按下回车后，关闭浏览器
-print("浏览器已关闭。")
\ No newline at end of file
+            return old_row.text != old_text
+        except StaleElementReferenceException:
+            return True
+
+    WebDriverWait(driver, WAIT_TIMEOUT, poll_frequency=0.1).until(changed)
+
+
+def first_table_row(driver):
+    """返回 (表格第一行元素, 其文本)；表格尚未出现时为 (None, None)"""
+    from selenium.webdriver.common.by import By
+
+    rows = driver.find_elements(By.XPATH, TABLE_ROWS_XPATH + '[1]')
+    return (rows[0], rows[0].text) if rows else (None, None)
+
+
+def browse_draws(start_issue, end_issue, headless=True):
+    """启动一个 Chrome，在开奖表格页面查询期号区间并自动翻完全部分页，返回表格行"""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver import Chrome, ChromeOptions
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    label = f"[{start_issue}-{end_issue}]"
+    options = ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1280,2000')
+    print(f"{label} 正在启动 Chrome 浏览器{'(无界面)' if headless else ''}...")
+    web = Chrome(options=options)
+    wait = WebDriverWait(web, WAIT_TIMEOUT)
+    rows, page = [], 0
+    try:
+        web.get(URL)
+        print(f"{label} 已打开网页: {URL}")
+
+        # --- 前置操作：展开查询条件，输入期号范围后点击查询 ---
+        # 每一步都等待下一个元素可用，不再固定 sleep
+        wait.until(EC.element_to_be_clickable((By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[1]'))).click()
+        wait.until(EC.element_to_be_clickable(
+            (By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[2]/div[1]/div[2]'))).click()
+        wait.until(EC.visibility_of_element_located(
+            (By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[2]/div[3]/div[1]/input[1]'))).send_keys(start_issue)
+        wait.until(EC.visibility_of_element_located(
+            (By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[2]/div[3]/div[1]/input[2]'))).send_keys(end_issue)
+
+        old_row, old_text = first_table_row(web)
+        wait.until(EC.element_to_be_clickable(
+            (By.XPATH, '/html/body/div[2]/div[3]/div[2]/div[1]/div/div[2]/div[3]/div[2]/div[2]/div'))).click()
+        if old_row is not None:
+            try:
+                wait_for_table_change(web, old_row, old_text)
+            except TimeoutException:
+                # 查询结果的第一行恰好与默认显示相同时表格不会变化
+                pass
+
+        # --- 逐页提取，直到“下一页”不可点击 ---
+        while True:
+            page += 1
+            page_rows = extract_table_rows(web)
+            rows.extend(page_rows)
+            state = web.execute_script(PAGINATION_STATE_JS, PAGINATION_XPATH)
+            print(f"{label} 第 {page}/{max(page, state['pages'])} 页: {len(page_rows)} 行")
+            if not page_rows or not state['hasNext']:
+                break
+            old_row, old_text = first_table_row(web)
+            web.execute_script(NEXT_PAGE_JS, PAGINATION_XPATH)
+            wait_for_table_change(web, old_row, old_text)
+    except Exception as e:
+        # 出错时保留已提取的行并保存截图
+        print(f"{label} 第 {page} 页操作出错: {e}")
+        os.makedirs(SCREENSHOT_DIR, exist_ok=True)
+        web.save_screenshot(os.path.join(SCREENSHOT_DIR, f"error_{start_issue}_{end_issue}_page_{page}.png"))
+    finally:
+        web.quit()
+    return rows
+
+
+def crawl_with_browser(start_issue=START_ISSUE, end_issue=END_ISSUE, headless=True, workers=1):
+    """浏览器方式：在开奖表格页面查询期号范围并读取全部分页；workers > 1 时把期号区间分片，由多个浏览器并行抓取"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    start = time.perf_counter()
+    shards = split_issue_range(start_issue, end_issue, workers)
+    if len(shards) > 1:
+        print(f"期号区间分为 {len(shards)} 段并行抓取: {shards}")
+    with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+        results = list(executor.map(lambda shard: browse_draws(*shard, headless=headless), shards))
+
+    rows = caipiao_draw_client.unique_rows(row for shard_rows in results for row in shard_rows)
+    added, updated = caipiao_draw_store.upsert(rows, CSV_FILE_NAME)
+    print(f"\n共获取 {len(rows)} 期，{CSV_FILE_NAME} 新增 {added} 期、更新 {updated} 期 "
+          f"(耗时 {time.perf_counter() - start:.2f}s)")
+    return rows
+
+
+def crawl_with_http(start_issue=START_ISSUE, end_issue=END_ISSUE, concurrency=4, base_url=None):
+    """直接请求开奖表格背后的数据接口，在连接池上并发获取各分页并按期号合并到 CSV，不需要浏览器"""
+    start = time.perf_counter()
+    rows = caipiao_draw_client.fetch_draws(start_issue, end_issue, concurrency=concurrency,
+                                           base_url=base_url or caipiao_draw_client.DRAW_API_URL)
+    added, updated = caipiao_draw_store.upsert(rows, CSV_FILE_NAME)
+    print(f"共获取 {len(rows)} 期，{CSV_FILE_NAME} 新增 {added} 期、更新 {updated} 期 "
+          f"(耗时 {time.perf_counter() - start:.2f}s)")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="大乐透开奖数据爬取；默认直接请求数据接口，结果按期号合并到 CSV")
+    parser.add_argument('--start', default=START_ISSUE, help="起始期号")
+    parser.add_argument('--end', default=END_ISSUE, help="结束期号")
+    parser.add_argument('--output', default=CSV_FILE_NAME, help="输出CSV文件")
+    parser.add_argument('--concurrency', type=int, default=4, help="并发请求数")
+    parser.add_argument('--base-url', default=None, help="数据接口地址(测试时指向本地桩服务器)")
+    parser.add_argument('--browser', action='store_true', help="改用 Chrome 浏览器逐页读取表格(原方式)")
+    parser.add_argument('--workers', type=int, default=1, help="浏览器方式下并行的浏览器数，期号区间按数量分片")
+    parser.add_argument('--headed', action='store_true', help="浏览器方式下显示浏览器窗口(默认无界面运行)")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('update', help="增量更新：补抓缺失期号，并只获取 CSV 中最新一期之后的开奖")
+    args = parser.parse_args()
+
+    CSV_FILE_NAME = args.output
+    if args.command == 'update':
+        caipiao_draw_store.update_store(CSV_FILE_NAME, args.concurrency,
+                                        args.base_url or caipiao_draw_client.DRAW_API_URL)
+    elif args.browser:
+        crawl_with_browser(args.start, args.end, headless=not args.headed, workers=args.workers)
+    else:
+        crawl_with_http(args.start, args.end, args.concurrency, args.base_url)
@@ -0,0 +1,115 @@
+import csv
+import json
+import random
+import re
+import time
+
+# --- 配置项 ---
+# 中彩网开奖表格背后的数据接口(JSONP)，按期号区间分页查询；lotteryId 281 为超级大乐透
+DRAW_API_URL = "https://jc.zhcw.com/port/client_json.php"
+LOTTERY_ID = '281'
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Referer': 'https://www.zhcw.com/kjxx/dlt/'
+}
+PAGE_SIZE = 100  # 每次请求的期数
+# CSV 列与接口字段的对应关系，列顺序与 caipiao_daletou.csv 一致
+CSV_HEADERS = ['期号', '开奖日期', '前区号码', '后区号码', '全国销量', '奖池滚存']
+
+JSONP_PATTERN = re.compile(r'^\s*[\w$.]*\((.*)\)\s*;?\s*$', re.S)
+
+
+def create_session(pool_size=4):
+    """创建共享连接池的会话，复用TCP/TLS连接"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def parse_jsonp(text):
+    """解析 JSONP(callback(...)) 或纯 JSON 响应"""
+    match = JSONP_PATTERN.match(text)
+    return json.loads(match.group(1) if match else text)
+
+
+def draw_row(item):
+    """把接口中的一期开奖记录转换为 CSV 行，开奖日期附带星期，如 2025-06-30（一）"""
+    date = item.get('openTime', '')
+    if item.get('week'):
+        date = f"{date}（{item['week']}）"
+    return [item.get('issue', ''), date, item.get('frontWinningNum', ''), item.get('backWinningNum', ''),
+            item.get('saleMoney', ''), item.get('prizePoolMoney', '')]
+
+
+def fetch_draw_page(session, start_issue, end_issue, page_num, page_size=PAGE_SIZE, base_url=DRAW_API_URL,
+                    max_retries=3, backoff=0.5, timeout=10):
+    """请求一页开奖数据，返回 (本页记录, 总页数)；失败时按带随机抖动的指数退避重试"""
+    import requests
+
+    callback = f"jQuery{random.randint(10 ** 15, 10 ** 16 - 1)}_{int(time.time() * 1000)}"
+    params = {
+        'callback': callback, 'transactionType': '10001001', 'lotteryId': LOTTERY_ID,
+        'issueCount': '', 'startIssue': str(start_issue), 'endIssue': str(end_issue),
+        'startDate': '', 'endDate': '', 'type': '1',
+        'pageNum': str(page_num), 'pageSize': str(page_size),
+        'tt': str(random.random()), '_': str(int(time.time() * 1000)),
+    }
+    for attempt in range(max_retries + 1):
+        try:
+            response = session.get(base_url, params=params, timeout=timeout)
+            response.raise_for_status()
+            data = parse_jsonp(response.text)
+            if data.get('resCode') not in (None, '000000'):
+                raise ValueError(f"接口返回错误: {data.get('resCode')} {data.get('message')}")
+            return data.get('data') or [], int(data.get('pages') or 1)
+        except (requests.RequestException, ValueError) as e:
+            if attempt == max_retries:
+                raise
+            print(f"  第 {page_num} 页请求失败 ({e})，第 {attempt + 1} 次重试...")
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def fetch_draws(start_issue, end_issue, page_size=PAGE_SIZE, concurrency=4, base_url=DRAW_API_URL, session=None):
+    """获取 [start_issue, end_issue] 期号区间的全部开奖记录，按期号降序返回 CSV 行
+
+    先取第一页得到总页数，其余分页在共享连接池上并发获取
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    own_session = session is None
+    if own_session:
+        session = create_session(pool_size=concurrency)
+    try:
+        items, pages = fetch_draw_page(session, start_issue, end_issue, 1, page_size, base_url)
+        print(f"期号 {start_issue}-{end_issue}: 共 {pages} 页")
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = executor.map(lambda page: fetch_draw_page(session, start_issue, end_issue, page, page_size,
+                                                                base_url)[0], range(2, pages + 1))
+            for page_items in results:
+                items.extend(page_items)
+    finally:
+        if own_session:
+            session.close()
+
+    # 分页边界上数据更新时可能重复
+    return unique_rows(map(draw_row, items))
+
+
+def unique_rows(rows):
+    """按期号去重并降序排列 CSV 行；期号不是数字的行(如提取失败的 N/A)被丢弃"""
+    rows = {row[0]: row for row in rows if str(row[0]).isdigit()}
+    return [rows[issue] for issue in sorted(rows, key=int, reverse=True)]
+
+
+def write_csv(rows, path):
+    """写入带表头的 CSV 文件"""
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file, lineterminator='\n')  # 与现有 caipiao_daletou.csv 一致使用 LF 换行
+        writer.writerow(CSV_HEADERS)
+        writer.writerows(rows)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# 大乐透：前区 35 选 5，后区 12 选 2
+FRONT_BALLS, FRONT_PICKS = 35, 5
+BACK_BALLS, BACK_PICKS = 12, 2
+WEEKDAYS = ['周一', '周三', '周六']
+
+
+def ball_matrix(values, n_balls):
+    """把 "01 04 17 33 34" 形式的号码串转换为 n_draws × n_balls 的 uint8 矩阵，第 j 列为 1 表示号码 j+1 开出
+
+    空值为全 0 行；含非数字(如 'N/A')或超出 1-n_balls 范围号码的期次视为不完整，同样置为全 0 行，可用 complete_rows 筛掉
+    """
+    tokens = [str(value).split() if pd.notna(value) else [] for value in values]
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    numbers = pd.to_numeric(pd.Series([n for draw in tokens for n in draw], dtype=object),
+                            errors='coerce').to_numpy(dtype=np.float64)
+    rows = np.repeat(np.arange(len(tokens)), lengths)
+    invalid = ~((numbers >= 1) & (numbers <= n_balls) & (numbers == np.floor(numbers)))
+    matrix = np.zeros((len(tokens), n_balls), dtype=np.uint8)
+    matrix[rows[~invalid], numbers[~invalid].astype(np.int64) - 1] = 1
+    matrix[rows[invalid]] = 0
+    return matrix
+
+
+def complete_rows(matrix, picks):
+    """开出号码数恰为 picks 的期次为 True；空值、含无效号码的期次为 False"""
+    return matrix.sum(axis=1, dtype=np.int32) == picks
+
+
+def draw_matrices(df):
+    """由开奖数据的 前区号码/后区号码 列构建 (前区矩阵, 后区矩阵)，行顺序与 df 一致"""
+    return ball_matrix(df['前区号码'], FRONT_BALLS), ball_matrix(df['后区号码'], BACK_BALLS)
+
+
+def ball_counts(matrix, mask=None):
+    """各号码的出现次数；mask 为布尔数组时只统计选中的期次"""
+    if mask is not None:
+        matrix = matrix[np.asarray(mask, dtype=bool)]
+    return matrix.sum(axis=0, dtype=np.int32).astype(np.int64)
+
+
+def group_counts(matrix, groups, labels=WEEKDAYS):
+    """按分组(如开奖星期)统计各号码出现次数，返回 行为号码、列为分组 的 DataFrame"""
+    groups = np.asarray(groups, dtype=object)
+    return pd.DataFrame({label: ball_counts(matrix, groups == label) for label in labels},
+                        index=pd.RangeIndex(1, matrix.shape[1] + 1, name='号码'))
+
+
+def windowed_counts(matrix, window):
+    """滑动窗口计数：第 i 行为截至第 i 期(含)的最近 window 期内各号码的出现次数，前 window-1 行为不足一个窗口的部分计数"""
+    if window < 1:
+        raise ValueError(f"窗口期数必须 >= 1: {window}")
+    # 沿期次方向累加时先转置为按号码连续存放，比直接沿 axis=0 累加快数倍
+    cumulative = np.cumsum(np.ascontiguousarray(matrix.T), axis=1, dtype=np.int32)
+    counts = cumulative.copy()
+    counts[:, window:] -= cumulative[:, :-window]
+    return counts.T
+
+
+def counts_frame(counts):
+    """号码计数转换为 号码/出现频率 两列的 DataFrame"""
+    return pd.DataFrame({'号码': np.arange(1, len(counts) + 1), '出现频率': counts})
+
+
+def pack_bits(matrix):
+    """把号码矩阵的每一行压缩为一个 uint64 位掩码，第 j 位对应号码 j+1"""
+    packed = np.packbits(matrix.astype(bool), axis=1, bitorder='little')
+    padded = np.zeros((len(matrix), 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view('<u8').ravel()
+
+
+def unpack_bits(masks, n_balls):
+    """pack_bits 的逆操作"""
+    masks = np.ascontiguousarray(masks, dtype='<u8')
+    return np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')[:, :n_balls]
+
+
+def simulate_draws(n_draws, n_balls, picks, seed=0, chunk_size=200_000):
+    """模拟 n_draws 期均匀随机开奖，返回号码矩阵；分块生成以限制随机数组的内存"""
+    rng = np.random.default_rng(seed)
+    matrix = np.zeros((n_draws, n_balls), dtype=np.uint8)
+    for start in range(0, n_draws, chunk_size):
+        stop = min(start + chunk_size, n_draws)
+        keys = rng.random((stop - start, n_balls), dtype=np.float32)
+        picked = np.argpartition(keys, picks, axis=1)[:, :picks]
+        matrix[np.arange(start, stop)[:, None], picked] = 1
+    return matrix
@@ -0,0 +1,118 @@
+import csv
+import datetime
+import os
+
+import caipiao_draw_client
+
+# 开奖记录库：即 caipiao_daletou.csv，以期号为键，按期号降序保存；只增补或更新，不删除已有的期次
+STORE_FILE = 'caipiao_daletou.csv'
+# 大乐透首期
+FIRST_ISSUE = '07001'
+
+
+def issue_str(issue):
+    """期号统一为五位字符串，如 7001 -> 07001"""
+    return f"{int(issue):05d}"
+
+
+def load_store(path=STORE_FILE):
+    """读取开奖记录库，返回 {期号: CSV 行}；文件不存在时为空"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return {issue_str(row[0]): row for row in reader if row and row[0].isdigit()}
+
+
+def upsert(rows, path=STORE_FILE):
+    """按期号合并行到记录库：新期次追加，内容变化的期次更新，其余不动；返回 (新增数, 更新数)
+
+    没有任何变化时不重写文件，重复运行是幂等的；写入先落到临时文件再替换，中途失败不会损坏原文件
+    """
+    store = load_store(path)
+    added = updated = 0
+    for row in rows:
+        if not str(row[0]).isdigit():
+            continue
+        row = [issue_str(row[0])] + [str(value) for value in row[1:]]
+        previous = store.get(row[0])
+        if previous == row:
+            continue
+        if previous is None:
+            added += 1
+        else:
+            updated += 1
+        store[row[0]] = row
+    if added or updated or not os.path.exists(path):
+        caipiao_draw_client.write_csv(caipiao_draw_client.unique_rows(store.values()), path + '.tmp')
+        os.replace(path + '.tmp', path)
+    return added, updated
+
+
+def year_complete(year, last_date):
+    """某年最后一条记录是否已是该年的最后一期：每周一、三、六开奖，相邻两期最多相隔 3 天，最后一期应在 12 月 24 日之后"""
+    try:
+        return datetime.date.fromisoformat(str(last_date)[:10]) >= datetime.date(2000 + year, 12, 24)
+    except ValueError:
+        return False
+
+
+def find_gaps(store):
+    """检查记录库 {期号: CSV 行} 的期号连续性，返回缺失的期号区间 [(起始期号, 结束期号), ...]
+
+    期号为 年份两位+年内序号三位，每年从 001 连续编号。最早一期之后，以下都算缺失：年内相邻期号之间的空缺、
+    某年第一条不是 001、最早与最新年份之间整年没有记录(查询 YY001-YY999)、最新年份之前某年的最后一条记录
+    早于年末(查询该年剩余的期号)。最新年份末尾的期次由 update 从最新一期向后查询覆盖
+    """
+    by_year = {}
+    for issue in map(int, store):
+        by_year.setdefault(issue // 1000, []).append(issue % 1000)
+    if not by_year:
+        return []
+    first_year, last_year = min(by_year), max(by_year)
+    gaps = []
+    for year in range(first_year, last_year + 1):
+        if year not in by_year:
+            gaps.append((issue_str(year * 1000 + 1), issue_str(year * 1000 + 999)))
+            continue
+        numbers = sorted(set(by_year[year]))
+        expected = numbers[0] if year == first_year else 1
+        for number in numbers:
+            if number > expected:
+                gaps.append((issue_str(year * 1000 + expected), issue_str(year * 1000 + number - 1)))
+            expected = number + 1
+        last_row = store[issue_str(year * 1000 + numbers[-1])]
+        if year < last_year and not year_complete(year, last_row[1]):
+            gaps.append((issue_str(year * 1000 + expected), issue_str(year * 1000 + 999)))
+    return gaps
+
+
+def update_store(path=STORE_FILE, concurrency=4, base_url=caipiao_draw_client.DRAW_API_URL, today=None):
+    """增量更新记录库：补抓缺失的期号区间，再只抓最新一期之后的开奖；返回 (新增数, 更新数)"""
+    store = load_store(path)
+    year_end = issue_str(((today or datetime.date.today()).year % 100) * 1000 + 999)
+    if store:
+        newest = max(store, key=int)
+        gaps = find_gaps(store)
+        if gaps:
+            print(f"记录库缺失 {len(gaps)} 段期号，将重新获取: {gaps}")
+        ranges = gaps + [(issue_str(int(newest) + 1), year_end)]
+        print(f"记录库共 {len(store)} 期，最新一期 {newest}")
+    else:
+        ranges = [(FIRST_ISSUE, year_end)]
+        print(f"记录库 {path} 为空，获取全部开奖历史")
+
+    rows = []
+    session = caipiao_draw_client.create_session(pool_size=concurrency)
+    try:
+        for start_issue, end_issue in ranges:
+            rows.extend(caipiao_draw_client.fetch_draws(start_issue, end_issue, concurrency=concurrency,
+                                                        base_url=base_url, session=session))
+    finally:
+        session.close()
+
+    added, updated = upsert(rows, path)
+    remaining = find_gaps(load_store(path))
+    print(f"新增 {added} 期，更新 {updated} 期" + (f"；仍缺失期号: {remaining}" if remaining else "；期号连续"))
+    return added, updated
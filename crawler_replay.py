@@ -0,0 +1,293 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import random
+import runpy
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# 录制的响应：cassettes/<名称>/index.json 记录请求到响应的映射，响应体单独保存在 bodies/ 下
+CASSETTE_DIR = 'cassettes'
+# 限流与服务端错误属于临时状态，不录制，避免回放时固化一次偶发失败
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+
+def request_key(method, url):
+    """请求的匹配键：方法 + 去掉片段、查询参数排序后的URL"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}" + (f"?{query}" if query else '')
+
+
+class Cassette:
+    """一组录制的 HTTP 响应，按请求键读写，可在多线程中录制"""
+
+    def __init__(self, name, directory=CASSETTE_DIR):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self.index_file = os.path.join(self.path, 'index.json')
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def _body_path(self, key):
+        return os.path.join(self.path, 'bodies', hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + '.bin')
+
+    def record(self, method, url, status, content_type, body):
+        """保存一次响应；临时错误不保存，已录制的成功响应不会被失败响应覆盖"""
+        if status in TRANSIENT_STATUS:
+            return False
+        key = request_key(method, url)
+        path = self._body_path(key)
+        with self._lock:
+            previous = self.entries.get(key)
+            if previous is not None and previous['status'] < 400 <= status:
+                return False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(body)
+            os.replace(path + '.tmp', path)
+            self.entries[key] = {'status': status, 'content_type': content_type, 'bytes': len(body),
+                                 'body': os.path.relpath(path, self.path),
+                                 'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+        return True
+
+    def lookup(self, method, url):
+        """返回 (响应信息, 响应体)；未录制时返回 None"""
+        entry = self.entries.get(request_key(method, url))
+        if entry is None:
+            return None
+        with open(os.path.join(self.path, entry['body']), 'rb') as f:
+            return entry, f.read()
+
+    def save(self):
+        """写入索引文件"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(self.index_file + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(self.index_file + '.tmp', self.index_file)
+
+
+@contextlib.contextmanager
+def recording(cassette):
+    """在 with 块内，所有经由 requests 发出的请求照常访问真实站点，同时把响应录制到 cassette"""
+    import requests
+
+    original = requests.Session.request
+
+    def request(session, method, url, *args, **kwargs):
+        response = original(session, method, url, *args, **kwargs)
+        cassette.record(method, url, response.status_code, response.headers.get('Content-Type'), response.content)
+        return response
+
+    requests.Session.request = request
+    try:
+        yield cassette
+    finally:
+        requests.Session.request = original
+        cassette.save()
+
+
+class TokenBucket:
+    """令牌桶限流：每秒补充 rate 个令牌，最多积累 burst 个"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """取一个令牌，返回 0；令牌不足时返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """回放录制的响应；路径为 /<协议>/<主机><原路径>，按配置注入延迟、限流(429)和随机错误(503)"""
+    cassette = None
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    bucket = None
+    rng = None
+    stats = None
+    lock = None
+    protocol_version = 'HTTP/1.1'
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def _send(self, status, body, content_type='text/plain; charset=utf-8', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _replay(self):
+        self._count('requests')
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        scheme, _, rest = self.path.lstrip('/').partition('/')
+        url = f"{scheme}://{rest}"
+
+        if self.bucket is not None:
+            wait = self.bucket.take()
+            if wait:
+                self._count('throttled')
+                self._send(429, b'throttled', headers={'Retry-After': f'{wait:.3f}'})
+                return
+        with self.lock:
+            fail = self.rng.random() < self.error_rate
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+        time.sleep(delay)
+        if fail:
+            self._count('errors')
+            self._send(503, b'injected error')
+            return
+
+        found = self.cassette.lookup(self.command, url)
+        if found is None:
+            self._count('missing')
+            self._send(404, f'未录制的请求: {request_key(self.command, url)}'.encode('utf-8'))
+            return
+        entry, body = found
+        self._count('served')
+        self._send(entry['status'], body, entry['content_type'] or 'application/octet-stream')
+
+    do_GET = do_POST = do_HEAD = _replay
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_replay_server(cassette, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None, burst=None, seed=0):
+    """在后台线程启动回放服务器，返回 server；server.stats 为各类响应的计数
+
+    latency/jitter 为每次响应的固定与随机附加延迟(秒)，error_rate 为返回 503 的概率，
+    rate_limit 为每秒允许的请求数(超出返回 429 与 Retry-After)，seed 固定随机错误的序列
+    """
+    stats = dict.fromkeys(['requests', 'served', 'throttled', 'errors', 'missing'], 0)
+    handler = type('Handler', (ReplayHandler,), {
+        'cassette': cassette, 'latency': latency, 'jitter': jitter, 'error_rate': error_rate,
+        'bucket': TokenBucket(rate_limit, burst) if rate_limit else None,
+        'rng': random.Random(seed), 'stats': stats, 'lock': threading.Lock(),
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def replay_url(server, url):
+    """真实URL在回放服务器上对应的地址；URL中的 {} 占位符(如分页模板)原样保留"""
+    parts = urlsplit(url)
+    return (f"http://127.0.0.1:{server.server_port}/{parts.scheme}/{parts.netloc}{parts.path}"
+            + (f"?{parts.query}" if parts.query else ''))
+
+
+@contextlib.contextmanager
+def replaying(server):
+    """在 with 块内，所有经由 requests 发出的请求都改发到回放服务器"""
+    import requests
+
+    original = requests.Session.request
+
+    def request(session, method, url, *args, **kwargs):
+        return original(session, method, replay_url(server, url), *args, **kwargs)
+
+    requests.Session.request = request
+    try:
+        yield server
+    finally:
+        requests.Session.request = original
+
+
+def run_script(script, script_args):
+    """以 __main__ 身份运行爬虫脚本，返回耗时(秒)；脚本调用 sys.exit 时不中断外层流程"""
+    argv = sys.argv
+    sys.argv = [script] + list(script_args)
+    start = time.perf_counter()
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"{script} 以状态 {e.code} 退出")
+    finally:
+        sys.argv = argv
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="爬虫的 HTTP 录制/回放：录制一次真实响应，之后在本地回放服务器上离线、可重复地运行爬虫",
+        epilog="示例: python crawler_replay.py record weather -- dalian_weather_data.py\n"
+               "      python crawler_replay.py replay weather --latency 0.1 --error-rate 0.05 -- dalian_weather_data.py",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="运行爬虫并录制其全部 HTTP 响应")
+    replay_parser = subparsers.add_parser('replay', help="在回放服务器上运行爬虫")
+    serve_parser = subparsers.add_parser('serve', help="只启动回放服务器，直到 Ctrl+C")
+    list_parser = subparsers.add_parser('list', help="列出录制的请求")
+    for sub in [record_parser, replay_parser, serve_parser, list_parser]:
+        sub.add_argument('cassette', help=f"录制名称({CASSETTE_DIR} 下的目录名)")
+    for sub in [replay_parser, serve_parser]:
+        sub.add_argument('--latency', type=float, default=0.0, help="每次响应的固定延迟(秒)")
+        sub.add_argument('--jitter', type=float, default=0.0, help="每次响应附加的 0~jitter 秒随机延迟")
+        sub.add_argument('--error-rate', type=float, default=0.0, help="随机返回 503 的概率")
+        sub.add_argument('--rate-limit', type=float, default=None, help="每秒允许的请求数，超出返回 429")
+        sub.add_argument('--burst', type=float, default=None, help="限流的突发上限，默认等于每秒请求数")
+        sub.add_argument('--seed', type=int, default=0, help="随机错误与延迟的种子")
+    for sub in [record_parser, replay_parser]:
+        sub.add_argument('script', help="爬虫脚本")
+        sub.add_argument('script_args', nargs=argparse.REMAINDER, help="传给爬虫脚本的参数")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette)
+    if args.command == 'list':
+        for key, entry in sorted(cassette.entries.items()):
+            print(f"{entry['status']}  {entry['bytes']:>9}B  {entry['recorded_at']}  {key}")
+        print(f"共 {len(cassette.entries)} 个响应")
+    elif args.command == 'record':
+        with recording(cassette):
+            elapsed = run_script(args.script, args.script_args)
+        print(f"\n录制完成: {cassette.path} 共 {len(cassette.entries)} 个响应，耗时 {elapsed:.2f}s")
+    else:
+        if not cassette.entries:
+            raise SystemExit(f"录制 {cassette.path} 不存在或为空，请先运行 record")
+        server = start_replay_server(cassette, args.latency, args.jitter, args.error_rate, args.rate_limit,
+                                     args.burst, args.seed)
+        try:
+            if args.command == 'serve':
+                print(f"回放服务器: http://127.0.0.1:{server.server_port}/<协议>/<主机>/<路径> (Ctrl+C 结束)")
+                with contextlib.suppress(KeyboardInterrupt):
+                    threading.Event().wait()
+            else:
+                with replaying(server):
+                    elapsed = run_script(args.script, args.script_args)
+                print(f"\n回放完成: 耗时 {elapsed:.2f}s, 请求统计 {server.stats}")
+        finally:
+            server.shutdown()
@@ -0,0 +1,375 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+import hurun_cache
+import hurun_spider
+
+# 本地桩服务器模拟的榜单总人数，与真实榜单一致
+STUB_TOTAL = 1094
+
+# 规模基准：合成榜单的行数，以及结果保存目录(按版本标签保存，版本间直接 diff)
+SCALE_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+BENCHMARK_DIR = 'benchmarks'
+# 对比两次结果时，耗时或内存增长超过该比例视为回归；低于分辨率的数值按分辨率计算，避免毫秒级抖动误报
+REGRESSION_THRESHOLD = 1.2
+METRIC_RESOLUTION = {'time_s': 0.02, 'peak_mem_mb': 1.0}
+
+
+def make_stub_row(rank):
+    """构造与 HsRankDetailsList 接口结构一致的一条记录"""
+    return {
+        'hs_Rank_Rich_Ranking': rank,
+        'hs_Rank_Rich_Wealth': round(5000.0 / rank, 1),
+        'hs_Rank_Rich_ComName_Cn': f'公司{rank}',
+        'hs_Rank_Rich_Industry_Cn': ['社交媒体', '饮料、医疗保健', '电子商务', '房地产'][rank % 4],
+        'hs_Character': [{
+            'hs_Character_Fullname_Cn': f'富豪{rank}',
+            'hs_Character_Age': 40 + rank % 40,
+            'hs_Character_BirthPlace_Cn': ['中国-福建-龙岩', '中国-浙江-绍兴', '中国-广东-深圳'][rank % 3],
+            'hs_Character_Gender': '先生' if rank % 5 else '女士'
+        }]
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """按 offset/limit 返回 rows 的桩接口，latency 模拟网络往返时间；totals 可按榜单ID(num)设置总人数"""
+    latency = 0.2
+    total = STUB_TOTAL
+    totals = {}
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['200'])[0])
+        total = self.totals.get(query.get('num', [''])[0], self.total)
+        time.sleep(self.latency)
+
+        rows = [make_stub_row(rank) for rank in range(offset + 1, min(offset + limit, total) + 1)]
+        body = json.dumps({'total': total, 'rows': rows}, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def stub_list_url(server, list_id=hurun_spider.LIST_ID):
+    """桩服务器上某个榜单的分页接口地址模板"""
+    return f"http://127.0.0.1:{server.server_port}/zh-CN/Rank/HsRankDetailsList?num={list_id}&search=&offset={{}}&limit=200"
+
+
+def start_stub_server(latency=0.2, totals=None):
+    """在后台线程启动桩服务器，返回 (server, base_url)"""
+    handler = type('Handler', (StubHandler,), {'latency': latency, 'totals': totals or {}})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stub_list_url(server)
+
+
+def fetch_sequential(base_url, offsets):
+    """原始实现：逐页串行，每页新建连接"""
+    rows = []
+    for offset in offsets:
+        response = requests.get(base_url.format(offset), headers=hurun_spider.HEADERS, timeout=30)
+        response.raise_for_status()
+        rows.extend(hurun_spider.parse_rows(response.json()))
+    return rows
+
+
+def fetch_concurrent(base_url, offsets, concurrency):
+    """连接池 + 并发获取，响应流式写入临时目录后逐条解码"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        def dest(offset):
+            return os.path.join(tmp_dir, f'offset_{offset}.json')
+
+        sizes, errors = hurun_spider.fetch_pages(offsets, base_url=base_url, concurrency=concurrency, dest=dest)
+        if errors:
+            raise RuntimeError(f"桩服务器返回错误: {errors}")
+        rows = []
+        for offset in sorted(sizes):
+            rows.extend(hurun_spider.iter_page_records(dest(offset)))
+    return rows
+
+
+def run_fetch_benchmark(latency=0.2, concurrency=4, repeat=3):
+    """对比串行与并发分页获取的耗时"""
+    server, base_url = start_stub_server(latency)
+    offsets = [page * hurun_spider.PAGE_SIZE for page in range(hurun_spider.PAGE_COUNT)]
+    try:
+        results = {}
+        for name, func in [('串行', lambda: fetch_sequential(base_url, offsets)),
+                           (f'并发({concurrency})', lambda: fetch_concurrent(base_url, offsets, concurrency))]:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = func()
+                timings.append(time.perf_counter() - start)
+            assert len(rows) == STUB_TOTAL, f"{name} 获取记录数不符: {len(rows)}"
+            results[name] = min(timings)
+            print(f"{name}: 最佳耗时 {results[name]:.3f}s ({repeat} 次)")
+    finally:
+        server.shutdown()
+
+    baseline, concurrent = results.values()
+    print(f"加速比: {baseline / concurrent:.2f}x")
+    return results
+
+
+def recorded_offsets(cassette, list_id=hurun_spider.LIST_ID):
+    """录制中某榜单已有的分页偏移量"""
+    offsets = []
+    for key, entry in cassette.entries.items():
+        query = parse_qs(urlparse(key.split(' ', 1)[1]).query)
+        if entry['status'] == 200 and query.get('num') == [list_id] and 'offset' in query:
+            offsets.append(int(query['offset'][0]))
+    return sorted(offsets)
+
+
+def run_replay_benchmark(cassette_name, concurrencies=(1, 2, 4, 8), latency=0.2, error_rate=0.0, rate_limit=None,
+                         repeat=3, seed=0, list_id=hurun_spider.LIST_ID):
+    """在回放服务器上按不同并发度获取录制的榜单分页，报告耗时、重试次数和服务端的限流/错误计数
+
+    每次运行都启动新的回放服务器并使用同一随机种子，注入的错误序列可重复
+    """
+    import crawler_replay
+    import hurun_metrics
+
+    cassette = crawler_replay.Cassette(cassette_name)
+    offsets = recorded_offsets(cassette, list_id)
+    if not offsets:
+        raise SystemExit(f"录制 {cassette.path} 中没有榜单 {list_id} 的分页，请先运行 crawler_replay.py record")
+    print(f"回放 {len(offsets)} 页 (延迟 {latency}s, 错误率 {error_rate:.0%}, "
+          f"限流 {f'{rate_limit}/s' if rate_limit else '无'})")
+
+    results = {}
+    for concurrency in concurrencies:
+        runs = []
+        for _ in range(repeat):
+            server = crawler_replay.start_replay_server(cassette, latency, error_rate=error_rate,
+                                                        rate_limit=rate_limit, seed=seed)
+            report = hurun_metrics.RunReport('benchmark_replay', trace_memory=False)
+            try:
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    start = time.perf_counter()
+                    sizes, errors = hurun_spider.fetch_pages(
+                        offsets, base_url=crawler_replay.replay_url(server, hurun_spider.list_url(list_id)),
+                        concurrency=concurrency, dest=lambda offset: os.path.join(tmp_dir, f'offset_{offset}.json'),
+                        report=report)
+                    elapsed = time.perf_counter() - start
+            finally:
+                server.shutdown()
+            runs.append({'time_s': round(elapsed, 4), 'failed': len(errors), 'retries': report.summary()['retries'],
+                         **{name: server.stats[name] for name in ['requests', 'throttled', 'errors']}})
+        best = min(runs, key=lambda run: run['time_s'])
+        results[concurrency] = best
+        print(f"并发 {concurrency}: 最佳耗时 {best['time_s']:.3f}s, 重试 {best['retries']} 次, 失败 {best['failed']} 页, "
+              f"请求 {best['requests']} (限流 {best['throttled']}, 注入错误 {best['errors']})")
+    return results
+
+
+def make_synthetic_list(n, seed=0, source=hurun_cache.LEGACY_CSV_FILE):
+    """按真实榜单各列的经验分布生成 n 行合成数据，列与类型同列式缓存读出的数据一致
+
+    文本列按真实取值的频率抽样(含缺失值比例)，以分类编码生成，避免构造上千万个字符串对象；
+    财富值与年龄从真实取值中有放回抽样，排名按财富值重新计算
+    """
+    import numpy as np
+    import pandas as pd
+
+    real = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for col in ['公司', '行业', '姓名', '出生地', '性别']:
+        freq = real[col].value_counts(dropna=False, normalize=True)
+        missing = freq.index.isna()
+        lookup = np.full(len(freq), -1)
+        lookup[~missing] = np.arange((~missing).sum())
+        codes = lookup[rng.choice(len(freq), size=n, p=freq.to_numpy())]
+        columns[col] = pd.Categorical.from_codes(codes, categories=freq.index[~missing])
+
+    wealth = rng.choice(real['财富值(亿人民币)'].to_numpy(), size=n)
+    columns['财富值(亿人民币)'] = wealth
+    columns['年龄'] = rng.choice(pd.to_numeric(real['年龄'], errors='coerce').to_numpy(), size=n)
+    columns['排名'] = pd.Series(wealth).rank(method='min', ascending=False).astype('int64').to_numpy()
+    return hurun_cache.to_typed(pd.DataFrame(columns)[hurun_cache.COLUMNS])
+
+
+def _scale_cases():
+    """规模基准的用例：(名称, 由合成数据准备输入的函数, 被测函数)，准备输入不计入耗时"""
+    import hurun_cube
+    import hurun_industry
+
+    def clean(df):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return hurun_spider.clean_data(df)
+
+    return [
+        ('clean_data', lambda data: data['raw'].copy(), clean),
+        ('build_cube', lambda data: data['clean'], hurun_cube.build_cube),
+        ('industry_stats', lambda data: data['cube'], hurun_cube.industry_stats),
+        ('industry_stats_fractional', lambda data: data['cube'],
+         lambda cube: hurun_cube.industry_stats(cube, 'fractional')),
+        ('industry_incidence', lambda data: data['clean']['行业'], hurun_industry.industry_incidence),
+        ('age_wealth_share', lambda data: data['cube'], hurun_cube.age_wealth_share),
+        ('province_counts', lambda data: data['cube'], hurun_cube.province_counts),
+    ]
+
+
+def _measure(prepare, func, data, repeat):
+    """返回 (最佳耗时秒数, tracemalloc 峰值增量MB)；内存单独运行一次测量，避免追踪开销影响计时"""
+    timings = []
+    for _ in range(repeat):
+        args = prepare(data)
+        start = time.perf_counter()
+        func(args)
+        timings.append(time.perf_counter() - start)
+
+    args = prepare(data)
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    func(args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), (peak - baseline) / 2 ** 20
+
+
+def run_scale_benchmark(sizes=SCALE_SIZES, repeat=3, seed=0):
+    """在不同规模的合成数据上测量清洗与聚合各步骤的耗时和峰值内存
+
+    返回 {用例: {行数: {'time_s', 'peak_mem_mb'}}}
+    """
+    import hurun_cube
+
+    cases = _scale_cases()
+    results = {name: {} for name, _, _ in cases}
+    for n in sizes:
+        data = {'raw': make_synthetic_list(n, seed)}
+        with contextlib.redirect_stdout(io.StringIO()):
+            data['clean'] = hurun_spider.clean_data(data['raw'].copy())
+        data['cube'] = hurun_cube.build_cube(data['clean'])
+        print(f"\n{n:,} 行 (立方体 {len(data['cube']):,} 个单元):")
+        for name, prepare, func in cases:
+            seconds, memory = _measure(prepare, func, data, repeat)
+            results[name][str(n)] = {'time_s': round(seconds, 4), 'peak_mem_mb': round(memory, 2)}
+            print(f"  {name:<26} {seconds:>9.4f}s  峰值内存 {memory:>9.2f}MB")
+    return results
+
+
+def _git_label():
+    """当前提交的短哈希，不在 git 仓库中时返回 local"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'local'
+
+
+def save_scale_results(results, label=None, directory=BENCHMARK_DIR, repeat=None, seed=None):
+    """按版本标签保存规模基准结果，键排序、固定缩进，便于版本间 diff；返回文件路径"""
+    import numpy as np
+    import pandas as pd
+
+    label = label or _git_label()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'scale_{label}.json')
+    payload = {
+        'label': label,
+        'environment': {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+                        'machine': platform.machine(), 'cpus': os.cpu_count()},
+        'repeat': repeat,
+        'seed': seed,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"\n基准结果已保存至 {path}")
+    return path
+
+
+def compare_scale_results(old_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """对比两次规模基准结果，打印每个用例与规模的耗时/内存比值，返回回归项列表"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+
+    print(f"{old['label']} -> {new['label']}")
+    regressions = []
+    for name, by_size in new['results'].items():
+        for size, metrics in by_size.items():
+            before = old['results'].get(name, {}).get(size)
+            if before is None:
+                continue
+            line = []
+            for key, resolution in METRIC_RESOLUTION.items():
+                ratio = max(metrics[key], resolution) / max(before[key], resolution)
+                line.append(f"{key} {before[key]} -> {metrics[key]} ({ratio:.2f}x)")
+                if ratio > threshold:
+                    regressions.append((name, size, key, ratio))
+            print(f"  {name:<26} {int(size):>12,}  " + '  '.join(line))
+    for name, size, key, ratio in regressions:
+        print(f"回归: {name} @ {int(size):,} 行 {key} 增长 {ratio:.2f}x")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="胡润爬虫与分析性能基准；不带子命令时运行分页获取基准")
+    subparsers = parser.add_subparsers(dest='command')
+    fetch_parser = subparsers.add_parser('fetch', help="串行与并发分页获取对比")
+    fetch_parser.add_argument('--latency', type=float, default=0.2, help="桩服务器每次响应的延迟(秒)")
+    fetch_parser.add_argument('--concurrency', type=int, default=4, help="并发上限")
+    fetch_parser.add_argument('--repeat', type=int, default=3, help="重复次数")
+
+    replay_parser = subparsers.add_parser('replay', help="在录制响应的回放服务器上对比不同并发度")
+    replay_parser.add_argument('cassette', help="录制名称(见 crawler_replay.py)")
+    replay_parser.add_argument('--concurrency', type=lambda value: [int(n) for n in value.split(',')],
+                               default=[1, 2, 4, 8], help="逗号分隔的并发度")
+    replay_parser.add_argument('--latency', type=float, default=0.2, help="每次响应的延迟(秒)")
+    replay_parser.add_argument('--error-rate', type=float, default=0.0, help="随机返回 503 的概率")
+    replay_parser.add_argument('--rate-limit', type=float, default=None, help="每秒允许的请求数，超出返回 429")
+    replay_parser.add_argument('--repeat', type=int, default=3, help="重复次数")
+    replay_parser.add_argument('--seed', type=int, default=0, help="随机错误的种子")
+    replay_parser.add_argument('--list-id', default=hurun_spider.LIST_ID, help="榜单ID")
+
+    scale_parser = subparsers.add_parser('scale', help="合成数据上的清洗与聚合规模基准")
+    scale_parser.add_argument('--sizes', type=lambda value: [int(float(n)) for n in value.split(',')],
+                              default=SCALE_SIZES, help="逗号分隔的行数，如 1e3,1e5,1e7")
+    scale_parser.add_argument('--repeat', type=int, default=3, help="每个用例的重复次数(取最佳)")
+    scale_parser.add_argument('--seed', type=int, default=0, help="合成数据随机种子")
+    scale_parser.add_argument('--label', default=None, help="结果文件标签，默认为当前提交的短哈希")
+
+    compare_parser = subparsers.add_parser('compare', help="对比两次规模基准结果")
+    compare_parser.add_argument('old', help="基准结果文件")
+    compare_parser.add_argument('new', help="新结果文件")
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help="回归判定比例")
+    args = parser.parse_args()
+
+    if args.command == 'scale':
+        results = run_scale_benchmark(args.sizes, args.repeat, args.seed)
+        save_scale_results(results, args.label, repeat=args.repeat, seed=args.seed)
+    elif args.command == 'compare':
+        compare_scale_results(args.old, args.new, args.threshold)
+    elif args.command == 'fetch':
+        run_fetch_benchmark(args.latency, args.concurrency, args.repeat)
+    elif args.command == 'replay':
+        run_replay_benchmark(args.cassette, args.concurrency, args.latency, args.error_rate, args.rate_limit,
+                             args.repeat, args.seed, args.list_id)
+    else:
+        run_fetch_benchmark()
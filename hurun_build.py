@@ -0,0 +1,144 @@
+import functools
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import sys
+from collections import namedtuple
+
+# 产物构建缓存：记录每个产物的输入指纹，未变化时跳过重新生成
+BUILD_CACHE_FILE = 'results_1/.build_cache.json'
+# 图表指纹包含这些模块的完整源码：绘图辅助函数、字体设置或核密度算法的改动都会使图表重新生成
+RENDER_MODULES = ['hurun_render', 'hurun_distribution']
+
+# 一个图表渲染任务：输出路径、hurun_render 中绘图函数的名称及其参数(只包含绘图所需的小规模聚合结果)
+# 以名称而非函数对象引用绘图函数，判断产物是否过期时不必导入 matplotlib
+FigureJob = namedtuple('FigureJob', ['path', 'func', 'kwargs'])
+
+
+def _hash_value(h, value):
+    """把参数值写入哈希；pandas/numpy 对象按内容哈希
+
+    未加载 pandas/numpy 时参数中不可能有它们的对象，不为判断类型而导入，只比较输入文件的重复运行因此不加载 pandas
+    """
+    pd, np = sys.modules.get('pandas'), sys.modules.get('numpy')
+    if pd is not None and isinstance(value, (pd.DataFrame, pd.Series)):
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        h.update(repr(value.dtypes if isinstance(value, pd.DataFrame) else value.dtype).encode())
+        h.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+    elif np is not None and isinstance(value, np.ndarray):
+        h.update(value.tobytes())
+        h.update(repr(value.dtype).encode())
+    else:
+        h.update(repr(value).encode())
+
+
+@functools.lru_cache(maxsize=None)
+def module_source(name):
+    """读取模块的源码，不导入模块"""
+    with open(importlib.util.find_spec(name).origin, 'rb') as f:
+        return f.read()
+
+
+def fingerprint(func, kwargs, modules=()):
+    """产物指纹：生成函数源码(或函数名) + 所依赖模块的源码 + 参数内容的 SHA-256"""
+    h = hashlib.sha256()
+    h.update(func.encode() if isinstance(func, str) else inspect.getsource(func).encode())
+    for name in modules:
+        h.update(name.encode())
+        h.update(module_source(name))
+    for name in sorted(kwargs):
+        h.update(name.encode())
+        _hash_value(h, kwargs[name])
+    return h.hexdigest()
+
+
+def figure_fingerprint(job):
+    """图表任务的指纹"""
+    return fingerprint(job.func, job.kwargs, RENDER_MODULES)
+
+
+def stale_jobs(jobs, build_cache=None):
+    """返回 (需要重新渲染的图表任务, {路径: 指纹})；不传 build_cache 时全部需要渲染
+
+    输入未变化而上次渲染失败的图表(如离线时缺少边界资产)不再重试，直到输入变化或 force=True
+    """
+    digests = {job.path: figure_fingerprint(job) for job in jobs}
+    if build_cache is None:
+        return list(jobs), digests
+    stale = []
+    for job in jobs:
+        error = build_cache.failure(job.path, digests[job.path])
+        if error is not None:
+            print(f"{job.path} 上次生成失败且输入未变化，不再重试: {error}")
+        elif not build_cache.is_fresh(job.path, digests[job.path]):
+            stale.append(job)
+    return stale, digests
+
+
+class BuildCache:
+    """产物指纹记录；force=True 时所有产物都视为过期
+
+    生成失败的产物记录为 {'digest': 指纹, 'error': 错误信息}，同一指纹不再重试；
+    完整流程记录为 {'digest': 指纹, 'outputs': 产物列表}，输入未变化时整个流程可以跳过
+    """
+
+    def __init__(self, path=BUILD_CACHE_FILE, force=False):
+        self.path = path
+        self.force = force
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def is_fresh(self, target, digest):
+        return not self.force and os.path.exists(target) and self.entries.get(target) == digest
+
+    def record(self, target, digest):
+        self.entries[target] = digest
+
+    def record_failure(self, target, digest, error):
+        self.entries[target] = {'digest': digest, 'error': error}
+
+    def record_run(self, name, digest):
+        """记录以指纹 digest 完整运行过一次流程 name，连同此时已生成的全部产物"""
+        outputs = sorted(target for target, entry in self.entries.items() if isinstance(entry, str))
+        self.entries[name] = {'digest': digest, 'outputs': outputs}
+
+    def run_fresh(self, name, digest):
+        """流程 name 上次以相同指纹完整运行过，且当时的产物都还存在"""
+        entry = self.entries.get(name)
+        if self.force or not isinstance(entry, dict) or entry.get('digest') != digest:
+            return False
+        return all(os.path.exists(target) for target in entry.get('outputs', []))
+
+    def failure(self, target, digest):
+        """同一指纹上次生成失败时返回错误信息，否则返回 None"""
+        entry = self.entries.get(target)
+        if self.force or not isinstance(entry, dict) or entry.get('digest') != digest:
+            return None
+        return entry.get('error')
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+
+
+def save_csv(data, path, index=True):
+    """导出 CSV"""
+    data.to_csv(path, index=index)
+
+
+def export_csv(data, path, index=True, build_cache=None):
+    """导出 CSV；内容未变化且文件存在时跳过，返回是否实际写入"""
+    kwargs = {'data': data, 'index': index}
+    digest = fingerprint(save_csv, kwargs)
+    if build_cache is not None and build_cache.is_fresh(path, digest):
+        return False
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    save_csv(path=path, **kwargs)
+    if build_cache is not None:
+        build_cache.record(path, digest)
+    return True
@@ -0,0 +1,350 @@
+import argparse
+import datetime
+import glob
+import os
+import shutil
+
+# 列式缓存目录：cache/lists/<榜单ID>/<爬取日期>.parquet
+LIST_CACHE_DIR = 'cache/lists'
+# 多榜单面板数据集：cache/panels/<面板名>/<爬取日期>.parquet
+PANEL_CACHE_DIR = 'cache/panels'
+# 分页检查点目录，由爬虫写入，失效缓存时一并清除
+PAGE_CACHE_DIR = 'cache/pages'
+# 旧版单文件CSV缓存，已纳入版本控制，只读：首次运行时迁移为所属榜单(LEGACY_LIST_ID)的列式缓存，失效缓存时不删除
+LEGACY_CSV_FILE = 'cache/hurun_rich_list.csv'
+LEGACY_LIST_ID = 'ODBYW2BI'
+# 旧版CSV的爬取日期：文件修改时间随检出而变，不能代表数据的新旧，按 hurun_crawler.log 中最后一次爬取的日期记录，迁移后即为过期缓存
+LEGACY_CRAWL_DATE = datetime.date(2025, 7, 14)
+# 由清洗结果构建的查询索引(hurun_search)，缓存失效后一并删除
+SEARCH_INDEX_DIR = 'cache/search'
+# 默认缓存有效期(天)，过期后自动重新爬取
+DEFAULT_TTL_DAYS = 30
+
+# 列顺序与爬虫产出的记录一致
+COLUMNS = ['排名', '财富值(亿人民币)', '公司', '行业', '姓名', '年龄', '出生地', '性别']
+# 面板数据集在每条记录前附加所属榜单与年份
+PANEL_TAG_COLUMNS = ['榜单ID', '年份']
+NUMERIC_COLUMNS = ['排名', '财富值(亿人民币)', '年龄', '年份']
+CATEGORY_COLUMNS = ['行业', '出生地', '性别', '榜单ID']
+STRING_COLUMNS = ['公司', '姓名']
+
+
+def to_typed(df):
+    """统一列类型：数值列转为数值，低基数列转为分类，其余为字符串"""
+    import pandas as pd
+
+    df = df.copy()
+    for col in NUMERIC_COLUMNS:
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in CATEGORY_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype('category')
+    for col in STRING_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype('string')
+    return df
+
+
+def _list_dir(list_id):
+    return os.path.join(LIST_CACHE_DIR, list_id)
+
+
+def _panel_dir(name):
+    return os.path.join(PANEL_CACHE_DIR, name)
+
+
+def _cache_files(list_id, directory=None):
+    """某榜单(或指定目录)的全部缓存文件，按爬取日期升序"""
+    directory = directory or _list_dir(list_id)
+    files = glob.glob(os.path.join(directory, '*.parquet'))
+    files += glob.glob(os.path.join(directory, '*.pkl'))
+    return sorted(files, key=lambda path: os.path.splitext(os.path.basename(path))[0])
+
+
+def _crawl_date(path):
+    return datetime.date.fromisoformat(os.path.splitext(os.path.basename(path))[0])
+
+
+def save_list(df, list_id, crawl_date=None):
+    """按榜单ID和爬取日期保存类型化的列式缓存，返回文件路径
+
+    优先使用 Parquet；未安装 pyarrow 时退回 pickle，同样保留列类型
+    """
+    crawl_date = crawl_date or datetime.date.today()
+    os.makedirs(_list_dir(list_id), exist_ok=True)
+    df = to_typed(df).reset_index(drop=True)
+
+    path = os.path.join(_list_dir(list_id), f'{crawl_date.isoformat()}.parquet')
+    try:
+        df.to_parquet(path + '.tmp', index=False)
+    except ImportError:
+        path = os.path.splitext(path)[0] + '.pkl'
+        df.to_pickle(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return path
+
+
+class ListWriter:
+    """按批追加记录到列式缓存，内存占用只与批大小有关
+
+    用法::
+
+        with ListWriter(list_id) as writer:
+            writer.write_records(records)
+
+    有 pyarrow 时每批写成 Parquet 的一个行组；否则退回在结束时整体写入 pickle。
+    已按列解码的数据(hurun_schema.decode_page)用 write_columns 写入，直接构建 Arrow 数组，不经过 pandas 类型推断。
+    只有正常退出 with 块时才会替换正式缓存文件
+    """
+    columns = COLUMNS
+
+    def __init__(self, list_id, crawl_date=None, batch_size=5000):
+        self.list_id = list_id
+        self.crawl_date = crawl_date or datetime.date.today()
+        self.batch_size = batch_size
+        self.rows = 0
+        self._batch = []
+        self._column_batches = []
+        self._column_rows = 0
+        self._frames = []
+        self._writer = None
+        self.directory = _list_dir(list_id)
+        self.path = os.path.join(self.directory, f'{self.crawl_date.isoformat()}.parquet')
+
+    def __enter__(self):
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            types = {'排名': pa.int64(), '财富值(亿人民币)': pa.float64(), '年龄': pa.float64(), '年份': pa.int64()}
+            types.update({col: pa.dictionary(pa.int32(), pa.string()) for col in CATEGORY_COLUMNS})
+            types.update({col: pa.string() for col in STRING_COLUMNS})
+            self._schema = pa.schema([(col, types[col]) for col in self.columns])
+            self._writer = pq.ParquetWriter(self.path + '.tmp', self._schema)
+        except ImportError:
+            self.path = os.path.splitext(self.path)[0] + '.pkl'
+        return self
+
+    def write_records(self, records):
+        """写入记录(字典)的可迭代对象，可以是生成器"""
+        for record in records:
+            self._batch.append(record)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+
+    def write_columns(self, columns):
+        """写入按列存放的数据 {列名: list}，缺少的列填空值"""
+        rows = len(next(iter(columns.values()), []))
+        if not rows:
+            return
+        self._column_batches.append({col: columns.get(col, [None] * rows) for col in self.columns})
+        self._column_rows += rows
+        if self._column_rows >= self.batch_size:
+            self._flush_columns()
+
+    def _flush_columns(self):
+        if not self._column_batches:
+            return
+        rows = self._column_rows
+        if len(self._column_batches) == 1:
+            merged = self._column_batches[0]
+        else:
+            merged = {col: [value for batch in self._column_batches for value in batch[col]] for col in self.columns}
+        self._column_batches, self._column_rows = [], 0
+        self.rows += rows
+        if self._writer is not None:
+            import pyarrow as pa
+
+            # 分类列先建字符串数组再字典编码，比直接按字典类型从 Python 对象转换快一个数量级
+            arrays = [pa.array(merged[field.name], type=field.type.value_type).dictionary_encode()
+                      if pa.types.is_dictionary(field.type) else pa.array(merged[field.name], type=field.type)
+                      for field in self._schema]
+            self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        else:
+            import pandas as pd
+
+            self._frames.append(pd.DataFrame(merged, columns=self.columns))
+
+    def _flush(self):
+        if not self._batch:
+            return
+        import pandas as pd
+
+        df = pd.DataFrame(self._batch)
+        df = df.reindex(columns=self.columns)
+        for col in NUMERIC_COLUMNS:
+            if col in df:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        for col in ['排名', '年份']:
+            if col in df:
+                df[col] = df[col].astype('Int64')
+        self.rows += len(df)
+        self._batch = []
+        if self._writer is not None:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            self._frames.append(df)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._flush()
+        self._flush_columns()
+        if self._writer is not None:
+            self._writer.close()
+            if exc_type is None:
+                os.replace(self.path + '.tmp', self.path)
+            else:
+                os.remove(self.path + '.tmp')
+        elif exc_type is None:
+            import pandas as pd
+
+            frames = self._frames or [pd.DataFrame(columns=self.columns)]
+            to_typed(pd.concat(frames, ignore_index=True)).to_pickle(self.path)
+        return False
+
+
+class PanelWriter(ListWriter):
+    """把多个榜单的记录写入同一个面板数据集，每条记录附带 榜单ID/年份 标记
+
+    用法::
+
+        with PanelWriter(name) as writer:
+            writer.write_records(records, {'榜单ID': list_id, '年份': year})
+            writer.write_columns(columns, {'榜单ID': list_id, '年份': year})
+    """
+    columns = PANEL_TAG_COLUMNS + COLUMNS
+
+    def __init__(self, name, crawl_date=None, batch_size=5000):
+        super().__init__(name, crawl_date, batch_size)
+        self.directory = _panel_dir(name)
+        self.path = os.path.join(self.directory, f'{self.crawl_date.isoformat()}.parquet')
+
+    def write_records(self, records, tags=None):
+        """写入记录，tags 中的 榜单ID/年份 附加到每条记录"""
+        tags = tags or {}
+        super().write_records({**tags, **record} for record in records)
+
+    def write_columns(self, columns, tags=None):
+        """写入按列存放的数据，tags 中的 榜单ID/年份 扩展为整列"""
+        rows = len(next(iter(columns.values()), []))
+        super().write_columns({**{col: [value] * rows for col, value in (tags or {}).items()}, **columns})
+
+
+def migrate_legacy_csv(list_id=LEGACY_LIST_ID):
+    """把旧版CSV缓存迁移为所属榜单的列式缓存，爬取日期记为 LEGACY_CRAWL_DATE；
+
+    只在该榜单还没有任何列式缓存时执行，返回新缓存文件的路径，未迁移时返回 None
+    """
+    if list_id != LEGACY_LIST_ID or not os.path.exists(LEGACY_CSV_FILE) or _cache_files(list_id):
+        return None
+    import pandas as pd
+
+    print(f"迁移旧版CSV缓存 {LEGACY_CSV_FILE} (爬取日期 {LEGACY_CRAWL_DATE.isoformat()})")
+    return save_list(pd.read_csv(LEGACY_CSV_FILE), list_id, LEGACY_CRAWL_DATE)
+
+
+def latest_file(list_id, ttl_days=DEFAULT_TTL_DAYS, directory=None, verbose=True):
+    """榜单(或指定目录)最新的缓存文件路径；不存在或超过有效期时返回 None，verbose 时打印过期提示"""
+    files = _cache_files(list_id, directory)
+    if not files:
+        return None
+
+    latest = files[-1]
+    age = (datetime.date.today() - _crawl_date(latest)).days
+    if ttl_days is not None and age > ttl_days:
+        if verbose:
+            print(f"缓存已过期 ({latest}，已 {age} 天，有效期 {ttl_days} 天)")
+        return None
+    return latest
+
+
+def load_list(list_id, ttl_days=DEFAULT_TTL_DAYS, directory=None):
+    """读取榜单(或指定目录)最新的缓存；不存在或超过有效期时返回 None"""
+    import pandas as pd
+
+    latest = latest_file(list_id, ttl_days, directory)
+    if latest is None:
+        return None
+    if latest.endswith('.parquet'):
+        return pd.read_parquet(latest)
+    return pd.read_pickle(latest)
+
+
+def latest_panel_file(name, ttl_days=DEFAULT_TTL_DAYS):
+    """面板数据集最新的缓存文件路径；不存在或超过有效期时返回 None"""
+    return latest_file(name, ttl_days, directory=_panel_dir(name))
+
+
+def iter_chunks(path, chunk_size=100_000):
+    """按块逐个产出缓存文件中的记录(DataFrame)，列类型与 load_list 一致
+
+    Parquet 文件按行组流式读取，内存只与 chunk_size 有关；pickle 只能整体读入后再切块
+    """
+    import pandas as pd
+
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+    df = pd.read_pickle(path)
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def load_panel(name, ttl_days=DEFAULT_TTL_DAYS):
+    """读取面板数据集最新的缓存；不存在或超过有效期时返回 None"""
+    return load_list(name, ttl_days, directory=_panel_dir(name))
+
+
+def invalidate(list_id=None):
+    """删除指定榜单(或全部榜单与面板)的缓存、分页检查点和查询索引，返回删除的文件数；旧版CSV缓存(LEGACY_CSV_FILE)不删除"""
+    count = 0
+    if list_id:
+        targets = [_list_dir(list_id), os.path.join(PAGE_CACHE_DIR, list_id),
+                   os.path.join(SEARCH_INDEX_DIR, f'{list_id}.json')]
+    else:
+        targets = [LIST_CACHE_DIR, PANEL_CACHE_DIR, PAGE_CACHE_DIR, SEARCH_INDEX_DIR]
+    for target in targets:
+        if os.path.isfile(target):
+            os.remove(target)
+            count += 1
+        elif os.path.exists(target):
+            count += sum(len(files) for _, _, files in os.walk(target))
+            shutil.rmtree(target)
+    return count
+
+
+def cache_info():
+    """列出所有缓存的榜单ID(面板以 panels/ 开头)、爬取日期和已缓存天数"""
+    import pandas as pd
+
+    rows = []
+    directories = [(os.path.basename(path), path) for path in sorted(glob.glob(os.path.join(LIST_CACHE_DIR, '*')))]
+    directories += [('panels/' + os.path.basename(path), path)
+                    for path in sorted(glob.glob(os.path.join(PANEL_CACHE_DIR, '*')))]
+    for list_id, directory in directories:
+        for path in _cache_files(list_id, directory):
+            age = (datetime.date.today() - _crawl_date(path)).days
+            rows.append({'榜单ID': list_id, '爬取日期': _crawl_date(path).isoformat(),
+                         '已缓存天数': age, '文件': path})
+    return pd.DataFrame(rows, columns=['榜单ID', '爬取日期', '已缓存天数', '文件'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="胡润榜单列式缓存管理")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('info', help="查看缓存")
+    invalidate_parser = subparsers.add_parser('invalidate', help="删除缓存")
+    invalidate_parser.add_argument('--list-id', help="只删除指定榜单，默认删除全部")
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(cache_info().to_string(index=False))
+    elif args.command == 'invalidate':
+        print(f"已删除 {invalidate(args.list_id)} 个缓存文件")
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# 年龄分组与财富等级的分箱，所有图表共用同一套口径
+AGE_BINS = [0, 40, 50, 60, 70, 100]
+AGE_LABELS = ['40岁以下', '41-50岁', '51-60岁', '61-70岁', '70岁以上']
+WEALTH_BINS = [0, 10, 50, 100, 500, 1000, float('inf')]
+WEALTH_LABELS = ['<10亿', '10-50亿', '50-100亿', '100-500亿', '500-1000亿', '>1000亿']
+# 热力图使用更粗的财富等级，由细分等级合并得到
+HEATMAP_WEALTH_LABELS = {'<10亿': '<50亿', '10-50亿': '<50亿', '50-100亿': '50-100亿',
+                         '100-500亿': '100-500亿', '500-1000亿': '500-1000亿', '>1000亿': '>1000亿'}
+
+CUBE_DIMS = ['行业', '出生省份', '性别', '年龄分组', '财富等级']
+WEALTH_COLUMN = '财富值(亿人民币)'
+
+
+def bucketize(df):
+    """计算年龄分组与财富等级，返回 (年龄分组, 财富等级) 两个分类 Series，不修改 df"""
+    age_group = pd.cut(df['年龄'], bins=AGE_BINS, labels=AGE_LABELS).rename('年龄分组')
+    wealth_level = pd.cut(df[WEALTH_COLUMN], bins=WEALTH_BINS, labels=WEALTH_LABELS).rename('财富等级')
+    return age_group, wealth_level
+
+
+def build_cube(df):
+    """一次向量化分组构建聚合立方体
+
+    维度为 行业 × 出生省份 × 性别 × 年龄分组 × 财富等级，度量为人数/总财富/最低财富/最高财富。
+    缺失的维度值(如年龄未知)保留为 NaN 分组，保证人数合计与原数据一致
+    """
+    age_group, wealth_level = bucketize(df)
+    frame = pd.DataFrame({
+        '行业': df['行业'],
+        '出生省份': df['出生省份'],
+        '性别': df['性别'],
+        '年龄分组': age_group,
+        '财富等级': wealth_level,
+        WEALTH_COLUMN: df[WEALTH_COLUMN],
+    })
+    return frame.groupby(CUBE_DIMS, observed=True, dropna=False)[WEALTH_COLUMN].agg(
+        人数='count', 总财富='sum', 最低财富='min', 最高财富='max'
+    ).reset_index()
+
+
+def merge_cubes(cubes):
+    """合并分块构建的立方体：人数/总财富相加、最低/最高财富取极值，满足结合律，合并顺序不影响结果"""
+    return rollup(pd.concat(cubes, ignore_index=True), CUBE_DIMS).reset_index()
+
+
+def rollup(cube, dims):
+    """沿 dims 之外的维度上卷，度量按各自的可结合方式合并"""
+    return cube.groupby(dims, observed=True, dropna=False).agg(
+        人数=('人数', 'sum'), 总财富=('总财富', 'sum'),
+        最低财富=('最低财富', 'min'), 最高财富=('最高财富', 'max')
+    )
+
+
+def industry_stats(cube, attribution='full'):
+    """行业富豪数量、总财富、平均财富，按数量降序
+
+    “饮料、医疗保健”这类多行业字段拆分为多个行业标签，由 行业关联矩阵转置 × 立方体度量 得到各行业合计；
+    attribution='full' 时在每个所属行业各计一次，'fractional' 时平均分摊(合计与总人数一致)，
+    None 时按原始行业字段分组
+    """
+    known = cube.dropna(subset=['行业'])
+    if attribution is None:
+        stats = rollup(known, ['行业'])
+    else:
+        import hurun_industry
+
+        stats = hurun_industry.label_sums(known['行业'], known[['人数', '总财富']], attribution)
+        if attribution == 'full':
+            stats['人数'] = stats['人数'].round().astype('int64')
+    stats = pd.DataFrame({
+        '富豪数量': stats['人数'],
+        '总财富': stats['总财富'],
+        '平均财富': stats['总财富'] / stats['人数'],
+    })
+    return stats.sort_values('富豪数量', ascending=False, kind='stable')
+
+
+def gender_counts(cube):
+    """各性别人数，按数量降序"""
+    counts = rollup(cube, ['性别'])['人数']
+    return counts.sort_values(ascending=False, kind='stable')
+
+
+def wealth_level_counts(cube):
+    """各财富等级人数，按等级顺序"""
+    counts = rollup(cube.dropna(subset=['财富等级']), ['财富等级'])['人数']
+    return counts.reindex(WEALTH_LABELS, fill_value=0)
+
+
+def age_wealth_share(cube):
+    """各年龄分组内不同财富等级的人数占比(行归一化)"""
+    known = cube.dropna(subset=['年龄分组', '财富等级'])
+    coarse = known['财富等级'].map(HEATMAP_WEALTH_LABELS)
+    table = known.groupby([known['年龄分组'], coarse], observed=True)['人数'].sum().unstack(fill_value=0)
+    table = table.reindex(columns=list(dict.fromkeys(HEATMAP_WEALTH_LABELS.values())), fill_value=0)
+    table = table.loc[table.sum(axis=1) > 0]
+    return table.div(table.sum(axis=1), axis=0)
+
+
+def province_counts(cube):
+    """各出生省份人数，按数量降序"""
+    counts = rollup(cube, ['出生省份'])['人数'].rename('count')
+    counts.index = counts.index.astype(object)
+    return counts.sort_values(ascending=False, kind='stable')
+
+
+def wealth_log(df):
+    """财富值的 log10 变换"""
+    return np.log10(df[WEALTH_COLUMN]).rename('财富对数')
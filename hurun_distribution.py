@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# 核密度估计的默认格点数，以及汇总表中的头部财富占比
+KDE_GRIDSIZE = 512
+TOP_SHARES = [0.01, 0.05, 0.1]
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=float)
+    return values[np.isfinite(values)]
+
+
+def scott_bandwidth(values):
+    """Scott 规则带宽，与 seaborn/scipy 的默认值一致"""
+    values = _finite(values)
+    if len(values) < 2:
+        return 1.0
+    bandwidth = values.std(ddof=1) * len(values) ** -0.2
+    return bandwidth if bandwidth > 0 else 1.0
+
+
+def binned_kde(values, gridsize=KDE_GRIDSIZE, bandwidth=None, cut=3):
+    """高斯核密度估计：线性分箱到等距格点，再与核做 FFT 卷积，返回 (格点, 密度)
+
+    复杂度为 O(n + m log m)，n 为样本数、m 为格点数；格点覆盖 [最小值 - cut×带宽, 最大值 + cut×带宽]
+    """
+    values = _finite(values)
+    if len(values) == 0:
+        return np.array([]), np.array([])
+    bandwidth = bandwidth or scott_bandwidth(values)
+    grid = np.linspace(values.min() - cut * bandwidth, values.max() + cut * bandwidth, gridsize)
+    delta = grid[1] - grid[0]
+
+    # 线性分箱：每个样本按到两侧格点的距离分摊权重
+    position = (values - grid[0]) / delta
+    left = np.clip(np.floor(position).astype(np.int64), 0, gridsize - 2)
+    weight = position - left
+    counts = np.bincount(left, 1 - weight, minlength=gridsize) + np.bincount(left + 1, weight, minlength=gridsize)
+
+    # 核截断在 ±5 个带宽，补零后做线性卷积
+    half = min(int(np.ceil(5 * bandwidth / delta)), gridsize - 1)
+    offsets = np.arange(-half, half + 1) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    size = 1 << int(np.ceil(np.log2(gridsize + len(kernel) - 1)))
+    convolved = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(convolved[half:half + gridsize] / len(values), 0)
+    return grid, density
+
+
+def gini(values):
+    """基尼系数(向量化，排序后按秩加权求和)"""
+    values = np.sort(_finite(values))
+    total = values.sum()
+    if len(values) == 0 or total <= 0:
+        return float('nan')
+    n = len(values)
+    return float(2 * np.dot(np.arange(1, n + 1), values) / (n * total) - (n + 1) / n)
+
+
+def lorenz_curve(values, points=101):
+    """洛伦兹曲线：按财富升序的累计人口占比与累计财富占比，在 points 个等距人口占比上取值"""
+    values = np.sort(_finite(values))
+    population = np.linspace(0, 1, points)
+    if len(values) == 0 or values.sum() <= 0:
+        return pd.DataFrame({'人口占比': population, '财富占比': np.nan})
+    cumulative = np.concatenate([[0], np.cumsum(values)]) / values.sum()
+    share = np.interp(population, np.linspace(0, 1, len(values) + 1), cumulative)
+    return pd.DataFrame({'人口占比': population, '财富占比': share})
+
+
+def top_share(values, fraction):
+    """财富最高的 fraction(如 0.01 表示前1%)人群所占财富比例；用 partition 选出头部，无需全排序"""
+    values = _finite(values)
+    total = values.sum()
+    if len(values) == 0 or total <= 0:
+        return float('nan')
+    k = max(1, int(np.ceil(len(values) * fraction)))
+    return float(np.partition(values, len(values) - k)[len(values) - k:].sum() / total)
+
+
+def pareto_tail(values, xmin=None, candidates=50, min_tail=10, ks_points=10_000):
+    """幂律尾部拟合 P(X > x) ∝ x^-alpha，返回 {'alpha', 'xmin', 'tail_size', 'ks'}
+
+    给定 xmin 时用极大似然(Hill)估计 alpha；否则在若干分位数候选中选取 KS 距离最小的 xmin。
+    各候选的 alpha 由对数值的后缀和一次算出
+    """
+    values = np.sort(_finite(values))
+    values = values[values > 0]
+    n = len(values)
+    if n < min_tail:
+        return {'alpha': float('nan'), 'xmin': float('nan'), 'tail_size': n, 'ks': float('nan')}
+
+    logs = np.log(values)
+    suffix = np.concatenate([np.cumsum(logs[::-1])[::-1], [0.0]])
+    if xmin is None:
+        starts = np.unique(np.searchsorted(values, np.quantile(values[:n - min_tail + 1],
+                                                               np.linspace(0, 1, candidates))))
+    else:
+        starts = np.array([np.searchsorted(values, xmin)])
+
+    best = None
+    for start in starts:
+        tail_size = n - start
+        denominator = suffix[start] - tail_size * logs[start]
+        if tail_size < min_tail or denominator <= 0:
+            continue
+        alpha = tail_size / denominator
+        # KS 距离在至多 ks_points 个等距秩上计算，两条分布函数都单调，误差不超过 1/ks_points
+        ranks = np.unique(np.linspace(0, tail_size - 1, min(tail_size, ks_points)).astype(np.int64))
+        model = 1 - (values[start + ranks] / values[start]) ** -alpha
+        ks = float(np.abs(model - ranks / tail_size).max())
+        if best is None or ks < best['ks']:
+            best = {'alpha': float(alpha), 'xmin': float(values[start]), 'tail_size': int(tail_size), 'ks': ks}
+    return best or {'alpha': float('nan'), 'xmin': float('nan'), 'tail_size': 0, 'ks': float('nan')}
+
+
+def summarize(values):
+    """财富分布汇总：样本数、均值、中位数、基尼系数、头部财富占比和帕累托尾部参数"""
+    values = _finite(values)
+    tail = pareto_tail(values)
+    summary = {
+        '样本数': len(values),
+        '平均值': values.mean() if len(values) else float('nan'),
+        '中位数': float(np.median(values)) if len(values) else float('nan'),
+        '基尼系数': gini(values),
+    }
+    summary.update({f'前{fraction:.0%}财富占比': top_share(values, fraction) for fraction in TOP_SHARES})
+    summary.update({'帕累托指数': tail['alpha'], '帕累托尾部下限': tail['xmin'],
+                    '尾部样本数': tail['tail_size'], '尾部KS距离': tail['ks']})
+    return pd.Series(summary, name='值').rename_axis('指标')
+
+
+def kde_table(values, gridsize=KDE_GRIDSIZE):
+    """核密度估计结果表，列为 格点/密度"""
+    grid, density = binned_kde(values, gridsize)
+    return pd.DataFrame({'格点': grid, '密度': density})
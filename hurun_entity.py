@@ -0,0 +1,177 @@
+import argparse
+import hashlib
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# 姓名中的各种间隔号统一为“·”，家族上榜的后缀不参与匹配
+NAME_SEPARATORS = '•・‧.'
+FAMILY_SUFFIXES = ('及其家族', '及家族', '家族')
+# 源数据中出现过的同一人物的不同写法 -> 规范写法(均为规范化之后的形式)
+NAME_ALIASES = {'danfriis丹飞': '丹飞'}
+# 公司名末尾的组织形式后缀，去掉后再比较
+COMPANY_SUFFIXES = ('股份有限公司', '有限责任公司', '有限公司', '集团', '控股', '股份')
+
+ENTITY_COLUMN = '人物ID'
+
+
+def normalize_name(name):
+    """姓名规范化：全角转半角、去掉括号内的别名和空白、统一间隔号、去掉家族后缀，再查别名表"""
+    if not isinstance(name, str):
+        return ''
+    text = unicodedata.normalize('NFKC', name)
+    text = re.sub(r'\(.*?\)', '', text)
+    text = re.sub(r'\s+', '', text).lower()
+    for separator in NAME_SEPARATORS:
+        text = text.replace(separator, '·')
+    for suffix in FAMILY_SUFFIXES:
+        if text.endswith(suffix) and len(text) > len(suffix):
+            text = text[:-len(suffix)]
+            break
+    return NAME_ALIASES.get(text, text)
+
+
+def normalize_company(company):
+    """公司名规范化：全角转半角、去掉括号和空白、去掉组织形式后缀"""
+    if not isinstance(company, str):
+        return ''
+    text = unicodedata.normalize('NFKC', company)
+    text = re.sub(r'\(.*?\)|\s+', '', text).lower()
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in COMPANY_SUFFIXES:
+            if text.endswith(suffix) and len(text) > len(suffix):
+                text = text[:-len(suffix)]
+                stripped = True
+    return text
+
+
+def _normalize_column(values, func):
+    """只对去重后的取值做规范化，再按分类编码映射回每一行"""
+    categorical = pd.Categorical(values)
+    normalized = np.array([func(value) for value in categorical.categories] + [''], dtype=object)
+    return normalized[categorical.codes]
+
+
+def _hash_keys(keys):
+    """把匹配键哈希为稳定的非负 63 位整数人物ID(跨运行、跨面板不变)，连接时按整数比较
+
+    取哈希的高 63 位，ID 恒为非负：有符号的 ID 会让 pandas 连接时在索引两端相减，引发溢出警告
+    """
+    codes, unique = pd.factorize(keys)
+    ids = np.array([int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big') >> 1
+                    for key in unique], dtype=np.int64)
+    return ids[codes]
+
+
+def entity_index(panel):
+    """为面板数据的每条记录分配人物ID，返回与 panel 同索引的 Series
+
+    同一年份内姓名唯一时只按规范化姓名匹配，可以跨年追踪更换公司的人物；
+    同一年份内出现重名时，这些姓名改按 姓名+公司 匹配。全部操作是哈希分组，与记录数成线性关系
+    """
+    names = _normalize_column(panel['姓名'], normalize_name)
+    companies = _normalize_column(panel['公司'], normalize_company)
+    keys = pd.DataFrame({'姓名': names, '年份': panel['年份'].to_numpy()})
+
+    # 任一年份内重名的姓名
+    per_year = keys.groupby(['姓名', '年份'], dropna=False).size()
+    ambiguous = set(per_year[per_year > 1].index.get_level_values('姓名'))
+    use_company = keys['姓名'].isin(ambiguous).to_numpy()
+    match_keys = np.where(use_company, names + '|' + companies, names)
+    return pd.Series(_hash_keys(match_keys.astype(str)), index=panel.index, name=ENTITY_COLUMN)
+
+
+def _year_frame(panel, year):
+    """某一年份的记录，每个人物只保留排名最高的一条"""
+    frame = panel[panel['年份'] == year].sort_values('排名', kind='stable')
+    frame = frame.drop_duplicates(ENTITY_COLUMN)
+    return frame[[ENTITY_COLUMN, '姓名', '公司', '行业', '排名', '财富值(亿人民币)']].set_index(ENTITY_COLUMN)
+
+
+def year_over_year(panel):
+    """相邻年份之间的人物变化，返回 (留榜人物变化, 新上榜, 落榜)
+
+    排名变化为正表示名次上升；三张表都带有 上一年份/年份 两列
+    """
+    if panel['年份'].isna().any():
+        raise ValueError("面板中存在未标记年份的榜单，无法计算年度变化")
+    panel = panel.assign(**{ENTITY_COLUMN: entity_index(panel)})
+    years = sorted(panel['年份'].unique())
+
+    deltas, entrants, dropouts = [], [], []
+    for previous, current in zip(years, years[1:]):
+        before, after = _year_frame(panel, previous), _year_frame(panel, current)
+        joined = before.join(after, how='outer', lsuffix='_上年', rsuffix='_本年')
+        tags = {'上一年份': previous, '年份': current}
+
+        stayed = joined.index.isin(before.index) & joined.index.isin(after.index)
+        both = joined[stayed]
+        deltas.append(pd.DataFrame({
+            '姓名': both['姓名_本年'],
+            '公司': both['公司_本年'],
+            '行业': both['行业_本年'],
+            '上年排名': both['排名_上年'],
+            '排名': both['排名_本年'],
+            '排名变化': both['排名_上年'] - both['排名_本年'],
+            '上年财富': both['财富值(亿人民币)_上年'],
+            '财富值(亿人民币)': both['财富值(亿人民币)_本年'],
+            '财富变化': both['财富值(亿人民币)_本年'] - both['财富值(亿人民币)_上年'],
+            '财富变化率': both['财富值(亿人民币)_本年'] / both['财富值(亿人民币)_上年'] - 1,
+        }).assign(**tags))
+        entrants.append(after[~after.index.isin(before.index)].assign(**tags))
+        dropouts.append(before[~before.index.isin(after.index)].assign(**tags))
+
+    def combine(frames, columns):
+        frames = [frame for frame in frames if len(frame)]
+        return pd.concat(frames) if frames else pd.DataFrame(columns=columns)
+
+    record_columns = ['姓名', '公司', '行业', '排名', '财富值(亿人民币)', '上一年份', '年份']
+    delta_columns = ['姓名', '公司', '行业', '上年排名', '排名', '排名变化', '上年财富', '财富值(亿人民币)',
+                     '财富变化', '财富变化率', '上一年份', '年份']
+    return combine(deltas, delta_columns), combine(entrants, record_columns), combine(dropouts, record_columns)
+
+
+def industry_churn(deltas, entrants, dropouts):
+    """各行业在相邻年份之间的新上榜/落榜/留榜人数与财富变化
+
+    新上榜按当年行业、落榜按上一年行业计入；流动率 = (新上榜 + 落榜) / 上一年人数
+    """
+    keys = ['上一年份', '年份', '行业']
+    table = pd.concat([
+        entrants.groupby(keys, observed=True).size().rename('新上榜'),
+        dropouts.groupby(keys, observed=True).size().rename('落榜'),
+        deltas.groupby(keys, observed=True).size().rename('留榜'),
+        deltas.groupby(keys, observed=True)['财富变化'].sum().rename('留榜财富变化'),
+        entrants.groupby(keys, observed=True)['财富值(亿人民币)'].sum().rename('新上榜财富'),
+        dropouts.groupby(keys, observed=True)['财富值(亿人民币)'].sum().rename('落榜财富'),
+    ], axis=1).fillna(0)
+    for col in ['新上榜', '落榜', '留榜']:
+        table[col] = table[col].astype(int)
+    previous_count = table['落榜'] + table['留榜']
+    table['流动率'] = (table['新上榜'] + table['落榜']) / previous_count.where(previous_count > 0)
+    return table.sort_values(keys[:2] + ['新上榜'], ascending=[True, True, False], kind='stable')
+
+
+if __name__ == "__main__":
+    import hurun_build
+    import hurun_cache
+
+    parser = argparse.ArgumentParser(description="跨年份追踪富豪并计算排名/财富变化与行业流动")
+    parser.add_argument('panel', help="面板数据集名称(cache/panels 下的目录名)")
+    parser.add_argument('--output-dir', default='results_1/entity', help="输出目录")
+    args = parser.parse_args()
+
+    panel = hurun_cache.load_panel(args.panel, ttl_days=None)
+    if panel is None:
+        raise SystemExit(f"面板 {args.panel} 不存在，请先运行 hurun_spider.py batch")
+    deltas, entrants, dropouts = year_over_year(panel)
+    churn = industry_churn(deltas, entrants, dropouts)
+    for data, name in [(deltas, 'wealth_deltas'), (entrants, 'new_entrants'), (dropouts, 'drop_outs'),
+                       (churn, 'industry_churn')]:
+        path = f'{args.output_dir}/{name}.csv'
+        hurun_build.export_csv(data, path)
+        print(f"{len(data)} 行已保存至 {path}")
@@ -0,0 +1,83 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import sparse  # 可选：稀疏矩阵乘法
+except ImportError:
+    sparse = None
+
+# 行业字段中多个行业之间的分隔符；“与/和”属于行业名称本身(如“智能硬件与技术”)，不拆分
+SEPARATORS = re.compile(r'[、，,/；;]')
+# 同一行业的不同写法 -> 规范名称
+LABEL_ALIASES = {'地产': '房地产', '电商': '电子商务'}
+# full: 每个行业各计一次；fractional: 在所属的 k 个行业上各计 1/k，合计不重复
+ATTRIBUTIONS = ['full', 'fractional']
+
+
+def split_industry(value):
+    """把行业字段拆分为去重后的行业标签元组，保持出现顺序"""
+    if not isinstance(value, str):
+        return ()
+    labels = (label.strip() for label in SEPARATORS.split(value))
+    return tuple(dict.fromkeys(LABEL_ALIASES.get(label, label) for label in labels if label))
+
+
+def _incidence_arrays(industries, attribution='full'):
+    """行 × 行业标签关联矩阵的 CSR 数组，返回 (data, indices, indptr, 标签)
+
+    只拆分去重后的行业字段，再按分类编码向量化展开到每一行
+    """
+    if attribution not in ATTRIBUTIONS:
+        raise ValueError(f"未知的归属方式: {attribution} (可选: {', '.join(ATTRIBUTIONS)})")
+    categorical = pd.Categorical(industries)
+    split = [split_industry(value) for value in categorical.categories]
+    labels = pd.Index(sorted({label for parts in split for label in parts}), name='行业')
+
+    # 每个行业字段的标签列号，末尾追加一个空字段对应缺失值(分类编码 -1)
+    category_lengths = np.array([len(parts) for parts in split] + [0])
+    category_indptr = np.concatenate([[0], np.cumsum(category_lengths)])
+    category_indices = labels.get_indexer([label for parts in split for label in parts])
+
+    codes = categorical.codes
+    row_lengths = category_lengths[codes]
+    indptr = np.concatenate([[0], np.cumsum(row_lengths)])
+    # 第 i 行的标签位于 category_indices[category_indptr[code]:...]，按行展开成一段连续的位置
+    offsets = np.repeat(category_indptr[codes] - indptr[:-1], row_lengths)
+    indices = category_indices[offsets + np.arange(indptr[-1])]
+
+    if attribution == 'full':
+        data = np.ones(len(indices))
+    else:
+        data = np.repeat(1.0 / np.maximum(row_lengths, 1), row_lengths)
+    return data, indices, indptr, labels
+
+
+def industry_incidence(industries, attribution='full'):
+    """行 × 行业标签的稀疏关联矩阵(scipy CSR)，返回 (矩阵, 标签)
+
+    full 时矩阵元素为 1；fractional 时每行在其 k 个行业上各为 1/k，行和为 1(无行业的行为 0)
+    """
+    if sparse is None:
+        raise ImportError("industry_incidence 需要 scipy", name='scipy')
+    data, indices, indptr, labels = _incidence_arrays(industries, attribution)
+    matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(labels)))
+    return matrix, labels
+
+
+def label_sums(industries, values, attribution='full'):
+    """按行业标签汇总 values(行数 × 度量数)，即 关联矩阵转置 × values，返回以标签为索引的 DataFrame
+
+    有 scipy 时用稀疏矩阵乘法；否则在同样的 CSR 数组上用 bincount 加权求和，结果一致
+    """
+    values = pd.DataFrame(values)
+    data, indices, indptr, labels = _incidence_arrays(industries, attribution)
+    if sparse is not None:
+        matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(labels)))
+        sums = matrix.T @ values.to_numpy(dtype=float)
+    else:
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        sums = np.column_stack([np.bincount(indices, weights=data * column[rows], minlength=len(labels))
+                                for column in values.to_numpy(dtype=float).T])
+    return pd.DataFrame(sums, index=labels, columns=values.columns)
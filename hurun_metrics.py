@@ -0,0 +1,162 @@
+import contextlib
+import datetime
+import json
+import logging
+import os
+import platform
+import time
+import tracemalloc
+
+# 结构化日志：UTF-8 编码，沿用原日志的行格式，消息部分为一个 JSON 对象；
+# 写入不受版本控制的 logs/ 目录，仓库中的 hurun_crawler.log 是旧版爬虫的历史日志，保持原样
+LOG_FILE = 'logs/hurun_crawler.log'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# 每次运行的 JSON 报告与 cProfile 结果
+REPORT_DIR = 'results_1/run_reports'
+PROFILE_DIR = 'results_1/profiles'
+STAGES = ['crawl', 'clean', 'cube', 'analyze', 'render', 'export']
+
+
+def get_logger(path=LOG_FILE):
+    """写入 UTF-8 日志文件的 logger，不向控制台重复输出"""
+    logger = logging.getLogger('hurun')
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """记录一行结构化日志"""
+    get_logger().log(level, json.dumps({'event': event, **fields}, ensure_ascii=False, default=str))
+
+
+class RunReport:
+    """一次运行的阶段指标与分页HTTP指标，保存为 JSON 运行报告
+
+    每个阶段记录墙钟时间、CPU时间和输入/输出行数，trace_memory=True 时另用 tracemalloc 记录峰值内存
+    (追踪开销较大，默认关闭)；
+    profile_stage 指定的阶段额外用 cProfile 采样并保存 .prof 文件。
+    峰值内存只统计主进程，渲染子进程中的分配不计入
+    """
+
+    def __init__(self, command='all', profile_stage=None, trace_memory=False):
+        self.profile_stage = profile_stage
+        self.trace_memory = trace_memory
+        self.run_id = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.data = {
+            'run_id': self.run_id,
+            'command': command,
+            'started_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'stages': [],
+            'http': [],
+        }
+        self._start = time.perf_counter()
+        log_event('run_start', run_id=self.run_id, command=command)
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """计量一个阶段；在 with 块内设置 metrics['rows_out']"""
+        metrics = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        profiler = None
+        if name == self.profile_stage:
+            import cProfile
+
+            profiler = cProfile.Profile()
+        log_event('stage_start', stage=name, rows_in=rows_in)
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield metrics
+        except BaseException as e:
+            metrics['error'] = repr(e)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            metrics['wall_s'] = round(time.perf_counter() - wall, 4)
+            metrics['cpu_s'] = round(time.process_time() - cpu, 4)
+            if self.trace_memory:
+                metrics['peak_mem_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            if profiler is not None:
+                metrics['profile'] = self._dump_profile(name, profiler)
+            self.data['stages'].append(metrics)
+            log_event('stage_end', level=logging.ERROR if 'error' in metrics else logging.INFO, **metrics)
+
+            memory = f", 峰值内存 {metrics['peak_mem_mb']:.1f}MB" if self.trace_memory else ''
+            print(f"[{name}] 耗时 {metrics['wall_s']:.2f}s, CPU {metrics['cpu_s']:.2f}s{memory}")
+
+    def _dump_profile(self, name, profiler, top=15):
+        """保存 cProfile 结果并打印累计耗时最高的函数，返回文件路径"""
+        import pstats
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f'{self.run_id}_{name}.prof')
+        profiler.dump_stats(path)
+        print(f"\n[{name}] cProfile 结果已保存至 {path}，累计耗时前 {top} 的函数:")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
+        return path
+
+    def record_page(self, offset, url, nbytes, stats, error=None, list_id=None):
+        """记录一页的字节数、首字节延迟、总耗时和重试次数"""
+        page = {
+            'list_id': list_id,
+            'offset': offset,
+            'url': url,
+            'bytes': nbytes,
+            'latency_s': round(stats.get('latency', 0.0), 4),
+            'elapsed_s': round(stats.get('elapsed', 0.0), 4),
+            'retries': stats.get('retries', 0),
+            'error': None if error is None else str(error),
+        }
+        self.data['http'].append(page)
+        log_event('http_page', level=logging.INFO if error is None else logging.ERROR, **page)
+
+    def set(self, key, value):
+        """附加运行级别的信息(如启动耗时)"""
+        self.data[key] = value
+
+    def summary(self):
+        """分页HTTP指标汇总"""
+        pages = self.data['http']
+        latencies = sorted(page['latency_s'] for page in pages if page['error'] is None)
+        return {
+            'pages': len(pages),
+            'failed': sum(page['error'] is not None for page in pages),
+            'bytes': sum(page['bytes'] or 0 for page in pages),
+            'retries': sum(page['retries'] for page in pages),
+            'latency_p50_s': latencies[len(latencies) // 2] if latencies else None,
+            'latency_max_s': latencies[-1] if latencies else None,
+        }
+
+    def save(self, directory=REPORT_DIR):
+        """写入 JSON 运行报告，返回文件路径"""
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.data['total_wall_s'] = round(time.perf_counter() - self._start, 4)
+        self.data['http_summary'] = self.summary()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'run_{self.run_id}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2, default=str)
+        log_event('run_end', run_id=self.run_id, total_wall_s=self.data['total_wall_s'], report=path)
+        print(f"运行报告已保存至 {path}")
+        return path
+
+
+def stage(report, name, rows_in=None):
+    """report 为 None 时不做计量"""
+    if report is None:
+        return contextlib.nullcontext({})
+    return report.stage(name, rows_in)
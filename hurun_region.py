@@ -0,0 +1,235 @@
+import argparse
+import os
+from functools import lru_cache
+
+# 省级行政区简称 -> 下辖地级行政区(及常见县级市)名称，名称均省略“市/地区/盟/自治州”等后缀。
+# 全称(如“广西壮族自治区”、“内蒙古自治区”)以简称开头，前缀匹配即可覆盖
+GAZETTEER = {
+    '北京': '', '天津': '', '上海': '', '重庆': '江津 万州 涪陵 永川 合川',
+    '河北': '石家庄 唐山 秦皇岛 邯郸 邢台 保定 张家口 承德 沧州 廊坊 衡水 任丘 迁安 定州 辛集',
+    '山西': '太原 大同 阳泉 长治 晋城 朔州 晋中 运城 忻州 临汾 吕梁',
+    '内蒙古': '呼和浩特 包头 乌海 赤峰 通辽 鄂尔多斯 呼伦贝尔 巴彦淖尔 乌兰察布 兴安 锡林郭勒 阿拉善',
+    '辽宁': '沈阳 大连 鞍山 抚顺 本溪 丹东 锦州 营口 阜新 辽阳 盘锦 铁岭 朝阳 葫芦岛',
+    '吉林': '长春 四平 辽源 通化 白山 松原 白城 延边',
+    '黑龙江': '哈尔滨 齐齐哈尔 鸡西 鹤岗 双鸭山 大庆 伊春 佳木斯 七台河 牡丹江 黑河 绥化 大兴安岭',
+    '江苏': '南京 无锡 徐州 常州 苏州 南通 连云港 淮安 盐城 扬州 镇江 泰州 宿迁 泰兴 江阴 昆山 张家港 常熟',
+    '浙江': '杭州 宁波 温州 嘉兴 湖州 绍兴 金华 衢州 舟山 台州 丽水 义乌 诸暨 慈溪',
+    '安徽': '合肥 芜湖 蚌埠 淮南 马鞍山 淮北 铜陵 安庆 黄山 滁州 阜阳 宿州 六安 亳州 池州 宣城',
+    '福建': '福州 厦门 莆田 三明 泉州 漳州 南平 龙岩 宁德 晋江 石狮',
+    '江西': '南昌 景德镇 萍乡 九江 新余 鹰潭 赣州 吉安 宜春 抚州 上饶 龙南',
+    '山东': '济南 青岛 淄博 枣庄 东营 烟台 潍坊 济宁 泰安 威海 日照 临沂 德州 聊城 滨州 菏泽',
+    '河南': '郑州 开封 洛阳 平顶山 安阳 鹤壁 新乡 焦作 濮阳 许昌 漯河 三门峡 南阳 商丘 信阳 周口 驻马店 济源',
+    '湖北': '武汉 黄石 十堰 宜昌 襄阳 鄂州 荆门 孝感 荆州 黄冈 咸宁 随州 恩施 仙桃 潜江 天门',
+    '湖南': '长沙 株洲 湘潭 衡阳 邵阳 岳阳 常德 张家界 益阳 郴州 永州 怀化 娄底 湘西 邵东 平江 沅江 浏阳',
+    '广东': '广州 韶关 深圳 珠海 汕头 佛山 江门 湛江 茂名 肇庆 惠州 梅州 汕尾 河源 阳江 清远 东莞 中山 潮州 揭阳 云浮 '
+            '惠阳 顺德 普宁',
+    '广西': '南宁 柳州 桂林 梧州 北海 防城港 钦州 贵港 玉林 百色 贺州 河池 来宾 崇左',
+    '海南': '海口 三亚 三沙 儋州 文昌 琼海 万宁 临高',
+    '四川': '成都 自贡 攀枝花 泸州 德阳 绵阳 广元 遂宁 内江 乐山 南充 眉山 宜宾 广安 达州 雅安 巴中 资阳 阿坝 甘孜 凉山',
+    '贵州': '贵阳 六盘水 遵义 安顺 毕节 铜仁 黔西南 黔东南 黔南',
+    '云南': '昆明 曲靖 玉溪 保山 昭通 丽江 普洱 临沧 楚雄 红河 文山 西双版纳 大理 德宏 怒江 迪庆',
+    '西藏': '拉萨 日喀则 昌都 林芝 山南 那曲 阿里',
+    '陕西': '西安 铜川 宝鸡 咸阳 渭南 延安 汉中 榆林 安康 商洛',
+    '甘肃': '兰州 嘉峪关 金昌 白银 天水 武威 张掖 平凉 酒泉 庆阳 定西 陇南 临夏 甘南',
+    '青海': '西宁 海东 海北 黄南 果洛 玉树 海西',
+    '宁夏': '银川 石嘴山 吴忠 固原 中卫',
+    '新疆': '乌鲁木齐 克拉玛依 吐鲁番 哈密 昌吉 博尔塔拉 巴音郭楞 阿克苏 克孜勒苏 喀什 和田 伊犁 塔城 阿勒泰 石河子',
+    '台湾': '台北 新北 桃园 台中 台南 高雄 基隆 新竹 嘉义 彰化 鹿港 屏东 宜兰 花莲',
+    '香港': '九龙 新界',
+    '澳门': '',
+}
+
+# 源数据中出现过的错别字/旧称 -> 规范名称
+ALIASES = {'蚌阜': '蚌埠', '毫州': '亳州', '襄樊': '襄阳', '沂州': '临沂'}
+
+# 中国省级边界：首次使用时下载一次原始数据，简化后保存为本地资产，之后离线读取；
+# 原始数据与简化资产都不纳入版本控制，离线环境可在联网机器上运行 python hurun_region.py 生成后复制过来
+BOUNDARY_URL = 'https://geo.datav.aliyun.com/areas_v3/bound/100000_full.json'
+BOUNDARY_DIR = 'cache/geo'
+BOUNDARY_RAW_FILE = os.path.join(BOUNDARY_DIR, 'china_100000_full.json')
+BOUNDARY_FILE = os.path.join(BOUNDARY_DIR, 'china_provinces_simplified.geojson')
+SIMPLIFY_TOLERANCE = 0.02  # 简化容差(度)，约2公里，按300dpi全国图绘制时肉眼不可见
+
+UNKNOWN = '未知'
+OVERSEAS = '海外'
+DOMESTIC_PREFIX = '中国'
+
+
+def _build_trie():
+    """把省级简称和地级名称装入字符 trie，叶子记录 (所属省份, 是否为省级名称)"""
+    trie = {}
+    entries = []
+    for province, cities in GAZETTEER.items():
+        entries.append((province, province, True))
+        entries.extend((city, province, False) for city in cities.split())
+    for alias, canonical in ALIASES.items():
+        province = next(p for p, cities in GAZETTEER.items() if canonical in cities.split())
+        entries.append((alias, province, False))
+
+    for name, province, is_province in entries:
+        node = trie
+        for char in name:
+            node = node.setdefault(char, {})
+        # 同名时省级名称优先(如“吉林”)
+        if '$' not in node or is_province:
+            node['$'] = (province, is_province)
+    return trie
+
+
+_TRIE = _build_trie()
+
+
+def _scan(text):
+    """在文本中做最长匹配扫描，返回按出现顺序排列的 (省份, 是否为省级名称)"""
+    matches = []
+    i = 0
+    while i < len(text):
+        node, found, end = _TRIE, None, i
+        for j in range(i, len(text)):
+            node = node.get(text[j])
+            if node is None:
+                break
+            if '$' in node:
+                found, end = node['$'], j + 1
+        if found:
+            matches.append(found)
+            i = end
+        else:
+            i += 1
+    return matches
+
+
+@lru_cache(maxsize=None)
+def resolve_province(location):
+    """把出生地字符串解析为省级简称；海外出生地返回“海外”，无法解析返回“未知”
+
+    先按“-”分段，靠前分段中的省级名称优先，其次用地级名称反查所属省份，
+    这样“山东-淄博”不会误取第二段，“奥地利”等国外地名也不会被当作省份
+    """
+    if not isinstance(location, str) or not location.strip():
+        return UNKNOWN
+
+    city_match = None
+    for part in location.split('-'):
+        for province, is_province in _scan(part.strip()):
+            if is_province:
+                return province
+            city_match = city_match or province
+    if city_match:
+        return city_match
+
+    if location.startswith(DOMESTIC_PREFIX):
+        return UNKNOWN
+    return OVERSEAS
+
+
+def resolve_provinces(locations):
+    """批量解析出生地，只对去重后的取值做解析，再按分类编码映射回每一行
+
+    返回与输入同索引的分类类型 Series
+    """
+    import numpy as np
+    import pandas as pd
+
+    categorical = pd.Categorical(locations)
+    resolved = [resolve_province(value) for value in categorical.categories]
+    provinces = pd.Index(sorted(set(resolved) | {UNKNOWN}))
+
+    # 分类编码 -1 表示缺失值，映射到末尾追加的“未知”
+    lookup = np.append(provinces.get_indexer(resolved), provinces.get_loc(UNKNOWN))
+    codes = lookup[categorical.codes]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=provinces),
+                     index=getattr(locations, 'index', None), name='出生省份')
+
+
+def normalize_province(name):
+    """把行政区全称(如“广西壮族自治区”)规范为省级简称；不是省级名称时返回 None"""
+    if not isinstance(name, str):
+        return None
+    for province, is_province in _scan(name):
+        if is_province:
+            return province
+    return None
+
+
+def fetch_boundaries(url=BOUNDARY_URL, path=BOUNDARY_RAW_FILE):
+    """下载原始边界数据，本地已有时直接返回路径"""
+    if not os.path.exists(path):
+        import requests
+
+        print(f"下载中国省级边界数据: {url}")
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(response.content)
+    return path
+
+
+def _simplify(gdf, tolerance):
+    """保持拓扑的简化：有 topojson 时按共享边界整体简化，相邻省份之间不会出现缝隙；
+    否则退回 shapely 的逐个多边形简化(保证各多边形有效)"""
+    try:
+        import topojson
+
+        return topojson.Topology(gdf, prequantize=False, toposimplify=tolerance).to_gdf()
+    except ImportError:
+        gdf = gdf.copy()
+        gdf['geometry'] = gdf.geometry.simplify(tolerance, preserve_topology=True)
+        return gdf
+
+
+def build_boundary_asset(raw_file=BOUNDARY_RAW_FILE, path=BOUNDARY_FILE, tolerance=SIMPLIFY_TOLERANCE):
+    """简化原始边界，计算各省质心并写入本地资产，返回资产路径
+
+    质心在等面积投影下计算；落在多边形之外时(如狭长或带飞地的省份)改用多边形内部代表点
+    """
+    import geopandas as gpd
+
+    gdf = gpd.read_file(raw_file)
+    gdf = gpd.GeoDataFrame({'省份': gdf['name'].map(normalize_province)}, geometry=gdf.geometry, crs=gdf.crs)
+    gdf = _simplify(gdf, tolerance).to_crs('EPSG:4326')
+
+    projected = gdf.geometry.to_crs('ESRI:102025')  # 亚洲北部 Albers 等面积投影
+    centroids = projected.centroid
+    points = centroids.where(centroids.within(projected), projected.representative_point())
+    points = gpd.GeoSeries(points, crs=projected.crs).to_crs('EPSG:4326')
+    gdf['经度'] = points.x.round(4)
+    gdf['纬度'] = points.y.round(4)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    gdf.to_file(path, driver='GeoJSON')
+    return path
+
+
+def boundary_version():
+    """本地简化边界资产的版本(修改时间)，不存在时为 None；作为地图图表的输入，资产生成或更新后地图随之重新渲染"""
+    return os.path.getmtime(BOUNDARY_FILE) if os.path.exists(BOUNDARY_FILE) else None
+
+
+@lru_cache(maxsize=1)
+def load_boundaries():
+    """读取本地简化边界；资产不存在时下载并生成一次，无法下载时抛出 FileNotFoundError"""
+    import geopandas as gpd
+
+    if not os.path.exists(BOUNDARY_FILE):
+        try:
+            raw_file = fetch_boundaries()
+        except OSError as e:
+            raise FileNotFoundError(f"边界资产 {BOUNDARY_FILE} 不存在且无法下载原始数据 ({type(e).__name__})，"
+                                    f"请联网后运行 python hurun_region.py 生成") from e
+        build_boundary_asset(raw_file)
+    return gpd.read_file(BOUNDARY_FILE)
+
+
+def province_centroids():
+    """各省质心，索引为省级简称，列为 经度/纬度"""
+    boundaries = load_boundaries()
+    return boundaries.dropna(subset=['省份']).set_index('省份')[['经度', '纬度']]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成本地简化的中国省级边界资产")
+    parser.add_argument('--tolerance', type=float, default=SIMPLIFY_TOLERANCE, help="简化容差(度)")
+    args = parser.parse_args()
+    print(f"边界资产已保存至 {build_boundary_asset(fetch_boundaries(), tolerance=args.tolerance)}")
@@ -0,0 +1,288 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+
+matplotlib.use('Agg')  # 无界面后端，可在子进程中安全绘图
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+from hurun_build import stale_jobs
+
+# 中文字体列表
+FONT_FAMILY = ['SimHei', 'Microsoft YaHei', 'WenQuanYi Micro Hei']
+
+
+def setup_matplotlib():
+    """设置中文字体支持 - 解决乱码问题"""
+    plt.rcParams['font.sans-serif'] = FONT_FAMILY
+    plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+
+
+def _hist_with_kde(values, bins, color):
+    """人数直方图叠加核密度曲线
+
+    密度由 hurun_distribution.binned_kde 以分箱 FFT 计算(耗时与样本数近似线性)，
+    再乘以 样本数×组距 换算为与直方图相同的人数刻度
+    """
+    import hurun_distribution
+
+    values = values.dropna()
+    ax = sns.histplot(values, bins=bins, color=color)
+    width = (values.max() - values.min()) / bins if len(values) else 0
+    if width > 0:
+        grid, density = hurun_distribution.binned_kde(values, cut=0)
+        ax.plot(grid, density * len(values) * width, color=color)
+    return ax
+
+
+def plot_industry_bars(top_industries, path):
+    """TOP15行业富豪数量条形图"""
+    plt.figure(figsize=(16, 12))
+    sns.barplot(x='富豪数量', y=top_industries.index, data=top_industries, palette='viridis')
+    plt.title('TOP15行业富豪数量分布', fontsize=18)
+    plt.xlabel('富豪数量', fontsize=14)
+    plt.ylabel('行业', fontsize=14)
+    plt.tight_layout()
+    plt.savefig(path, dpi=300)
+    plt.close()
+
+
+def plot_industry_bubble(top_industries, path):
+    """行业富豪数量与平均财富气泡图"""
+    plt.figure(figsize=(16, 12))
+    sns.scatterplot(
+        x='富豪数量',
+        y='平均财富',
+        size='总财富',
+        sizes=(100, 2000),
+        hue=top_industries.index,
+        data=top_industries,
+        palette='tab20',
+        legend='brief'
+    )
+    plt.title('行业富豪数量与财富分布关系', fontsize=18)
+    plt.xlabel('富豪数量', fontsize=14)
+    plt.ylabel('平均财富(亿人民币)', fontsize=14)
+    plt.grid(True, linestyle='--', alpha=0.3)
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.tight_layout()
+    plt.savefig(path, dpi=300)
+    plt.close()
+
+
+def plot_demographics(age_wealth, gender_count, wealth_level_count, path):
+    """人口统计特征四联图，age_wealth 只含年龄与财富两列"""
+    ages = age_wealth['年龄'].dropna()
+    plt.figure(figsize=(18, 14))
+
+    # 1. 年龄分布分析
+    plt.subplot(2, 2, 1)
+    _hist_with_kde(ages, bins=20, color='skyblue')
+    plt.axvline(ages.mean(), color='red', linestyle='--',
+                label=f'平均年龄: {ages.mean():.1f}岁')
+    plt.axvline(ages.median(), color='green', linestyle='--',
+                label=f'中位年龄: {ages.median()}岁')
+    plt.title('富豪年龄分布', fontsize=16)
+    plt.xlabel('年龄', fontsize=12)
+    plt.ylabel('人数', fontsize=12)
+    plt.legend(fontsize=12)
+
+    # 2. 年龄与财富关系
+    plt.subplot(2, 2, 2)
+    sns.regplot(
+        x='年龄',
+        y='财富值(亿人民币)',
+        data=age_wealth,
+        scatter_kws={'alpha': 0.5, 'color': 'blue'},
+        line_kws={'color': 'red', 'linewidth': 2.5}
+    )
+    plt.title('年龄与财富关系', fontsize=16)
+    plt.xlabel('年龄', fontsize=12)
+    plt.ylabel('财富值(亿人民币)', fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.3)
+
+    # 3. 性别分布
+    plt.subplot(2, 2, 3)
+    gender_count.plot.pie(
+        autopct='%1.1f%%',
+        colors=['#66b3ff', '#ff9999', '#99ff99'],
+        startangle=90,
+        explode=[0.05] * len(gender_count),
+        textprops={'fontsize': 12}
+    )
+    plt.title('富豪性别分布', fontsize=16)
+    plt.ylabel('')
+
+    # 4. 财富金字塔
+    plt.subplot(2, 2, 4)
+    sns.barplot(x=wealth_level_count.values, y=wealth_level_count.index, palette='magma')
+    plt.title('财富等级分布', fontsize=16)
+    plt.xlabel('人数', fontsize=12)
+    plt.ylabel('财富等级', fontsize=12)
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300)
+    plt.close()
+
+
+def plot_age_wealth_heatmap(heatmap_data, path):
+    """不同年龄段的财富等级占比热力图"""
+    plt.figure(figsize=(14, 10))
+    sns.heatmap(heatmap_data, annot=True, cmap="YlGnBu", fmt='.1%', annot_kws={"size": 12})
+    plt.title('不同年龄段的财富分布比例', fontsize=18)
+    plt.xlabel('财富等级', fontsize=14)
+    plt.ylabel('年龄分组', fontsize=14)
+    plt.tight_layout()
+    plt.savefig(path, dpi=300)
+    plt.close()
+
+
+def plot_birthplace_bars(top_provinces, path):
+    """出生省份条形图"""
+    plt.figure(figsize=(14, 10))
+    sns.barplot(x=top_provinces.values, y=top_provinces.index, palette='rocket')
+    plt.title('富豪出生地分布', fontsize=18)
+    plt.xlabel('富豪人数', fontsize=14)
+    plt.ylabel('地区', fontsize=14)
+    plt.tight_layout()
+    plt.savefig(path, dpi=300)
+    plt.close()
+
+
+def plot_birthplace_map(province_counts, path, boundary_version=None):
+    """出生地分布地图，需要 geopandas；边界与省份质心来自本地简化资产
+
+    boundary_version 为资产版本(hurun_region.boundary_version)，只用于图表指纹
+    """
+    import hurun_region
+
+    china_map = hurun_region.load_boundaries()
+
+    # 按省份质心定位，覆盖 clean_data 解析出的所有省份(海外/未知除外)
+    geo_df = hurun_region.province_centroids().join(province_counts.rename('富豪数量'), how='inner')
+    geo_df = geo_df[geo_df['富豪数量'] > 0]
+
+    # 绘制地图
+    fig, ax = plt.subplots(figsize=(16, 12))
+    china_map.plot(ax=ax, color='#f0f0f0', edgecolor='#999999')
+
+    # 绘制散点图
+    ax.scatter(
+        geo_df['经度'],
+        geo_df['纬度'],
+        s=geo_df['富豪数量'] * 0.5,
+        color='red',
+        alpha=0.7,
+        edgecolor='black',
+        linewidth=0.5
+    )
+
+    # 添加省份标签
+    for prov, (x, y, count) in geo_df[['经度', '纬度', '富豪数量']].iterrows():
+        plt.text(x, y, f"{prov}\n{int(count)}人", fontsize=9, ha='center', va='center')
+
+    plt.title('中国富豪出生地分布热力图', fontsize=18)
+    plt.axis('off')
+    plt.tight_layout()
+    plt.savefig(path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def plot_wealth_distribution(age_wealth, wealth_log, path):
+    """财富分布四联图，age_wealth 只含年龄与财富两列"""
+    wealth = age_wealth['财富值(亿人民币)']
+    plt.figure(figsize=(16, 12))
+
+    # 1. 财富分布直方图
+    plt.subplot(2, 2, 1)
+    _hist_with_kde(wealth, bins=50, color='purple')
+    plt.title('财富值分布', fontsize=16)
+    plt.xlabel('财富值(亿人民币)', fontsize=12)
+    plt.ylabel('人数', fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.3)
+
+    # 2. 对数转换后的分布
+    plt.subplot(2, 2, 2)
+    _hist_with_kde(wealth_log, bins=30, color='orange')
+    plt.title('财富值(对数)分布', fontsize=16)
+    plt.xlabel('财富值对数(log10)', fontsize=12)
+    plt.ylabel('人数', fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.3)
+
+    # 3. 财富箱线图
+    plt.subplot(2, 2, 3)
+    sns.boxplot(x=wealth, color='skyblue')
+    plt.title('财富值箱线图', fontsize=16)
+    plt.xlabel('财富值(亿人民币)', fontsize=12)
+
+    # 4. 财富与年龄关系
+    plt.subplot(2, 2, 4)
+    sns.scatterplot(x='年龄', y='财富值(亿人民币)', data=age_wealth, alpha=0.6, color='green')
+    plt.title('年龄与财富关系', fontsize=16)
+    plt.xlabel('年龄', fontsize=12)
+    plt.ylabel('财富值(亿人民币)', fontsize=12)
+    plt.yscale('log')
+
+    plt.tight_layout()
+    plt.savefig(path, dpi=300)
+    plt.close()
+
+
+def _run_job(job):
+    """在当前进程中渲染一个图表，返回耗时(秒)"""
+    start = time.perf_counter()
+    globals()[job.func](path=job.path, **job.kwargs)
+    return time.perf_counter() - start
+
+
+def render_figures(jobs, max_workers=None, build_cache=None, digests=None):
+    """把图表任务分发到进程池并行渲染，打印并返回每个图表的耗时 {路径: 秒}
+
+    max_workers=1 时在当前进程中串行渲染；单个图表失败不影响其他图表。
+    传入 build_cache 时，指纹未变化且文件仍存在的图表直接跳过；digests 为已算好的 {路径: 指纹}
+    """
+    if digests is None:
+        stale, digests = stale_jobs(jobs, build_cache)
+        if len(stale) < len(jobs):
+            print(f"{len(jobs) - len(stale)} 个图表输入未变化，跳过渲染")
+        jobs = stale
+    if not jobs:
+        return {}
+    for job in jobs:
+        os.makedirs(os.path.dirname(job.path) or '.', exist_ok=True)
+
+    timings = {}
+    start = time.perf_counter()
+
+    def report(job, future_or_call):
+        try:
+            timings[job.path] = future_or_call()
+            if build_cache is not None:
+                build_cache.record(job.path, digests[job.path])
+            print(f"图表已保存至 {job.path} (渲染耗时 {timings[job.path]:.2f}s)")
+        except ImportError as e:
+            print(f"缺少依赖 ({e.name})，跳过 {job.path}")
+            if build_cache is not None:
+                build_cache.record_failure(job.path, digests[job.path], f"缺少依赖 ({e.name})")
+        except Exception as e:
+            print(f"渲染 {job.path} 时出错: {e}")
+            if build_cache is not None:
+                build_cache.record_failure(job.path, digests[job.path], str(e))
+
+    if max_workers == 1:
+        setup_matplotlib()
+        for job in jobs:
+            report(job, lambda: _run_job(job))
+    else:
+        workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers, initializer=setup_matplotlib) as executor:
+            futures = {executor.submit(_run_job, job): job for job in jobs}
+            for future in as_completed(futures):
+                report(futures[future], future.result)
+
+    elapsed = time.perf_counter() - start
+    print(f"共渲染 {len(timings)}/{len(jobs)} 个图表，总耗时 {elapsed:.2f}s "
+          f"(各图表耗时合计 {sum(timings.values()):.2f}s)")
+    return timings
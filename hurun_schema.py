@@ -0,0 +1,196 @@
+import json
+import logging
+from collections import Counter, namedtuple
+
+try:
+    import orjson  # 可选：更快的整页JSON解码
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # 可选：增量解码JSON字节流
+except ImportError:
+    ijson = None
+
+import hurun_metrics
+
+# 接口记录的声明式模式：列名、来源(rank 为榜单记录本身，character 为 hs_Character[0])、接口字段、类型、是否必需。
+# 必需字段在整个榜单中都缺失时视为模式变化，停止写入缓存，而不是产生一整列空值
+Field = namedtuple('Field', ['column', 'source', 'key', 'kind', 'required'])
+FIELDS = [
+    Field('排名', 'rank', 'hs_Rank_Rich_Ranking', int, True),
+    Field('财富值(亿人民币)', 'rank', 'hs_Rank_Rich_Wealth', float, True),
+    Field('公司', 'rank', 'hs_Rank_Rich_ComName_Cn', str, False),
+    Field('行业', 'rank', 'hs_Rank_Rich_Industry_Cn', str, False),
+    Field('姓名', 'character', 'hs_Character_Fullname_Cn', str, True),
+    Field('年龄', 'character', 'hs_Character_Age', int, False),
+    Field('出生地', 'character', 'hs_Character_BirthPlace_Cn', str, False),
+    Field('性别', 'character', 'hs_Character_Gender', str, False),
+]
+CHARACTER_KEY = 'hs_Character'
+KEY_PREFIXES = {'rank': 'hs_Rank_Rich_', 'character': 'hs_Character_'}
+COLUMNS = [field.column for field in FIELDS]
+
+_MISSING = object()
+
+
+class SchemaDriftError(ValueError):
+    """接口字段被重命名或删除，解码结果不可用"""
+
+
+class SchemaDrift:
+    """统计解码过程中各字段的缺失、空值和类型错误，以及模式中未声明的字段
+
+    某字段缺失时，同一来源中未声明的字段作为可能的新名称一并报告
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.skipped = 0
+        self.missing = Counter()
+        self.nulls = Counter()
+        self.invalid = Counter()
+        self.unknown = {source: Counter() for source in KEY_PREFIXES}
+        self._known = {source: {field.key for field in FIELDS if field.source == source} for source in KEY_PREFIXES}
+        self._known['rank'].add(CHARACTER_KEY)
+
+    def observe_keys(self, source, keys):
+        """记录一条记录中以该来源前缀开头、但模式中未声明的字段"""
+        prefix, known = KEY_PREFIXES[source], self._known[source]
+        self.unknown[source].update(key for key in keys if key.startswith(prefix) and key not in known)
+
+    def summary(self):
+        """可写入运行报告的统计字典"""
+        return {
+            'rows': self.rows,
+            'skipped': self.skipped,
+            'missing': dict(self.missing),
+            'nulls': dict(self.nulls),
+            'invalid': dict(self.invalid),
+            'unknown_keys': {source: dict(counter) for source, counter in self.unknown.items() if counter},
+        }
+
+    def problems(self):
+        """返回 (错误, 警告) 两个消息列表：必需字段全部缺失为错误，其余缺失和类型错误为警告"""
+        errors, warnings = [], []
+        for field in FIELDS:
+            missing = self.missing[field.column]
+            if missing:
+                candidates = [key for key, _ in self.unknown[field.source].most_common(5)]
+                hint = f"，可能的新字段: {', '.join(candidates)}" if candidates else ''
+                message = f"字段 {field.key} ({field.column}) 在 {missing}/{self.rows} 条记录中缺失{hint}"
+                (errors if field.required and missing == self.rows else warnings).append(message)
+            if self.invalid[field.column]:
+                warnings.append(f"字段 {field.key} ({field.column}) 有 {self.invalid[field.column]} 个值"
+                                f"无法转换为 {field.kind.__name__}")
+        return errors, warnings
+
+    def check(self, report=None, context=''):
+        """打印并记录模式变化；必需字段全部缺失时抛出 SchemaDriftError"""
+        summary = self.summary()
+        if report is not None:
+            report.set('schema' + (f'_{context}' if context else ''), summary)
+        errors, warnings = self.problems()
+        if errors or warnings:
+            hurun_metrics.log_event('schema_drift', level=logging.ERROR if errors else logging.WARNING,
+                                    context=context, errors=errors, warnings=warnings, **summary)
+        prefix = f"[{context}] " if context else ''
+        for message in warnings:
+            print(f"{prefix}模式警告: {message}")
+        if errors:
+            raise SchemaDriftError(f"{prefix}接口模式已变化: " + '; '.join(errors))
+
+
+def _coerce(value, kind):
+    """按声明类型转换；无法转换时抛出 ValueError/TypeError"""
+    if kind is str:
+        return value if isinstance(value, str) else str(value)
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+        return kind(float(value)) if kind is int else kind(value)
+    if isinstance(value, bool):
+        raise TypeError(value)
+    if kind is int and isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(value)
+    return kind(value)
+
+
+def _decode_value(value, field, drift):
+    """类型不符时的慢路径：记录缺失/空值/无法转换的值，返回转换结果或 None"""
+    if value is _MISSING:
+        drift.missing[field.column] += 1
+        return None
+    if value is None:
+        drift.nulls[field.column] += 1
+        return None
+    try:
+        return _coerce(value, field.kind)
+    except (TypeError, ValueError):
+        drift.invalid[field.column] += 1
+        return None
+
+
+def decode_rows(items, drift=None):
+    """把接口 rows 数组解码为按列存放的类型化数据 {列名: list}，没有人物数据的记录跳过
+
+    每个字段只查找一次，类型已符合声明的值直接追加到对应列，不构造逐行字典；
+    未声明的字段由键集合差集检出，只在出现时才逐个记录
+    """
+    drift = SchemaDrift() if drift is None else drift
+    columns = {column: [] for column in COLUMNS}
+    plans = {source: [(field, field.key, field.kind, columns[field.column].append)
+                      for field in FIELDS if field.source == source] for source in KEY_PREFIXES}
+    rank_plan, character_plan = plans['rank'], plans['character']
+    rank_known, character_known = drift._known['rank'], drift._known['character']
+    for item in items:
+        characters = item.get(CHARACTER_KEY)
+        if not characters:
+            drift.skipped += 1
+            continue
+        character = characters[0]
+        drift.rows += 1
+        for source, record, plan, known in (('rank', item, rank_plan, rank_known),
+                                            ('character', character, character_plan, character_known)):
+            extra = record.keys() - known
+            if extra:
+                drift.observe_keys(source, extra)
+            for field, key, kind, append in plan:
+                value = record.get(key, _MISSING)
+                append(value if type(value) is kind else _decode_value(value, field, drift))
+    return columns
+
+
+def load_page(path):
+    """读取一页原始响应中的 rows 数组
+
+    优先用 orjson 整页解码(单页最多 PAGE_SIZE 条)；否则用 ijson 增量解码，最后退回标准库
+    """
+    with open(path, 'rb') as f:
+        if orjson is not None:
+            return orjson.loads(f.read()).get('rows', [])
+        if ijson is not None:
+            return list(ijson.items(f, 'rows.item', use_float=True))
+        return json.load(f).get('rows', [])
+
+
+def decode_page(path, drift=None):
+    """解码一个分页文件，返回按列存放的类型化数据"""
+    return decode_rows(load_page(path), drift)
+
+
+def concat_columns(batches):
+    """合并多批按列存放的数据"""
+    columns = {column: [] for column in COLUMNS}
+    for batch in batches:
+        for column in COLUMNS:
+            columns[column].extend(batch[column])
+    return columns
+
+
+def iter_records(columns):
+    """按行产出记录字典(兼容逐条处理的调用方)"""
+    for values in zip(*(columns[column] for column in COLUMNS)):
+        yield dict(zip(COLUMNS, values))
@@ -0,0 +1,222 @@
+import argparse
+import bisect
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+
+import hurun_cache
+
+# 倒排索引文件：cache/search/<榜单ID>.json，由清洗后的数据构建；查询时只用标准库，不加载 pandas
+SEARCH_INDEX_DIR = hurun_cache.SEARCH_INDEX_DIR
+INDEX_VERSION = 1
+# 建立字符 n-gram 倒排表的文本列与支持区间查询的数值列
+TEXT_FIELDS = ['姓名', '公司', '出生地', '行业']
+NUMERIC_FIELDS = ['排名', '财富值(亿人民币)', '年龄']
+DISPLAY_FIELDS = ['排名', '姓名', '财富值(亿人民币)', '公司', '行业', '年龄', '出生地']
+# 查询中可以使用的字段别名
+FIELD_ALIASES = {
+    'name': '姓名', 'company': '公司', 'birthplace': '出生地', '籍贯': '出生地', 'industry': '行业',
+    'rank': '排名', 'wealth': '财富值(亿人民币)', '财富': '财富值(亿人民币)', '财富值': '财富值(亿人民币)', 'age': '年龄',
+}
+# 字段:文本 / 字段>=数值 等查询条件
+TERM_PATTERN = re.compile(r'^(?P<field>[^:<>=]+)(?P<op>:|>=|<=|>|<|=)(?P<value>.+)$')
+NGRAM_SIZE = 2
+
+
+def index_path(list_id):
+    return os.path.join(SEARCH_INDEX_DIR, f'{list_id}.json')
+
+
+def normalize_text(value):
+    """全角转半角、转小写、去掉空白"""
+    if not isinstance(value, str):
+        return ''
+    return re.sub(r'\s+', '', unicodedata.normalize('NFKC', value)).lower()
+
+
+def ngrams(text, size=NGRAM_SIZE):
+    """文本的字符 n-gram 集合；不足 size 个字符时返回文本本身"""
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def build_index(df, list_id):
+    """为清洗后的榜单构建查询索引并写入 cache/search/<榜单ID>.json，返回文件路径
+
+    文本列建立 单字 + 双字 的倒排表(单字用于一个字的查询)；数值列保存按值升序的 (值, 行号) 两个数组，
+    区间查询时二分查找。行号为记录在 records 中的位置
+    """
+    records = df[DISPLAY_FIELDS].astype(object).where(df[DISPLAY_FIELDS].notna(), None).to_dict('records')
+
+    postings = {}
+    for field in TEXT_FIELDS:
+        table = {}
+        for row, value in enumerate(df[field].astype(object)):
+            text = normalize_text(value)
+            for gram in ngrams(text) | set(text):
+                table.setdefault(gram, []).append(row)
+        postings[field] = table
+
+    sorted_values = {}
+    for field in NUMERIC_FIELDS:
+        pairs = sorted((float(value), row) for row, value in enumerate(df[field]) if not _missing(value))
+        sorted_values[field] = {'values': [value for value, _ in pairs], 'rows': [row for _, row in pairs]}
+
+    index = {'version': INDEX_VERSION, 'list_id': list_id, 'built_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+             'records': records, 'postings': postings, 'sorted': sorted_values}
+    os.makedirs(SEARCH_INDEX_DIR, exist_ok=True)
+    path = index_path(list_id)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def load_index(list_id):
+    """读取查询索引；不存在或版本不符时返回 None"""
+    path = index_path(list_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        index = json.load(f)
+    return index if index.get('version') == INDEX_VERSION else None
+
+
+def parse_query(text_terms):
+    """把查询条件解析为 [(字段, 运算符, 值)]；没有字段名的文本在全部文本列中查找(字段为 None)"""
+    conditions = []
+    for term in text_terms:
+        match = TERM_PATTERN.match(term)
+        if match is None:
+            conditions.append((None, ':', term))
+            continue
+        field = FIELD_ALIASES.get(match['field'].lower(), match['field'])
+        op, value = match['op'], match['value']
+        if op == ':':
+            if field not in TEXT_FIELDS:
+                raise ValueError(f"字段 {field} 不支持文本查询 (可选: {', '.join(TEXT_FIELDS)})")
+        else:
+            if field not in NUMERIC_FIELDS:
+                raise ValueError(f"字段 {field} 不支持区间查询 (可选: {', '.join(NUMERIC_FIELDS)})")
+            if field == '财富值(亿人民币)':
+                value = value.strip().removesuffix('亿')  # 财富值以亿为单位，允许写作 财富>100亿
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"查询条件 {term} 中的 {value} 不是数值") from None
+        conditions.append((field, op, value))
+    return conditions
+
+
+def _text_matches(index, field, text, min_similarity):
+    """某文本列中与查询文本匹配的行号集合
+
+    先由倒排表取出含有查询 n-gram 的候选行：min_similarity 为 1 时要求包含全部 n-gram 并复核子串；
+    小于 1 时为模糊匹配，命中的 n-gram 比例不低于 min_similarity 即可(容忍错字、漏字)
+    """
+    query = normalize_text(text)
+    grams = ngrams(query)
+    if not grams:
+        return set()
+    table = index['postings'][field]
+    if min_similarity >= 1:
+        lists = sorted((table.get(gram, []) for gram in grams), key=len)
+        rows = set(lists[0]).intersection(*lists[1:])
+        return {row for row in rows if query in normalize_text(index['records'][row][field])}
+    hits = {}
+    for gram in grams:
+        for row in table.get(gram, []):
+            hits[row] = hits.get(row, 0) + 1
+    needed = math.ceil(min_similarity * len(grams))
+    return {row for row, count in hits.items() if count >= needed}
+
+
+def _range_matches(index, field, op, value):
+    """数值列满足比较条件的行号集合，在升序数组上二分查找边界"""
+    column = index['sorted'][field]
+    values, rows = column['values'], column['rows']
+    if op in ('>=', '>'):
+        start = (bisect.bisect_left if op == '>=' else bisect.bisect_right)(values, value)
+        return set(rows[start:])
+    if op in ('<=', '<'):
+        end = (bisect.bisect_right if op == '<=' else bisect.bisect_left)(values, value)
+        return set(rows[:end])
+    return set(rows[bisect.bisect_left(values, value):bisect.bisect_right(values, value)])
+
+
+def search(index, conditions, min_similarity=1.0):
+    """按全部条件(取交集)查询，返回按排名升序的记录列表"""
+    result = None
+    for field, op, value in conditions:
+        if op == ':':
+            fields = [field] if field else TEXT_FIELDS
+            rows = set().union(*(_text_matches(index, name, value, min_similarity) for name in fields))
+        else:
+            rows = _range_matches(index, field, op, value)
+        result = rows if result is None else result & rows
+        if not result:
+            return []
+    rows = range(len(index['records'])) if result is None else result
+    records = [index['records'][row] for row in rows]
+    return sorted(records, key=lambda record: (record['排名'] is None, record['排名'] or 0))
+
+
+def format_records(records, limit=None):
+    """对齐输出查询结果"""
+    shown = records[:limit] if limit else records
+    lines = ['\t'.join(DISPLAY_FIELDS)]
+    for record in shown:
+        lines.append('\t'.join('' if record[field] is None else f'{record[field]:g}' if isinstance(record[field], float)
+                               else str(record[field]) for field in DISPLAY_FIELDS))
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    import hurun_spider
+
+    parser = argparse.ArgumentParser(description="胡润榜单查询索引：字符 n-gram 模糊查询与数值区间查询")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="读取(必要时爬取)并清洗榜单，构建查询索引")
+    build_parser.add_argument('--list-id', default=hurun_spider.LIST_ID, help="榜单ID")
+
+    query_parser = subparsers.add_parser(
+        'query', help="查询榜单", description="条件之间取交集，例如: 出生地:绍兴 行业:医疗 财富>=100亿",
+        epilog=f"文本字段: {', '.join(TEXT_FIELDS)}；数值字段: {', '.join(NUMERIC_FIELDS)}；"
+               f"运算符: 字段:文本  字段>=值  字段<=值  字段>值  字段<值  字段=值；不带字段的文本在全部文本字段中查找")
+    query_parser.add_argument('terms', nargs='*', help="查询条件")
+    query_parser.add_argument('--list-id', default=hurun_spider.LIST_ID, help="榜单ID")
+    query_parser.add_argument('--fuzzy', type=float, nargs='?', const=0.6, default=1.0, metavar='相似度',
+                              help="模糊匹配：命中的双字比例不低于该值即可 (默认 0.6)")
+    query_parser.add_argument('--limit', type=int, default=50, help="最多显示的条数，0 表示全部")
+    query_parser.add_argument('--json', action='store_true', help="以 JSON 输出")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        df_clean, _ = hurun_spider.prepare_data(args.list_id)
+        print(f"查询索引已保存至 {build_index(df_clean, args.list_id)}")
+    else:
+        start = time.perf_counter()
+        index = load_index(args.list_id)
+        if index is None:
+            raise SystemExit(f"榜单 {args.list_id} 的查询索引不存在，请先运行 hurun_search.py build")
+        loaded = time.perf_counter()
+        try:
+            conditions = parse_query(args.terms)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        records = search(index, conditions, args.fuzzy)
+        elapsed = time.perf_counter() - loaded
+        if args.json:
+            print(json.dumps(records[:args.limit or None], ensure_ascii=False, indent=2))
+        else:
+            print(format_records(records, args.limit))
+            print(f"\n共 {len(records)} 条 (加载索引 {(loaded - start) * 1000:.1f}ms, 查询 {elapsed * 1000:.2f}ms)")
@@ -1,124 +1,458 @@
-import requests
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import re
-from tqdm import tqdm
+import datetime
+import importlib
+import json
+import logging
 import os
-import matplotlib as mpl
+import random
+import time
 
-# 设置中文字体支持 - 解决乱码问题
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'WenQuanYi Micro Hei']  # 中文字体列表
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+_START = time.perf_counter()
 
-# 创建缓存目录
-os.makedirs('cache', exist_ok=True)
-os.makedirs('results_1', exist_ok=True)
+try:
+    import ijson  # 可选：增量解码JSON字节流
+except ImportError:
+    ijson = None
 
+import hurun_cache
+import hurun_metrics
+import hurun_schema
 
-def crawl_hurun_rich_list():
-    """爬取胡润富豪榜数据"""
-    # 检查缓存文件是否存在
-    cache_file = 'cache/hurun_rich_list.csv'
-    if os.path.exists(cache_file):
-        print("使用缓存数据...")
-        return pd.read_csv(cache_file)
+# 重型依赖(pandas/matplotlib/seaborn/requests/tqdm)只在用到它们的阶段内导入，
+# 只刷新爬取结果的定时任务不必加载绘图相关的库；各阶段依赖见 STAGE_DEPENDENCIES
 
-    base_url = "https://www.hurun.net/zh-CN/Rank/HsRankDetailsList?num=ODBYW2BI&search=&offset={}&limit=200"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Referer': 'https://www.hurun.net/zh-CN/Rank/HsRankDetails?pagetype=rich'
-    }
 
-    all_data = []
-    print("开始爬取胡润富豪榜数据...")
-    for page in tqdm(range(6)):  # 分页爬取1094条数据
-        offset = page * 200
-        url = base_url.format(offset)
+# 胡润榜单接口配置
+LIST_ID = 'ODBYW2BI'
+LIST_URL_TEMPLATE = "https://www.hurun.net/zh-CN/Rank/HsRankDetailsList?num={list_id}&search=&offset={{}}&limit=200"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Referer': 'https://www.hurun.net/zh-CN/Rank/HsRankDetails?pagetype=rich'
+}
+PAGE_SIZE = 200
+PAGE_COUNT = 6  # 首页响应中没有 total 字段时的默认页数(1094条数据)
+
+
+def list_url(list_id):
+    """榜单ID对应的分页接口地址模板，{} 处填入 offset"""
+    return LIST_URL_TEMPLATE.format(list_id=list_id)
+
+
+BASE_URL = list_url(LIST_ID)
+
+
+class IncompleteCrawlError(RuntimeError):
+    """仍有分页未完成且没有可用的旧缓存，爬取结果不完整，不能用于清洗、导出或绘图"""
+
+
+# 分页检查点：每个榜单一个目录，每页原始JSON单独保存，清单记录总人数与已完成/失败的偏移量
+PAGE_CACHE_DIR = hurun_cache.PAGE_CACHE_DIR
+
+
+def create_session(pool_size=8):
+    """创建共享连接池的会话，复用TCP/TLS连接"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def _check_json(path):
+    """流式校验文件是完整的JSON(截断或错误页会抛出 ValueError)，不在内存中构建对象"""
+    with open(path, 'rb') as f:
+        if ijson is None:
+            json.load(f)
+            return
         try:
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-
-            for item in data.get('rows', []):
-                # 检查是否有有效的人物数据
-                if 'hs_Character' not in item or not item['hs_Character']:
-                    continue
-
-                # 提取核心字段：排名/财富/公司/行业
-                record = {
-                    '排名': item.get('hs_Rank_Rich_Ranking'),
-                    '财富值(亿人民币)': item.get('hs_Rank_Rich_Wealth'),
-                    '公司': item.get('hs_Rank_Rich_ComName_Cn'),
-                    '行业': item.get('hs_Rank_Rich_Industry_Cn'),
-                    '姓名': item['hs_Character'][0].get('hs_Character_Fullname_Cn'),
-                    '年龄': item['hs_Character'][0].get('hs_Character_Age'),
-                    '出生地': item['hs_Character'][0].get('hs_Character_BirthPlace_Cn'),
-                    '性别': item['hs_Character'][0].get('hs_Character_Gender')
-                }
-                all_data.append(record)
-        except Exception as e:
-            print(f"爬取第 {page + 1} 页时出错: {e}")
-
-    df = pd.DataFrame(all_data)
-    print(f"成功爬取 {len(df)} 条富豪数据")
-
-    # 保存到缓存
-    df.to_csv(cache_file, index=False)
-    print(f"数据已缓存至 {cache_file}")
-    return df
+            for _ in ijson.parse(f):
+                pass
+        except ijson.JSONError as e:
+            raise ValueError(f"响应不是完整的JSON: {e}") from e
+
+
+def fetch_page(session, url, path, max_retries=3, backoff=0.5, timeout=30, chunk_size=64 * 1024, stats=None):
+    """把单页响应按块流式写入 path，返回字节数；失败时按带随机抖动的指数退避重试
 
+    传入 stats 字典时填入 retries(重试次数)、latency(最后一次请求的首字节延迟)和 elapsed(总耗时)，单位为秒
+    """
+    import requests
 
-def clean_data(df):
-    """数据清洗与预处理"""
-    print("\n开始数据清洗...")
+    stats = {} if stats is None else stats
+    start = time.perf_counter()
+    for attempt in range(max_retries + 1):
+        stats['retries'] = attempt
+        try:
+            nbytes = 0
+            request_start = time.perf_counter()
+            with session.get(url, timeout=timeout, stream=True) as response:
+                stats['latency'] = time.perf_counter() - request_start
+                response.raise_for_status()
+                with open(path + '.tmp', 'wb') as f:
+                    for chunk in response.iter_content(chunk_size):
+                        f.write(chunk)
+                        nbytes += len(chunk)
+            _check_json(path + '.tmp')
+            os.replace(path + '.tmp', path)
+            stats['elapsed'] = time.perf_counter() - start
+            return nbytes
+        except (requests.RequestException, ValueError) as e:
+            if attempt == max_retries:
+                stats['elapsed'] = time.perf_counter() - start
+                raise
+            hurun_metrics.log_event('http_retry', level=logging.WARNING, url=url, attempt=attempt + 1, error=str(e))
+            # 抖动避免多个分页同时重试冲击服务器
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def fetch_tasks(tasks, session, concurrency=4, max_retries=3, backoff=0.5, on_page=None, report=None):
+    """在并发上限内获取一组分页，tasks 为 {(榜单ID, offset): (url, 保存路径)}，所有分页共用 session
+
+    返回 (sizes, errors)：sizes 为 {键: 字节数}，errors 为 {键: 异常}
+    on_page(键, nbytes, error) 在每页完成时于调用线程中回调，可用于更新清单；
+    传入 report(RunReport) 时记录每页的字节数、延迟和重试次数
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from tqdm import tqdm
+
+    sizes, errors = {}, {}
+    stats = {key: {} for key in tasks}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(fetch_page, session, url, path, max_retries, backoff, stats=stats[key]): key
+            for key, (url, path) in tasks.items()
+        }
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            key = futures[future]
+            try:
+                sizes[key] = future.result()
+            except Exception as e:
+                errors[key] = e
+            if report is not None:
+                list_id, offset = key
+                report.record_page(offset, tasks[key][0], sizes.get(key), stats[key], errors.get(key),
+                                   list_id=list_id)
+            if on_page is not None:
+                on_page(key, sizes.get(key), errors.get(key))
+    return sizes, errors
+
+
+def fetch_pages(offsets, base_url=BASE_URL, concurrency=4, max_retries=3, backoff=0.5, session=None,
+                on_page=None, dest=None, report=None):
+    """获取单个榜单的多个分页，每页响应直接写入 dest(offset) 指向的文件(默认为该榜单的分页检查点)
+
+    返回 (sizes, errors)，均以 offset 为键；on_page(offset, nbytes, error) 在每页完成时回调
+    """
+    dest = dest or page_checkpoint_path
+    own_session = session is None
+    if own_session:
+        session = create_session(pool_size=concurrency)
+
+    tasks = {(None, offset): (base_url.format(offset), dest(offset)) for offset in offsets}
+    callback = None
+    if on_page is not None:
+        def callback(key, nbytes, error):
+            on_page(key[1], nbytes, error)
+    try:
+        sizes, errors = fetch_tasks(tasks, session, concurrency, max_retries, backoff, callback, report)
+    finally:
+        if own_session:
+            session.close()
+    return ({key[1]: size for key, size in sizes.items()},
+            {key[1]: error for key, error in errors.items()})
+
+
+def parse_rows(data, drift=None):
+    """将一页已解码的接口数据按声明的模式解码为记录列表"""
+    return list(hurun_schema.iter_records(hurun_schema.decode_rows(data.get('rows', []), drift)))
+
+
+def iter_page_records(path, drift=None):
+    """从分页文件中逐条产出类型化的记录"""
+    yield from hurun_schema.iter_records(hurun_schema.decode_page(path, drift))
+
+
+def _write_json_atomic(path, obj):
+    """先写临时文件再替换，避免中断时留下半个文件"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def page_checkpoint_path(offset, list_id=LIST_ID):
+    """分页检查点文件路径，每个榜单一个目录"""
+    return os.path.join(PAGE_CACHE_DIR, list_id, f'offset_{offset}.json')
+
+
+def manifest_path(list_id=LIST_ID):
+    """榜单分页清单路径"""
+    return os.path.join(PAGE_CACHE_DIR, list_id, 'manifest.json')
+
+
+def load_manifest(base_url=BASE_URL, list_id=LIST_ID):
+    """读取榜单的分页清单；不存在或对应的接口地址不同时返回空清单"""
+    path = manifest_path(list_id)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('base_url') == base_url:
+            return manifest
+    return {'list_id': list_id, 'base_url': base_url, 'total': None, 'offsets': [], 'completed': {}, 'failed': {}}
+
+
+def save_manifest(manifest):
+    """保存分页清单"""
+    os.makedirs(os.path.join(PAGE_CACHE_DIR, manifest['list_id']), exist_ok=True)
+    _write_json_atomic(manifest_path(manifest['list_id']), manifest)
+
+
+def _is_fresh(completed_at, ttl_days):
+    if ttl_days is None:
+        return True
+    age = datetime.datetime.now() - datetime.datetime.strptime(completed_at, '%Y-%m-%d %H:%M:%S')
+    return age <= datetime.timedelta(days=ttl_days)
+
+
+def missing_offsets(manifest, ttl_days=None):
+    """清单中尚未完成、检查点文件丢失或已超过有效期的偏移量"""
+    return [offset for offset in manifest['offsets']
+            if str(offset) not in manifest['completed']
+            or not os.path.exists(page_checkpoint_path(offset, manifest['list_id']))
+            or not _is_fresh(manifest['completed'][str(offset)], ttl_days)]
+
+
+def read_total(path):
+    """从首页响应中读取榜单总人数；没有 total 字段时返回 None"""
+    with open(path, 'rb') as f:
+        if ijson is None:
+            total = json.load(f).get('total')
+        else:
+            total = next(ijson.items(f, 'total'), None)
+    return None if total is None else int(total)
+
+
+def page_offsets(total):
+    """按总人数划分分页偏移量；总人数未知时退回默认页数"""
+    if total is None:
+        return [page * PAGE_SIZE for page in range(PAGE_COUNT)]
+    return list(range(0, max(total, 1), PAGE_SIZE))
+
+
+def crawl_lists(list_ids, concurrency=4, max_retries=3, resume=True, ttl_days=hurun_cache.DEFAULT_TTL_DAYS,
+                report=None, base_urls=None):
+    """批量爬取多个榜单并逐页保存检查点，返回 {榜单ID: 清单}
+
+    先获取各榜单首页，由响应中的 total 确定分页数；再把所有榜单的剩余分页放进同一个线程池，
+    共用一个会话和并发上限。resume=True 时只重新获取清单中缺失、失败或过期的分页。
+    base_urls 可按榜单ID覆盖接口地址
+    """
+    base_urls = {list_id: (base_urls or {}).get(list_id) or list_url(list_id) for list_id in list_ids}
+    manifests = {list_id: load_manifest(base_urls[list_id] if resume else None, list_id) for list_id in list_ids}
+    for list_id, manifest in manifests.items():
+        manifest['base_url'] = base_urls[list_id]
+
+    # 分页响应由 fetch_tasks 直接流式写入检查点文件，这里只维护清单
+    def on_page(key, nbytes, error):
+        list_id, offset = key
+        manifest = manifests[list_id]
+        if error is None:
+            manifest['completed'][str(offset)] = time.strftime('%Y-%m-%d %H:%M:%S')
+            manifest['failed'].pop(str(offset), None)
+            if offset == 0:
+                manifest['total'] = read_total(page_checkpoint_path(0, list_id))
+                manifest['offsets'] = page_offsets(manifest['total'])
+        else:
+            manifest['completed'].pop(str(offset), None)
+            manifest['failed'][str(offset)] = str(error)
+        save_manifest(manifest)
+
+    def fetch(keys, title):
+        if not keys:
+            return
+        print(f"{title}: 需要获取 {len(keys)} 页 (并发数: {concurrency})...")
+        for list_id in {list_id for list_id, _ in keys}:
+            os.makedirs(os.path.join(PAGE_CACHE_DIR, list_id), exist_ok=True)
+        tasks = {(list_id, offset): (base_urls[list_id].format(offset), page_checkpoint_path(offset, list_id))
+                 for list_id, offset in keys}
+        fetch_tasks(tasks, session, concurrency, max_retries, on_page=on_page, report=report)
+
+    session = create_session(pool_size=concurrency)
+    try:
+        # 1. 首页：确定各榜单总人数(首页过期时一并刷新总人数)
+        first_pages = []
+        for list_id, manifest in manifests.items():
+            if not manifest['offsets'] or 0 in missing_offsets(manifest, ttl_days):
+                manifest['offsets'] = manifest['offsets'] or [0]
+                first_pages.append((list_id, 0))
+        fetch(first_pages, "获取首页")
+
+        # 2. 其余分页：所有榜单一起分发
+        pending = [(list_id, offset) for list_id, manifest in manifests.items()
+                   for offset in missing_offsets(manifest, ttl_days) if offset != 0]
+        fetch(pending, f"获取 {len(manifests)} 个榜单的分页")
+    finally:
+        session.close()
+    return manifests
+
+
+def iter_checkpointed_pages(manifest, drift=None):
+    """按偏移量顺序逐页产出已完成分页的类型化列数据"""
+    for offset in sorted(manifest['offsets']):
+        if str(offset) in manifest['completed']:
+            yield hurun_schema.decode_page(page_checkpoint_path(offset, manifest['list_id']), drift)
+
+
+def checkpointed_frame(manifest, drift=None):
+    """已完成分页的记录(部分爬取结果)组成的 DataFrame"""
+    import pandas as pd
+
+    columns = hurun_schema.concat_columns(iter_checkpointed_pages(manifest, drift))
+    return pd.DataFrame(columns, columns=hurun_schema.COLUMNS)
+
+
+def _report_failures(manifest, ttl_days):
+    """打印失败的分页，返回仍未完成的偏移量"""
+    for offset, error in sorted(manifest['failed'].items(), key=lambda kv: int(kv[0])):
+        print(f"爬取榜单 {manifest['list_id']} 第 {int(offset) // PAGE_SIZE + 1} 页时出错: {error}")
+    return missing_offsets(manifest, ttl_days)
+
+
+def _fallback_cache(path, name, missing):
+    """刷新未完成时读取已过期的旧缓存 path 代替，并打印、记录警告；没有旧缓存时返回 None"""
+    if path is None:
+        return None
+    print(f"警告: 刷新 {name} 时仍有 {len(missing)} 页未完成，继续使用已过期的缓存 {path}")
+    hurun_metrics.log_event('stale_cache', level=logging.WARNING, name=name, path=path, missing=len(missing))
+    return hurun_cache.load_list(name, ttl_days=None, directory=os.path.dirname(path))
+
+
+def crawl_hurun_rich_list(list_id=LIST_ID, concurrency=4, max_retries=3, resume=True,
+                          ttl_days=hurun_cache.DEFAULT_TTL_DAYS, base_url=None, report=None, allow_partial=False):
+    """爬取胡润富豪榜数据
+
+    结果按榜单ID和爬取日期写入列式缓存，超过 ttl_days 后自动重新爬取。
+    只有全部分页完成后才写入缓存；刷新失败时退回最新的过期缓存并记录警告。
+    没有任何缓存时抛出 IncompleteCrawlError；allow_partial=True(crawl 子命令)时改为返回已完成分页的部分数据，
+    再次运行会只补爬失败的分页
+    """
+    base_url = base_url or list_url(list_id)
+
+    # 检查列式缓存是否存在且未过期；旧版CSV缓存按其固定的爬取日期迁移，通常已过期
+    hurun_cache.migrate_legacy_csv(list_id)
+    df = hurun_cache.load_list(list_id, ttl_days)
+    if df is not None:
+        print("使用缓存数据...")
+        return df
+
+    print("开始爬取胡润富豪榜数据...")
+    manifest = crawl_lists([list_id], concurrency=concurrency, max_retries=max_retries, resume=resume,
+                           ttl_days=ttl_days, report=report, base_urls={list_id: base_url})[list_id]
+    missing = _report_failures(manifest, ttl_days)
+    drift = hurun_schema.SchemaDrift()
+    if missing:
+        stale = _fallback_cache(hurun_cache.latest_file(list_id, ttl_days=None), list_id, missing)
+        if stale is not None:
+            return stale
+        if not allow_partial:
+            raise IncompleteCrawlError(f"榜单 {list_id} 仍有 {len(missing)} 页未完成且没有旧缓存，已停止；"
+                                       f"运行 python hurun_spider.py crawl --list-id {list_id} 补爬缺失的分页")
+        df = checkpointed_frame(manifest, drift)
+        drift.check(report, list_id)
+        print(f"成功爬取 {len(df)} 条富豪数据")
+        print(f"警告: 仍有 {len(missing)} 页未完成，数据不完整，未写入缓存；"
+              f"重新运行 python hurun_spider.py crawl --list-id {list_id} 将只补爬这些分页")
+        return hurun_cache.to_typed(df)
+
+    # 记录逐页按模式解码为类型化的列，分批追加到列式缓存，不在内存中汇总；
+    # 接口字段被重命名或删除时在替换正式缓存文件之前报错
+    with hurun_cache.ListWriter(list_id) as writer:
+        for columns in iter_checkpointed_pages(manifest, drift):
+            writer.write_columns(columns)
+        drift.check(report, list_id)
+    print(f"成功爬取 {writer.rows} 条富豪数据 (榜单总人数 {manifest['total']})")
+    print(f"数据已缓存至 {writer.path}")
+    return hurun_cache.load_list(list_id, ttl_days=None)
+
+
+def panel_name(lists):
+    """面板数据集的默认名称：按榜单ID排序拼接"""
+    return '_'.join(sorted(lists))
+
+
+def crawl_panel(lists, name=None, concurrency=8, max_retries=3, resume=True, ttl_days=hurun_cache.DEFAULT_TTL_DAYS,
+                report=None, base_urls=None, allow_partial=False):
+    """批量爬取多个榜单，写入一个按 榜单ID/年份 标记的面板数据集
+
+    lists 为 {榜单ID: 年份}，年份未知时为 None。name 标识面板(默认按榜单ID拼接)，同名面板在有效期内直接读取缓存。
+    全部榜单完成后写入 cache/panels/<name>/<爬取日期>.parquet；存在未完成分页时不写入缓存，
+    退回同名面板最新的过期缓存，没有时抛出 IncompleteCrawlError；allow_partial=True(batch 子命令)时
+    返回已获取的部分数据，重新运行将只补爬缺失的分页
+    """
+    import pandas as pd
+
+    name = name or panel_name(lists)
+    df = hurun_cache.load_panel(name, ttl_days)
+    if df is not None:
+        print(f"使用面板缓存数据 ({name})...")
+        return df
+
+    print(f"开始批量爬取 {len(lists)} 个榜单...")
+    manifests = crawl_lists(list(lists), concurrency=concurrency, max_retries=max_retries, resume=resume,
+                            ttl_days=ttl_days, report=report, base_urls=base_urls)
+    missing = {list_id: _report_failures(manifest, ttl_days) for list_id, manifest in manifests.items()}
+    drifts = {list_id: hurun_schema.SchemaDrift() for list_id in lists}
+    if any(missing.values()):
+        stale = _fallback_cache(hurun_cache.latest_panel_file(name, ttl_days=None), name,
+                                [offset for offsets in missing.values() for offset in offsets])
+        if stale is not None:
+            return stale
+        if not allow_partial:
+            raise IncompleteCrawlError(f"面板 {name} 仍有 {sum(map(len, missing.values()))} 页未完成且没有旧缓存，"
+                                       f"已停止；重新运行 batch 子命令补爬缺失的分页")
+        frames = [checkpointed_frame(manifests[list_id], drifts[list_id]).assign(榜单ID=list_id, 年份=year)
+                  for list_id, year in lists.items()]
+        for list_id, drift in drifts.items():
+            drift.check(report, list_id)
+        df = hurun_cache.to_typed(pd.concat(frames, ignore_index=True))
+        print(f"成功爬取 {len(df)} 条富豪数据")
+        print(f"警告: {sum(map(len, missing.values()))} 页未完成 "
+              f"({', '.join(list_id for list_id, offsets in missing.items() if offsets)})，"
+              f"数据不完整，未写入缓存；重新运行将只补爬这些分页")
+        return df
+
+    with hurun_cache.PanelWriter(name) as writer:
+        for list_id, year in lists.items():
+            for columns in iter_checkpointed_pages(manifests[list_id], drifts[list_id]):
+                writer.write_columns(columns, {'榜单ID': list_id, '年份': year})
+            drifts[list_id].check(report, list_id)
+    print(f"成功爬取 {len(lists)} 个榜单共 {writer.rows} 条富豪数据")
+    print(f"面板数据已缓存至 {writer.path}")
+    return hurun_cache.load_panel(name, ttl_days=None)
+
+
+def clean_data(df, verbose=True):
+    """数据清洗与预处理；分块处理时用 verbose=False 关闭逐块输出"""
+    import pandas as pd
+
+    import hurun_region
+
+    if verbose:
+        print("\n开始数据清洗...")
 
     # 转换数值型数据
     df['财富值(亿人民币)'] = pd.to_numeric(df['财富值(亿人民币)'], errors='coerce')
     df['年龄'] = pd.to_numeric(df['年龄'], errors='coerce')
 
-    # 提取省份信息 - 更智能的解析
-    def extract_province(location):
-        if not isinstance(location, str):
-            return '未知'
-
-        # 处理直辖市
-        if '北京' in location:
-            return '北京'
-        if '上海' in location:
-            return '上海'
-        if '天津' in location:
-            return '天津'
-        if '重庆' in location:
-            return '重庆'
-
-        # 处理特别行政区
-        if '香港' in location:
-            return '香港'
-        if '澳门' in location:
-            return '澳门'
-        if '台湾' in location:
-            return '台湾'
-
-        # 处理有分隔符的情况
-        if '-' in location:
-            parts = location.split('-')
-            if len(parts) > 1:
-                # 尝试识别省份部分
-                for part in parts:
-                    if '省' in part or '自治区' in part or '特别行政区' in part:
-                        return part
-                return parts[1]  # 默认取第二部分
-        return location  # 无法解析时返回原值
-
-    df['出生省份'] = df['出生地'].apply(extract_province)
-
-    # 简化省份名称
-    df['出生省份'] = df['出生省份'].str.replace('省|市|自治区|特别行政区|壮族|回族|维吾尔', '', regex=True)
-
-    # 性别处理
-    df['性别'] = df['性别'].fillna('未知')
+    # 提取省份信息 - 基于行政区划名录解析，只处理去重后的出生地再映射回各行
+    df['出生省份'] = hurun_region.resolve_provinces(df['出生地'])
+
+    # 性别处理 (缓存中为分类类型，先转回普通对象列再填充)
+    df['性别'] = df['性别'].astype(object).fillna('未知')
     df['性别'] = df['性别'].replace({'男': '男性', '女': '女性'})
 
     # 过滤无效记录
@@ -126,158 +460,76 @@ def clean_data(df):
     df = df.dropna(subset=['姓名', '财富值(亿人民币)'])
     new_count = len(df)
 
-    print(f"清洗后保留 {new_count} 条有效数据 (移除了 {orig_count - new_count} 条无效记录)")
+    if verbose:
+        print(f"清洗后保留 {new_count} 条有效数据 (移除了 {orig_count - new_count} 条无效记录)")
     return df
 
 
-def analyze_industry_trend(df):
-    """行业趋势分析"""
+def analyze_industry_trend(cube, attribution='full'):
+    """行业趋势分析，返回 (行业统计, 图表任务)；attribution 为多行业字段的归属方式"""
+    import hurun_build
+    import hurun_cube
+
     print("\n进行行业趋势分析...")
 
-    # 按行业分组统计
-    industry_stats = df.groupby('行业').agg(
-        富豪数量=('姓名', 'count'),
-        总财富=('财富值(亿人民币)', 'sum'),
-        平均财富=('财富值(亿人民币)', 'mean')
-    ).sort_values('富豪数量', ascending=False)
-
-    # 绘制TOP15行业分析
-    top_15 = industry_stats.head(15)
-
-    plt.figure(figsize=(16, 12))
-    sns.barplot(x='富豪数量', y=top_15.index, data=top_15, palette='viridis')
-    plt.title('TOP15行业富豪数量分布', fontsize=18)
-    plt.xlabel('富豪数量', fontsize=14)
-    plt.ylabel('行业', fontsize=14)
-    plt.tight_layout()
-    plt.savefig('results_1/industry_analysis.png', dpi=300)
-    plt.close()
-    print("行业分析图表已保存至 results_1/industry_analysis.png")
-
-    # 绘制财富气泡图
-    plt.figure(figsize=(16, 12))
-    top_15 = industry_stats.head(10)
-    sns.scatterplot(
-        x='富豪数量',
-        y='平均财富',
-        size='总财富',
-        sizes=(100, 2000),
-        hue=top_15.index,
-        data=top_15,
-        palette='tab20',
-        legend='brief'
-    )
-    plt.title('行业富豪数量与财富分布关系', fontsize=18)
-    plt.xlabel('富豪数量', fontsize=14)
-    plt.ylabel('平均财富(亿人民币)', fontsize=14)
-    plt.grid(True, linestyle='--', alpha=0.3)
-    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-    plt.savefig('results_1/industry_bubble.png', dpi=300)
-    plt.close()
-
-    return industry_stats
-
-
-def analyze_demographics(df):
-    """人口统计特征分析"""
+    # 多行业字段拆分为行业标签，由关联矩阵与聚合立方体相乘得到行业统计
+    industry_stats = hurun_cube.industry_stats(cube, attribution)
+
+    jobs = [
+        # 绘制TOP15行业分析
+        hurun_build.FigureJob('results_1/industry_analysis.png', 'plot_industry_bars',
+                              {'top_industries': industry_stats.head(15)}),
+        # 绘制财富气泡图
+        hurun_build.FigureJob('results_1/industry_bubble.png', 'plot_industry_bubble',
+                              {'top_industries': industry_stats.head(10)}),
+    ]
+    return industry_stats, jobs
+
+
+def analyze_demographics(df, cube):
+    """人口统计特征分析，返回图表任务
+
+    年龄直方图与散点图需要逐行数据(只传年龄、财富两列)，性别与财富等级分布取自聚合立方体
+    """
+    import hurun_build
+    import hurun_cube
+
     print("\n进行人口统计特征分析...")
 
-    # 创建图表
-    plt.figure(figsize=(18, 14))
-
-    # 1. 年龄分布分析
-    plt.subplot(2, 2, 1)
-    sns.histplot(df['年龄'].dropna(), bins=20, kde=True, color='skyblue')
-    plt.axvline(df['年龄'].mean(), color='red', linestyle='--',
-                label=f'平均年龄: {df["年龄"].mean():.1f}岁')
-    plt.axvline(df['年龄'].median(), color='green', linestyle='--',
-                label=f'中位年龄: {df["年龄"].median()}岁')
-    plt.title('富豪年龄分布', fontsize=16)
-    plt.xlabel('年龄', fontsize=12)
-    plt.ylabel('人数', fontsize=12)
-    plt.legend(fontsize=12)
-
-    # 2. 年龄与财富关系
-    plt.subplot(2, 2, 2)
-    sns.regplot(
-        x='年龄',
-        y='财富值(亿人民币)',
-        data=df,
-        scatter_kws={'alpha': 0.5, 'color': 'blue'},
-        line_kws={'color': 'red', 'linewidth': 2.5}
-    )
-    plt.title('年龄与财富关系', fontsize=16)
-    plt.xlabel('年龄', fontsize=12)
-    plt.ylabel('财富值(亿人民币)', fontsize=12)
-    plt.grid(True, linestyle='--', alpha=0.3)
-
-    # 3. 性别分布
-    plt.subplot(2, 2, 3)
-    gender_count = df['性别'].value_counts()
-    gender_count.plot.pie(
-        autopct='%1.1f%%',
-        colors=['#66b3ff', '#ff9999', '#99ff99'],
-        startangle=90,
-        explode=(0.05, 0.05, 0.05),
-        textprops={'fontsize': 12}
-    )
-    plt.title('富豪性别分布', fontsize=16)
-    plt.ylabel('')
-
-    # 4. 财富金字塔
-    plt.subplot(2, 2, 4)
-    bins = [0, 10, 50, 100, 500, 1000, float('inf')]
-    labels = ['<10亿', '10-50亿', '50-100亿', '100-500亿', '500-1000亿', '>1000亿']
-    df['财富等级'] = pd.cut(df['财富值(亿人民币)'], bins=bins, labels=labels)
-    wealth_level_count = df['财富等级'].value_counts().reindex(labels)
-    sns.barplot(x=wealth_level_count.values, y=wealth_level_count.index, palette='magma')
-    plt.title('财富等级分布', fontsize=16)
-    plt.xlabel('人数', fontsize=12)
-    plt.ylabel('财富等级', fontsize=12)
-
-    plt.tight_layout()
-    plt.savefig('results_1/demographics_analysis.png', dpi=300)
-    plt.close()
-    print("人口统计图表已保存至 results_1/demographics_analysis.png")
-
-
-def analyze_age_wealth_heatmap(df):
-    """年龄与财富关系热力图"""
+    return [hurun_build.FigureJob('results_1/demographics_analysis.png', 'plot_demographics', {
+        'age_wealth': df[['年龄', '财富值(亿人民币)']].reset_index(drop=True),
+        'gender_count': hurun_cube.gender_counts(cube),
+        'wealth_level_count': hurun_cube.wealth_level_counts(cube),
+    })]
+
+
+def analyze_age_wealth_heatmap(cube):
+    """年龄与财富关系热力图，返回图表任务"""
+    import hurun_build
+    import hurun_cube
+
     print("\n生成年龄-财富热力图...")
 
-    # 创建年龄分组和财富等级
-    df['年龄分组'] = pd.cut(df['年龄'], bins=[0, 40, 50, 60, 70, 100],
-                            labels=['40岁以下', '41-50岁', '51-60岁', '61-70岁', '70岁以上'])
-    bins = [0, 50, 100, 500, 1000, float('inf')]
-    labels = ['<50亿', '50-100亿', '100-500亿', '500-1000亿', '>1000亿']
-    df['财富等级'] = pd.cut(df['财富值(亿人民币)'], bins=bins, labels=labels)
-
-    # 创建交叉表
-    heatmap_data = pd.crosstab(df['年龄分组'], df['财富等级'], normalize='index')
-
-    plt.figure(figsize=(14, 10))
-    sns.heatmap(heatmap_data, annot=True, cmap="YlGnBu", fmt='.1%', annot_kws={"size": 12})
-    plt.title('不同年龄段的财富分布比例', fontsize=18)
-    plt.xlabel('财富等级', fontsize=14)
-    plt.ylabel('年龄分组', fontsize=14)
-    plt.tight_layout()
-    plt.savefig('results_1/age_wealth_heatmap.png', dpi=300)
-    plt.close()
-    print("热力图已保存至 results_1/age_wealth_heatmap.png")
-
-
-def generate_geographical_distribution(df):
-    """地理分布分析"""
+    # 各年龄分组内的财富等级占比
+    heatmap_data = hurun_cube.age_wealth_share(cube)
+    return [hurun_build.FigureJob('results_1/age_wealth_heatmap.png', 'plot_age_wealth_heatmap',
+                                   {'heatmap_data': heatmap_data})]
+
+
+def generate_geographical_distribution(cube):
+    """地理分布分析，返回 (各省人数, 图表任务)"""
+    import hurun_build
+    import hurun_cube
+    import hurun_region
+
     print("\n分析出生地分布...")
 
     # 出生省份TOP15
-    plt.figure(figsize=(14, 10))
-    province_counts = df['出生省份'].value_counts()
+    province_counts = hurun_cube.province_counts(cube)
 
     # 合并小省份为"其他"
     threshold = 10  # 只显示数量大于阈值的省份
-    top_provinces = province_counts[province_counts > threshold]
+    top_provinces = province_counts[province_counts > threshold].copy()
     other_count = province_counts[province_counts <= threshold].sum()
 
     if other_count > 0:
@@ -285,162 +537,420 @@ def generate_geographical_distribution(df):
 
     top_provinces = top_provinces.sort_values(ascending=False)
 
-    # 绘制图表
-    sns.barplot(x=top_provinces.values, y=top_provinces.index, palette='rocket')
-    plt.title('富豪出生地分布', fontsize=18)
-    plt.xlabel('富豪人数', fontsize=14)
-    plt.ylabel('地区', fontsize=14)
-    plt.tight_layout()
-    plt.savefig('results_1/birthplace_distribution.png', dpi=300)
-    plt.close()
-
-    # 绘制地图分布
-    try:
-        import geopandas as gpd
-        from shapely.geometry import Point
-
-        # 创建中国地图可视化
-        china_map = gpd.read_file('https://geo.datav.aliyun.com/areas_v3/bound/100000_full.json')
-
-        # 创建地理坐标数据
-        province_coords = {
-            '广东': [113.23, 23.16], '浙江': [120.15, 30.28], '江苏': [118.76, 32.04],
-            '福建': [119.3, 26.08], '上海': [121.47, 31.23], '北京': [116.4, 39.9],
-            '山东': [117.0, 36.65], '四川': [104.06, 30.67], '湖南': [112.97, 28.19],
-            '湖北': [114.30, 30.60], '安徽': [117.28, 31.86], '河南': [113.65, 34.76],
-            '香港': [114.16, 22.28], '台湾': [121.50, 25.03], '辽宁': [123.38, 41.8],
-            '重庆': [106.55, 29.57], '江西': [115.89, 28.68], '河北': [114.48, 38.03],
-            '陕西': [108.93, 34.27], '吉林': [125.32, 43.88]
-        }
-
-        # 创建地理DataFrame
-        geo_df = pd.DataFrame({
-            '省份': list(province_coords.keys()),
-            '经度': [coord[0] for coord in province_coords.values()],
-            '纬度': [coord[1] for coord in province_coords.values()],
-            '富豪数量': [province_counts.get(prov, 0) for prov in province_coords.keys()]
-        })
-
-        # 创建点几何
-        geometry = [Point(lon, lat) for lon, lat in zip(geo_df['经度'], geo_df['纬度'])]
-        geo_df = gpd.GeoDataFrame(geo_df, geometry=geometry, crs="EPSG:4326")
-
-        # 绘制地图
-        fig, ax = plt.subplots(figsize=(16, 12))
-        china_map.plot(ax=ax, color='#f0f0f0', edgecolor='#999999')
-
-        # 绘制散点图
-        geo_df.plot(
-            ax=ax,
-            markersize=geo_df['富豪数量'] * 0.5,
-            color='red',
-            alpha=0.7,
-            edgecolor='black',
-            linewidth=0.5,
-            legend=True
-        )
-
-        # 添加省份标签
-        for x, y, prov, count in zip(geo_df['经度'], geo_df['纬度'], geo_df['省份'], geo_df['富豪数量']):
-            plt.text(x, y, f"{prov}\n{count}人", fontsize=9, ha='center', va='center')
-
-        plt.title('中国富豪出生地分布热力图', fontsize=18)
-        plt.axis('off')
-        plt.tight_layout()
-        plt.savefig('results_1/birthplace_map.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        print("地理分布地图已保存至 results_1/birthplace_map.png")
-    except ImportError:
-        print("未安装geopandas，跳过地图生成")
-    except Exception as e:
-        print(f"生成地图时出错: {e}")
-
-    print("地理分布图表已保存至 results_1/birthplace_distribution.png")
-    return province_counts
+    jobs = [
+        hurun_build.FigureJob('results_1/birthplace_distribution.png', 'plot_birthplace_bars',
+                               {'top_provinces': top_provinces}),
+        # 绘制地图分布
+        hurun_build.FigureJob('results_1/birthplace_map.png', 'plot_birthplace_map',
+                               {'province_counts': province_counts,
+                                'boundary_version': hurun_region.boundary_version()}),
+    ]
+    return province_counts, jobs
 
 
 def generate_wealth_distribution(df):
-    """财富分布分析"""
+    """财富分布分析，返回图表任务"""
+    import hurun_build
+    import hurun_cube
+    import hurun_distribution
+
     print("\n分析财富分布...")
+    summary = hurun_distribution.summarize(df['财富值(亿人民币)'])
+    print(f"基尼系数 {summary['基尼系数']:.3f}，前1%财富占比 {summary['前1%财富占比']:.1%}，"
+          f"帕累托指数 {summary['帕累托指数']:.2f} (尾部下限 {summary['帕累托尾部下限']:g} 亿)")
+
+    return [hurun_build.FigureJob('results_1/wealth_distribution.png', 'plot_wealth_distribution', {
+        'age_wealth': df[['年龄', '财富值(亿人民币)']].reset_index(drop=True),
+        # 财富值对数转换
+        'wealth_log': hurun_cube.wealth_log(df).reset_index(drop=True),
+    })]
+
+
+# 分析组，analyze --only 按组名选择
+ANALYSES = ['industry', 'demographics', 'heatmap', 'geo', 'wealth']
+
+# 各阶段需要加载的模块，启动时统一导入以便计量依赖加载耗时
+STAGE_DEPENDENCIES = {
+    'crawl': ['requests', 'tqdm', 'pandas'],
+    'batch': ['requests', 'tqdm', 'pandas'],
+    'clean': ['pandas', 'hurun_region', 'hurun_cube', 'hurun_build', 'hurun_search'],
+    'analyze': ['pandas', 'hurun_region', 'hurun_cube', 'hurun_build', 'hurun_distribution'],
+    'export': ['pandas', 'hurun_region', 'hurun_cube', 'hurun_build', 'hurun_distribution', 'hurun_search'],
+}
+STAGE_DEPENDENCIES['all'] = list(dict.fromkeys(sum(STAGE_DEPENDENCIES.values(), [])))
+# 完整流程的输入与上次相同时只需判断指纹，不加载 pandas/matplotlib
+STAGE_DEPENDENCIES['fresh'] = ['hurun_build']
+
+# 完整流程的指纹包含这些模块的源码：清洗、聚合、分析、绘图、导出或索引逻辑的改动都会使流程重新运行
+PIPELINE_MODULES = ['hurun_spider', 'hurun_cache', 'hurun_schema', 'hurun_region', 'hurun_industry', 'hurun_cube',
+                    'hurun_distribution', 'hurun_render', 'hurun_search', 'hurun_build']
+# 完整流程在构建缓存中的记录名
+PIPELINE_KEY = 'pipeline:all'
+
+
+def load_dependencies(stage):
+    """导入阶段所需的模块，打印并返回 (启动耗时, 依赖加载耗时)
+
+    启动耗时从本模块开始导入时计起
+    """
+    start = time.perf_counter()
+    for name in STAGE_DEPENDENCIES[stage]:
+        importlib.import_module(name)
+    now = time.perf_counter()
+    print(f"[{stage}] 启动耗时 {now - _START:.2f}s (其中加载依赖 {now - start:.2f}s: "
+          f"{', '.join(STAGE_DEPENDENCIES[stage])})")
+    return now - _START, now - start
+
+
+def pipeline_fingerprint(path, attribution='full'):
+    """完整流程的指纹：榜单缓存文件(路径、大小、修改时间) + 边界资产版本 + 参数 + 流程各模块源码"""
+    import hurun_build
+    import hurun_region
+
+    stat = os.stat(path)
+    return hurun_build.fingerprint('main', {
+        'list_cache': (path, stat.st_size, stat.st_mtime_ns),
+        'boundary_version': hurun_region.boundary_version(),
+        'attribution': attribution,
+    }, PIPELINE_MODULES)
+
+
+def pipeline_fresh(attribution='full', ttl_days=hurun_cache.DEFAULT_TTL_DAYS):
+    """榜单缓存未过期，且完整流程上次以相同输入运行完成、产物都还存在时返回 True；不加载 pandas"""
+    import hurun_build
+
+    path = hurun_cache.latest_file(LIST_ID, ttl_days, verbose=False)
+    if path is None:
+        return False
+    return hurun_build.BuildCache().run_fresh(PIPELINE_KEY, pipeline_fingerprint(path, attribution))
+
+
+def prepare_data(list_id=LIST_ID, ttl_days=hurun_cache.DEFAULT_TTL_DAYS, report=None):
+    """读取(必要时爬取)并清洗榜单，返回 (清洗后数据, 聚合立方体)"""
+    import hurun_cube
+
+    with hurun_metrics.stage(report, 'crawl') as metrics:
+        df = crawl_hurun_rich_list(list_id, ttl_days=ttl_days, report=report)
+        metrics['rows_out'] = len(df)
+        if not len(df):
+            raise IncompleteCrawlError(f"榜单 {list_id} 没有任何记录，已停止，不导出空结果")
+    with hurun_metrics.stage(report, 'clean', rows_in=len(df)) as metrics:
+        df_clean = clean_data(df)
+        metrics['rows_out'] = len(df_clean)
+    # 一次分组构建各项分析共用的聚合立方体
+    with hurun_metrics.stage(report, 'cube', rows_in=len(df_clean)) as metrics:
+        cube = hurun_cube.build_cube(df_clean)
+        metrics['rows_out'] = len(cube)
+    return df_clean, cube
+
+
+def prepare_chunked(list_id=LIST_ID, panel=None, chunk_size=100_000, ttl_days=hurun_cache.DEFAULT_TTL_DAYS,
+                    report=None):
+    """分块模式：按行组流式读取榜单(或面板)缓存，逐块清洗并构建部分立方体，再合并为完整的聚合立方体
+
+    立方体的度量(人数/总财富/最低/最高财富)可结合地合并，结果与整体处理一致；
+    内存占用只与块大小和立方体的维度组合数有关，与总行数无关
+    """
+    import hurun_cube
+
+    with hurun_metrics.stage(report, 'crawl') as metrics:
+        if panel:
+            path = hurun_cache.latest_panel_file(panel, ttl_days)
+            if path is None:
+                raise FileNotFoundError(f"面板 {panel} 不存在或已过期，请先运行 batch 子命令")
+        else:
+            path = hurun_cache.latest_file(list_id, ttl_days)
+            if path is None:
+                crawl_hurun_rich_list(list_id, ttl_days=ttl_days, report=report)
+                path = hurun_cache.latest_file(list_id, ttl_days=None)
+            if path is None:
+                raise RuntimeError(f"榜单 {list_id} 未完整爬取，没有可供分块读取的缓存")
+        metrics['file'] = path
+    print(f"分块读取 {path} (每块 {chunk_size} 行)...")
+
+    with hurun_metrics.stage(report, 'cube') as metrics:
+        # 部分立方体攒到与已合并立方体同样大时再合并一次，合并总开销与块数成线性关系，内存不超过立方体的两倍
+        cubes, pending_rows, rows_in, rows_out, chunks = [], 0, 0, 0, 0
+        for chunk in hurun_cache.iter_chunks(path, chunk_size):
+            df_clean = clean_data(chunk, verbose=False)
+            cubes.append(hurun_cube.build_cube(df_clean))
+            pending_rows += len(cubes[-1])
+            if len(cubes) > 1 and pending_rows >= len(cubes[0]):
+                cubes, pending_rows = [hurun_cube.merge_cubes(cubes)], 0
+            rows_in, rows_out, chunks = rows_in + len(chunk), rows_out + len(df_clean), chunks + 1
+        if not cubes:
+            raise ValueError(f"缓存 {path} 中没有记录")
+        cube = hurun_cube.merge_cubes(cubes)
+        metrics.update(rows_in=rows_in, rows_out=len(cube), chunks=chunks)
+    print(f"清洗后保留 {rows_out} 条有效数据 (移除了 {rows_in - rows_out} 条无效记录，共 {chunks} 块)")
+    return cube
+
+
+def collect_jobs(df_clean, cube, only=None, report=None, attribution='full'):
+    """按分析组收集图表任务，only 为空时包含全部分析组"""
+    only = only or ANALYSES
+    with hurun_metrics.stage(report, 'analyze', rows_in=len(df_clean)) as metrics:
+        jobs = []
+        if 'industry' in only:
+            jobs += analyze_industry_trend(cube, attribution)[1]
+        if 'demographics' in only:
+            jobs += analyze_demographics(df_clean, cube)
+        if 'heatmap' in only:
+            jobs += analyze_age_wealth_heatmap(cube)
+        if 'geo' in only:
+            jobs += generate_geographical_distribution(cube)[1]
+        if 'wealth' in only:
+            jobs += generate_wealth_distribution(df_clean)
+        metrics['rows_out'] = len(jobs)
+    return jobs
+
+
+def export_results(df_clean, cube=None, build_cache=None, report=None, attribution='full'):
+    """导出清洗后数据(附带分箱与对数列)；传入 cube 时一并导出立方体、行业统计、各省人数和财富分布统计"""
+    import hurun_build
+    import hurun_cube
+
+    with hurun_metrics.stage(report, 'export', rows_in=len(df_clean)) as metrics:
+        age_group, wealth_level = hurun_cube.bucketize(df_clean)
+        exports = [
+            (df_clean.assign(财富等级=wealth_level, 年龄分组=age_group, 财富对数=hurun_cube.wealth_log(df_clean)),
+             'results_1/rich_list_clean.csv', False),
+        ]
+        if cube is not None:
+            exports += cube_exports(cube, attribution) + distribution_exports(df_clean)
+        written = sum(hurun_build.export_csv(data, path, index, build_cache) for data, path, index in exports)
+        metrics['rows_out'] = written
+    print(f"导出 {written} 个CSV文件 ({len(exports) - written} 个内容未变化已跳过)")
+    return written
+
+
+def export_aggregates(cube, build_cache=None, report=None, attribution='full'):
+    """分块模式的导出：只导出由聚合立方体得到的CSV；逐行数据和财富分布统计需要完整数据，不在此导出"""
+    import hurun_build
+
+    with hurun_metrics.stage(report, 'export', rows_in=len(cube)) as metrics:
+        exports = cube_exports(cube, attribution)
+        written = sum(hurun_build.export_csv(data, path, index, build_cache) for data, path, index in exports)
+        metrics['rows_out'] = written
+    print(f"导出 {written} 个CSV文件 ({len(exports) - written} 个内容未变化已跳过)")
+    return written
+
+
+def cube_exports(cube, attribution='full'):
+    """由聚合立方体得到的导出项：立方体本身、行业统计和各省人数"""
+    import hurun_cube
+
+    return [
+        (cube, 'results_1/aggregate_cube.csv', False),
+        (hurun_cube.industry_stats(cube, attribution), 'results_1/industry_stats.csv', True),
+        (hurun_cube.province_counts(cube), 'results_1/geo_distribution.csv', True),
+    ]
+
+
+def distribution_exports(df_clean):
+    """财富分布统计的导出项：汇总指标(基尼系数/头部占比/帕累托尾部)、洛伦兹曲线和对数财富的核密度"""
+    import hurun_cube
+    import hurun_distribution
+
+    wealth = df_clean['财富值(亿人民币)']
+    return [
+        (hurun_distribution.summarize(wealth), 'results_1/wealth_summary.csv', True),
+        (hurun_distribution.lorenz_curve(wealth), 'results_1/lorenz_curve.csv', False),
+        (hurun_distribution.kde_table(hurun_cube.wealth_log(df_clean)), 'results_1/wealth_log_kde.csv', False),
+    ]
+
+
+def build_search_index(df_clean, list_id, build_cache=None):
+    """重建 hurun_search 的查询索引，使 query 命令与最新的清洗结果一致
+
+    传入 build_cache 时，索引用到的列和 hurun_search 的源码都未变化且索引文件仍存在则跳过
+    """
+    import hurun_build
+    import hurun_search
+
+    path = hurun_search.index_path(list_id)
+    columns = list(dict.fromkeys(hurun_search.DISPLAY_FIELDS + hurun_search.TEXT_FIELDS + hurun_search.NUMERIC_FIELDS))
+    digest = hurun_build.fingerprint(hurun_search.build_index, {'df': df_clean[columns], 'list_id': list_id},
+                                     ['hurun_search'])
+    if build_cache is not None and build_cache.is_fresh(path, digest):
+        print(f"查询索引输入未变化，跳过重建 ({path})")
+        return path
+    path = hurun_search.build_index(df_clean, list_id)
+    if build_cache is not None:
+        build_cache.record(path, digest)
+    print(f"查询索引已保存至 {path}")
+    return path
+
+
+def render(jobs, render_workers=None, build_cache=None, report=None):
+    """把图表任务交给进程池并行渲染；输入指纹未变化的产物直接跳过
+
+    只有存在过期图表时才导入 hurun_render(及 matplotlib/seaborn)，全部未变化的重复运行不加载绘图库
+    """
+    import hurun_build
+
+    with hurun_metrics.stage(report, 'render', rows_in=len(jobs)) as metrics:
+        stale, digests = hurun_build.stale_jobs(jobs, build_cache)
+        if len(stale) < len(jobs):
+            print(f"\n{len(jobs) - len(stale)} 个图表输入未变化，跳过渲染")
+        timings = {}
+        if stale:
+            import hurun_render
+
+            print(f"\n开始渲染 {len(stale)} 个图表 (进程数: {render_workers or os.cpu_count()})...")
+            timings = hurun_render.render_figures(stale, max_workers=render_workers, build_cache=build_cache,
+                                                  digests=digests)
+        metrics['rows_out'] = len(timings)
+        metrics['figures'] = {path: round(seconds, 4) for path, seconds in timings.items()}
+    return timings
+
+
+def main(render_workers=None, force=False, report=None, attribution='full'):
+    """主函数
+
+    force=True 时忽略构建缓存，重新生成全部图表和CSV；传入 report(RunReport) 时记录各阶段指标；
+    attribution 为多行业字段的归属方式(full/fractional)
+    """
+    import hurun_build
 
-    # 财富值对数转换
-    df['财富对数'] = np.log10(df['财富值(亿人民币)'])
-
-    plt.figure(figsize=(16, 12))
-
-    # 1. 财富分布直方图
-    plt.subplot(2, 2, 1)
-    sns.histplot(df['财富值(亿人民币)'], bins=50, kde=True, color='purple')
-    plt.title('财富值分布', fontsize=16)
-    plt.xlabel('财富值(亿人民币)', fontsize=12)
-    plt.ylabel('人数', fontsize=12)
-    plt.grid(True, linestyle='--', alpha=0.3)
-
-    # 2. 对数转换后的分布
-    plt.subplot(2, 2, 2)
-    sns.histplot(df['财富对数'], bins=30, kde=True, color='orange')
-    plt.title('财富值(对数)分布', fontsize=16)
-    plt.xlabel('财富值对数(log10)', fontsize=12)
-    plt.ylabel('人数', fontsize=12)
-    plt.grid(True, linestyle='--', alpha=0.3)
-
-    # 3. 财富箱线图
-    plt.subplot(2, 2, 3)
-    sns.boxplot(x=df['财富值(亿人民币)'], color='skyblue')
-    plt.title('财富值箱线图', fontsize=16)
-    plt.xlabel('财富值(亿人民币)', fontsize=12)
-
-    # 4. 财富与年龄关系
-    plt.subplot(2, 2, 4)
-    sns.scatterplot(x='年龄', y='财富值(亿人民币)', data=df, alpha=0.6, color='green')
-    plt.title('年龄与财富关系', fontsize=16)
-    plt.xlabel('年龄', fontsize=12)
-    plt.ylabel('财富值(亿人民币)', fontsize=12)
-    plt.yscale('log')
-
-    plt.tight_layout()
-    plt.savefig('results_1/wealth_distribution.png', dpi=300)
-    plt.close()
-    print("财富分布图表已保存至 results_1/wealth_distribution.png")
-
-
-def main():
-    """主函数"""
     print("=" * 50)
     print("胡润富豪榜数据分析")
     print("=" * 50)
 
-    # 1. 爬取数据
-    df = crawl_hurun_rich_list()
+    # 1. 爬取数据  2. 数据清洗
+    df_clean, cube = prepare_data(report=report)
 
-    # 2. 数据清洗
-    df_clean = clean_data(df)
+    # 3-7. 行业趋势/人口统计/年龄-财富热力图/地理分布/财富分布，各图表只携带小规模聚合结果
+    build_cache = hurun_build.BuildCache(force=force)
+    jobs = collect_jobs(df_clean, cube, report=report, attribution=attribution)
+    render(jobs, render_workers, build_cache, report)
 
-    # 3. 行业趋势分析
-    industry_stats = analyze_industry_trend(df_clean)
+    # 保存处理后的数据，并重建查询索引
+    export_results(df_clean, cube, build_cache, report, attribution)
+    build_search_index(df_clean, LIST_ID, build_cache)
+    # 记录本次读取的榜单缓存；退回过期缓存时下次运行判断为不新鲜，仍会尝试刷新
+    build_cache.record_run(PIPELINE_KEY, pipeline_fingerprint(hurun_cache.latest_file(LIST_ID, ttl_days=None),
+                                                              attribution))
+    build_cache.save()
 
-    # 4. 人口统计特征分析
-    analyze_demographics(df_clean)
+    print("\n" + "=" * 50)
+    print("分析完成!")
+    print(f"所有结果已保存至 results_1 目录")
+    print("=" * 50)
 
-    # 5. 年龄-财富热力图分析
-    analyze_age_wealth_heatmap(df_clean)
 
-    # 6. 地理分布分析
-    geo_distribution = generate_geographical_distribution(df_clean)
+def _parse_list(value):
+    """解析 榜单ID[:年份]"""
+    list_id, _, year = value.partition(':')
+    return list_id, int(year) if year else None
 
-    # 7. 财富分布分析
-    generate_wealth_distribution(df_clean)
 
-    # 保存处理后的数据
-    df_clean.to_csv('results_1/rich_list_clean.csv', index=False)
-    industry_stats.to_csv('results_1/industry_stats.csv')
-    geo_distribution.to_csv('results_1/geo_distribution.csv')
+def _parse_only(value):
+    groups = [group.strip() for group in value.split(',') if group.strip()]
+    unknown = set(groups) - set(ANALYSES)
+    if unknown:
+        import argparse
 
-    print("\n" + "=" * 50)
-    print("分析完成!")
-    print(f"所有结果已保存至 results_1 目录")
-    print("=" * 50)
+        raise argparse.ArgumentTypeError(f"未知的分析组: {', '.join(sorted(unknown))} (可选: {', '.join(ANALYSES)})")
+    return groups
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="胡润富豪榜数据分析；不带子命令时运行完整流程")
+    parser.add_argument('--force', action='store_true', help="忽略构建缓存，重新生成全部产物")
+    parser.add_argument('--workers', type=int, default=None, help="图表渲染进程数，默认为CPU核数")
+    parser.add_argument('--profile', choices=hurun_metrics.STAGES, default=None,
+                        help="用 cProfile 采样指定阶段，结果保存至 results_1/profiles")
+    parser.add_argument('--industry-attribution', choices=['full', 'fractional'], default='full',
+                        help="多行业字段的归属方式：full 在每个行业各计一次，fractional 平均分摊")
+    parser.add_argument('--trace-memory', action='store_true', help="用 tracemalloc 统计各阶段峰值内存(开销较大)")
+    subparsers = parser.add_subparsers(dest='command')
+
+    crawl_parser = subparsers.add_parser('crawl', help="只爬取榜单并写入列式缓存")
+    crawl_parser.add_argument('--list-id', default=LIST_ID, help="榜单ID")
+    crawl_parser.add_argument('--concurrency', type=int, default=4, help="并发上限")
+    crawl_parser.add_argument('--no-resume', action='store_true', help="忽略分页检查点，全部重新获取")
+    crawl_parser.add_argument('--ttl-days', type=int, default=hurun_cache.DEFAULT_TTL_DAYS, help="缓存有效期(天)")
+
+    batch_parser = subparsers.add_parser('batch', help="批量爬取多个榜单/年份，写入一个面板数据集")
+    batch_parser.add_argument('--list', dest='lists', action='append', type=_parse_list, required=True,
+                              metavar='ID[:年份]', help="榜单ID及其年份，可重复指定")
+    batch_parser.add_argument('--name', default=None, help="面板数据集名称，默认按榜单ID拼接")
+    batch_parser.add_argument('--concurrency', type=int, default=8, help="所有榜单共用的并发上限")
+    batch_parser.add_argument('--no-resume', action='store_true', help="忽略分页检查点，全部重新获取")
+    batch_parser.add_argument('--ttl-days', type=int, default=hurun_cache.DEFAULT_TTL_DAYS, help="缓存有效期(天)")
+
+    clean_parser = subparsers.add_parser('clean', help="清洗缓存中的榜单并导出 rich_list_clean.csv")
+    analyze_parser = subparsers.add_parser('analyze', help="生成分析图表")
+    analyze_parser.add_argument('--only', type=_parse_only, default=None,
+                                help=f"只运行指定分析组，逗号分隔 (可选: {','.join(ANALYSES)})")
+    # 与顶层同名的选项在子命令上默认为 SUPPRESS，未指定时不覆盖顶层解析到的值
+    analyze_parser.add_argument('--workers', type=int, default=argparse.SUPPRESS, help="图表渲染进程数，默认为CPU核数")
+    export_parser = subparsers.add_parser('export', help="导出全部CSV结果")
+    export_parser.add_argument('--chunk-size', type=int, default=None,
+                               help="分块模式：每次从缓存读取该行数，逐块清洗并合并聚合结果，内存占用有界；"
+                                    "只导出立方体、行业统计和各省人数")
+    export_parser.add_argument('--panel', default=None, help="分块读取指定的面板数据集(需配合 --chunk-size)")
+    for sub in [clean_parser, analyze_parser, export_parser]:
+        sub.add_argument('--list-id', default=LIST_ID, help="榜单ID")
+        sub.add_argument('--force', action='store_true', default=argparse.SUPPRESS, help="忽略构建缓存，重新生成产物")
+    args = parser.parse_args()
+    if getattr(args, 'panel', None) and not args.chunk_size:
+        parser.error("--panel 需要配合 --chunk-size 使用")
+
+    command = args.command or 'all'
+    report = hurun_metrics.RunReport(command, profile_stage=args.profile, trace_memory=args.trace_memory)
+    # 完整流程的输入与上次相同时只比较指纹，不读取数据、不加载重型依赖
+    fresh = args.command is None and not args.force and pipeline_fresh(args.industry_attribution)
+    startup, dependencies = load_dependencies('fresh' if fresh else command)
+    report.set('startup', {'total_s': round(startup, 4), 'dependencies_s': round(dependencies, 4)})
+    try:
+        if args.command == 'crawl':
+            with hurun_metrics.stage(report, 'crawl') as metrics:
+                df = crawl_hurun_rich_list(args.list_id, concurrency=args.concurrency, resume=not args.no_resume,
+                                           ttl_days=args.ttl_days, report=report, allow_partial=True)
+                metrics['rows_out'] = len(df)
+            print(f"榜单 {args.list_id} 共 {len(df)} 条记录")
+        elif args.command == 'batch':
+            with hurun_metrics.stage(report, 'crawl') as metrics:
+                df = crawl_panel(dict(args.lists), name=args.name, concurrency=args.concurrency,
+                                 resume=not args.no_resume, ttl_days=args.ttl_days, report=report,
+                                 allow_partial=True)
+                metrics['rows_out'] = len(df)
+            print(df.groupby(['榜单ID', '年份'], observed=True, dropna=False).size().rename('记录数').to_string())
+        elif fresh:
+            print("榜单缓存、参数和代码与上次完整运行相同，全部产物均为最新，跳过 (--force 强制重新生成)")
+        elif args.command is None:
+            main(render_workers=args.workers, force=args.force, report=report, attribution=args.industry_attribution)
+        elif args.command == 'export' and args.chunk_size:
+            import hurun_build
+
+            build_cache = hurun_build.BuildCache(force=args.force)
+            # 子命令可能用其他数据覆盖完整流程的产物，之后的完整运行不能直接跳过
+            build_cache.entries.pop(PIPELINE_KEY, None)
+            cube = prepare_chunked(args.list_id, args.panel, args.chunk_size, report=report)
+            export_aggregates(cube, build_cache, report, args.industry_attribution)
+            build_cache.save()
+        else:
+            import hurun_build
+
+            build_cache = hurun_build.BuildCache(force=args.force)
+            build_cache.entries.pop(PIPELINE_KEY, None)
+            df_clean, cube = prepare_data(args.list_id, report=report)
+            if args.command == 'clean':
+                export_results(df_clean, build_cache=build_cache, report=report)
+            elif args.command == 'analyze':
+                render(collect_jobs(df_clean, cube, args.only, report, args.industry_attribution), args.workers,
+                       build_cache, report)
+            elif args.command == 'export':
+                export_results(df_clean, cube, build_cache, report, args.industry_attribution)
+            if args.command in ('clean', 'export'):
+                build_search_index(df_clean, args.list_id, build_cache)
+            build_cache.save()
+    except IncompleteCrawlError as e:
+        # 爬取不完整时在任何导出、绘图、索引步骤之前停止，不覆盖已有结果
+        raise SystemExit(f"错误: {e}")
+    finally:
+        report.save()